@@ -1,5 +1,6 @@
 __all__ = [
     "processor",
     "helpers",
+    "benchmark",
     "scripts"
 ]
@@ -0,0 +1,16 @@
+__all__ = [
+    "Profile",
+    "Scenario",
+    "compare",
+    "fake_fx_extractor",
+    "fake_s3",
+    "fake_s3_client",
+    "fake_stock_extractor",
+    "format_table",
+    "run",
+    "run_scenario"
+]
+
+from equicast_ingestion.benchmark.fakes import Profile, fake_fx_extractor, fake_s3, fake_s3_client, \
+    fake_stock_extractor
+from equicast_ingestion.benchmark.runner import Scenario, compare, format_table, run, run_scenario
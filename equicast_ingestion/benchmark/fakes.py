@@ -0,0 +1,219 @@
+import hashlib
+import io
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from botocore.exceptions import ClientError
+
+
+class ThrottledError(RuntimeError):
+    pass
+
+
+@dataclass
+class Profile:
+    latency: float = 0.02  # mean seconds per upstream call
+    jitter: float = 0.5  # lognormal sigma, 0 gives a constant latency
+    failure_rate: float = 0.0
+    throttle_rate: float = 0.0
+    max_concurrency: int = 0  # > 0 throttles calls above this many in flight, like a rate-limited upstream
+    rows: int = 500  # rows per extracted dataset
+    seed: int = 0
+    calls: int = field(default=0, init=False)
+    failures: int = field(default=0, init=False)
+    throttled: int = field(default=0, init=False)
+    _in_flight: int = field(default=0, init=False, repr=False)
+    _random: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+
+    def _sample(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.jitter <= 0:
+            return self.latency
+        mu = math.log(self.latency) - self.jitter ** 2 / 2
+        with self._lock:
+            return self._random.lognormvariate(mu, self.jitter)
+
+    def call(self):
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            roll = self._random.random()
+            over_limit = 0 < self.max_concurrency < self._in_flight
+
+        try:
+            time.sleep(self._sample())
+            if over_limit or roll < self.throttle_rate:
+                with self._lock:
+                    self.throttled += 1
+                raise ThrottledError("429 Too Many Requests")
+            if roll < self.throttle_rate + self.failure_rate:
+                with self._lock:
+                    self.failures += 1
+                raise RuntimeError("500 Internal Server Error")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def frame(self, rows: int = None) -> pd.DataFrame:
+        rows = self.rows if rows is None else rows
+        index = pd.date_range("2000-01-03", periods=rows, freq="D", name="Date")
+        return pd.DataFrame({
+            "Open": [1.0 + i * 1e-4 for i in range(rows)],
+            "High": [1.1 + i * 1e-4 for i in range(rows)],
+            "Low": [0.9 + i * 1e-4 for i in range(rows)],
+            "Close": [1.0 + i * 1e-4 for i in range(rows)],
+            "Volume": list(range(rows)),
+        }, index=index)
+
+    def summary(self) -> dict:
+        return {"calls": self.calls, "failures": self.failures, "throttled": self.throttled}
+
+
+@dataclass
+class FakeFxData:
+    pair: str
+    frame: pd.DataFrame
+
+    def to_parquet(self, file_name: str, directory: str):
+        folder = os.path.join(directory, f"fx={self.pair}")
+        os.makedirs(folder, exist_ok=True)
+        self.frame.to_parquet(os.path.join(folder, file_name))
+
+
+def fake_fx_extractor(profile: Profile) -> type:
+    class FakeFxDataExtractor:
+        def __init__(self, from_currency, to_currency, start_date=None, end_date=None):
+            self.from_currency = from_currency
+            self.to_currency = to_currency
+            self.start_date = start_date
+            self.end_date = end_date
+
+        def _extract(self):
+            profile.call()
+            return FakeFxData(f"{self.from_currency}{self.to_currency}", profile.frame())
+
+        extract_fx_prices = extract_fx_profile = extract_fx_fundamentals = _extract
+        extract_fx_calculations = extract_fx_forecast = _extract
+
+    return FakeFxDataExtractor
+
+
+def fake_stock_extractor(profile: Profile) -> type:
+    class FakeStockDataExtractor:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def _extract(self):
+            profile.call()
+            return profile.frame()
+
+        extract_stock_price_data = extract_dividends = extract_company_profile = extract_fundamentals = _extract
+
+    return FakeStockDataExtractor
+
+
+def fake_s3(profile: Profile) -> type:
+    class FakeS3:
+        objects: Dict[str, Dict[str, bytes]] = {}  # bucket -> key -> payload, so manifests and state round-trip
+
+        def __init__(self, bucket_name, region_name=None):
+            self.bucket_name = bucket_name
+
+        def upload_files(self, files: List[dict]) -> dict:
+            uploaded, failed = [], []
+            for file in files:
+                try:
+                    profile.call()
+                except RuntimeError:
+                    failed.append(file['key'])
+                    continue
+                self.objects.setdefault(self.bucket_name, {})[file['key']] = Path(file['path']).read_bytes()
+                uploaded.append(file['key'])
+            return {"uploaded": uploaded, "failed": failed}
+
+        def download_files(self, local_dir: str, files: List[dict]) -> dict:
+            downloaded, missing = [], []
+            for file in files:
+                body = self.objects.get(self.bucket_name, {}).get(file['key'])
+                if body is None:
+                    if file.get('mandatory'):
+                        missing.append(file['key'])
+                    continue
+                profile.call()
+                path = Path(local_dir, file['key'])
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(body)
+                downloaded.append(file['key'])
+            return {"downloaded": downloaded, "missing_mandatory": missing}
+
+    return FakeS3
+
+
+def fake_s3_client(profile: Profile) -> type:
+    # boto3-style client for the Downloader and S3WorkQueue: conditional reads and writes, objects held in memory
+    class FakeS3Client:
+        objects: Dict[Tuple[str, str], Tuple[bytes, str, datetime]] = {}
+        lock = threading.Lock()
+
+        def __init__(self, region_name=None, endpoint_url=None):
+            self.region_name = region_name
+
+        @classmethod
+        def put(cls, bucket: str, key: str, body: bytes):
+            cls.objects[(bucket, key)] = (body, f'"{hashlib.md5(body).hexdigest()}"', datetime.now(timezone.utc))
+
+        def _object(self, bucket: str, key: str, operation: str):
+            profile.call()
+            if (bucket, key) not in self.objects:
+                raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, operation)
+            return self.objects[(bucket, key)]
+
+        def head_object(self, Bucket: str, Key: str) -> dict:
+            body, etag, modified = self._object(Bucket, Key, "HeadObject")
+            return {"ETag": etag, "ContentLength": len(body), "LastModified": modified}
+
+        def put_object(self, Bucket: str, Key: str, Body: bytes, IfMatch: str = None, IfNoneMatch: str = None) -> dict:
+            profile.call()
+            with self.lock:
+                current = self.objects.get((Bucket, Key))
+                if (IfNoneMatch == "*" and current) or (IfMatch and (not current or current[1] != IfMatch)):
+                    raise ClientError({"Error": {"Code": "PreconditionFailed", "Message": "Condition failed"}},
+                                      "PutObject")
+                self.put(Bucket, Key, Body)
+                return {"ETag": self.objects[(Bucket, Key)][1]}
+
+        def list_objects_v2(self, Bucket: str, Prefix: str = "", **kwargs) -> dict:
+            with self.lock:
+                objects = sorted((key, value) for (bucket, key), value in self.objects.items()
+                                 if bucket == Bucket and key.startswith(Prefix))
+            contents = [{"Key": key, "ETag": etag, "Size": len(body), "LastModified": modified}
+                        for key, (body, etag, modified) in objects]
+            return {"Contents": contents, "IsTruncated": False}
+
+        def delete_object(self, Bucket: str, Key: str) -> dict:
+            self.objects.pop((Bucket, Key), None)
+            return {}
+
+        def get_object(self, Bucket: str, Key: str, Range: str = None, IfMatch: str = None) -> dict:
+            body, etag, modified = self._object(Bucket, Key, "GetObject")
+            if IfMatch and IfMatch != etag:
+                raise ClientError({"Error": {"Code": "PreconditionFailed", "Message": "ETag changed"}}, "GetObject")
+            if Range:
+                start, end = (int(value) for value in Range.removeprefix("bytes=").split("-"))
+                body = body[start:end + 1]
+            return {"Body": io.BytesIO(body), "ETag": etag, "ContentLength": len(body), "LastModified": modified}
+
+    return FakeS3Client
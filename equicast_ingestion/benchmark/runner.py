@@ -0,0 +1,216 @@
+import concurrent.futures
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from equicast_ingestion.benchmark.fakes import Profile, fake_fx_extractor, fake_s3, fake_stock_extractor
+
+TARGETS = ["fx", "stock", "splitter", "uploader"]
+
+
+@dataclass
+class Scenario:
+    target: str  # "fx", "stock", "splitter" or "uploader"
+    items: int
+    profile: Dict[str, float] = field(default_factory=dict)  # Profile arguments for the fake upstream
+    s3_profile: Dict[str, float] = field(default_factory=lambda: {"latency": 0.002})
+    options: Dict[str, object] = field(default_factory=dict)  # processor / splitter arguments
+    name: str = ""
+
+    def __post_init__(self):
+        if self.target not in TARGETS:
+            raise ValueError(f"target must be one of {TARGETS}.")
+        self.name = self.name or f"{self.target}-{self.items}"
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _write_items(path: Path, template: str, count: int) -> List[str]:
+    items = [template.format(idx) for idx in range(count)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(items, f)
+    return items
+
+
+def _stage_summary(metrics, stage: str) -> dict:
+    values = metrics.summary().get(stage, {})
+    return {key: values.get(key) for key in ["errors", "retries", "p50", "p99", "workers"]}
+
+
+def _run_fx(scenario: Scenario, workdir: Path, profile: Profile, s3_profile: Profile) -> dict:
+    import equicast_ingestion.processor.fx as fx_module
+
+    _write_items(workdir / "fx.json", "X{:05d}/USD", scenario.items)
+    options = dict(scenario.options)
+    datasets = options.pop("datasets", ["prices"])
+    original = fx_module.FxDataExtractor
+    fx_module.FxDataExtractor = fake_fx_extractor(profile)
+    try:
+        processor = fx_module.FxProcessor(input_file=str(workdir / "fx.json"), **options)
+        processor._process_all(datasets)
+    finally:
+        fx_module.FxDataExtractor = original
+
+    return _stage_summary(processor.metrics, "fx.pair")
+
+
+def _run_stock(scenario: Scenario, workdir: Path, profile: Profile, s3_profile: Profile) -> dict:
+    import equicast_ingestion.processor.stock as stock_module
+
+    _write_items(workdir / "tickers.json", "T{:05d}", scenario.items)
+    original = stock_module.StockDataExtractor
+    stock_module.StockDataExtractor = fake_stock_extractor(profile)
+    try:
+        processor = stock_module.StockProcessor(
+            ticker_file=str(workdir / "tickers.json"),
+            download_dir=str(workdir / "downloads"),
+            stock_download_dir=str(workdir / "stock_downloads"),
+            **scenario.options
+        )
+        processor.process()
+    finally:
+        stock_module.StockDataExtractor = original
+
+    return _stage_summary(processor.metrics, "stock.ticker")
+
+
+def _run_splitter(scenario: Scenario, workdir: Path, profile: Profile, s3_profile: Profile) -> dict:
+    from equicast_ingestion.helpers import CostHistory, Splitter
+
+    items = _write_items(workdir / "tickers.json", "T{:05d}", scenario.items)
+    options = dict(scenario.options)
+    if options.pop("with_costs", True):
+        rng = random.Random(profile.seed)
+        history = CostHistory()
+        for item in items:
+            history.record(item, rng.lognormvariate(0, 1))
+        history.save(str(workdir / "item_costs.jsonl"))
+        options["cost_file"] = str(workdir / "item_costs.jsonl")
+
+    splitter = Splitter(mode="stock", filepath=str(workdir / "tickers.json"),
+                        pref_chunk_size=options.pop("pref_chunk_size", 200), **options)
+    shutil.rmtree(splitter.split(), ignore_errors=True)
+    return {}
+
+
+def _run_uploader(scenario: Scenario, workdir: Path, profile: Profile, s3_profile: Profile) -> dict:
+    from equicast_ingestion.helpers import UploadConfig, Uploader
+
+    payload = workdir / "payload.parquet"
+    profile.frame().to_parquet(payload)
+    for item in _write_items(workdir / "tickers.json", "T{:05d}", scenario.items):
+        folder = workdir / "upload" / item
+        folder.mkdir(parents=True)
+        shutil.copyfile(payload, folder / "stock_price.parquet")
+
+    uploader = Uploader(UploadConfig(
+        directory=workdir / "upload",
+        pattern="*.parquet",
+        message="Benchmark Upload",
+        bucket="benchmark",
+        mode="stock",
+        **scenario.options
+    ), s3_factory=fake_s3(s3_profile))
+    uploader.upload()
+    return _stage_summary(uploader.metrics, "upload.batch")
+
+
+RUNNERS = {
+    "fx": _run_fx,
+    "stock": _run_stock,
+    "splitter": _run_splitter,
+    "uploader": _run_uploader,
+}
+
+
+def run_scenario(scenario: Scenario, quiet: bool = True) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix=f"benchmark_{scenario.target}_"))
+    profile = Profile(**scenario.profile)
+    s3_profile = Profile(**scenario.s3_profile)
+    previous_tempdir, tempfile.tempdir = tempfile.tempdir, str(workdir)
+
+    sink = open(os.devnull, "w", encoding="utf-8") if quiet else None
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sink or sys.stdout), contextlib.redirect_stderr(sink or sys.stderr):
+            details = RUNNERS[scenario.target](scenario, workdir, profile, s3_profile)
+        wall = time.perf_counter() - started
+    finally:
+        tempfile.tempdir = previous_tempdir
+        if sink:
+            sink.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "name": scenario.name,
+        "target": scenario.target,
+        "items": scenario.items,
+        "wall": round(wall, 3),
+        "throughput": round(scenario.items / wall, 2) if wall else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "upstream": profile.summary(),
+        "s3": s3_profile.summary(),
+        **details
+    }
+
+
+def run(scenarios: List[Scenario], quiet: bool = True) -> List[dict]:
+    results = []
+    for scenario in scenarios:
+        # A fresh interpreter per scenario keeps peak RSS and module state from leaking between runs
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            result = executor.submit(run_scenario, scenario, quiet).result()
+        print(f"⏱️ {result['name']}: {result['wall']:.2f}s, {result['throughput']} items/s, "
+              f"peak RSS {result['peak_rss_mb'] or 0:.0f} MiB.")
+        results.append(result)
+    return results
+
+
+def compare(results: List[dict], baseline: List[dict]) -> List[dict]:
+    previous = {result["name"]: result for result in baseline}
+    for result in results:
+        before = previous.get(result["name"])
+        if not before:
+            continue
+        for key in ["wall", "throughput", "peak_rss_mb"]:
+            if result.get(key) and before.get(key):
+                result[f"{key}_change"] = round((result[key] - before[key]) / before[key] * 100, 1)
+    return results
+
+
+def format_table(results: List[dict]) -> str:
+    def change(result, key):
+        value = result.get(f"{key}_change")
+        return "" if value is None else f" ({value:+.1f}%)"
+
+    lines = [
+        "| Scenario | Items | Wall (s) | Throughput (items/s) | Peak RSS (MiB) | Calls | Throttled | Failed |",
+        "|----------|-------|----------|----------------------|----------------|-------|-----------|--------|",
+    ]
+    for result in results:
+        calls = {key: result["upstream"][key] + result["s3"][key] for key in result["upstream"]}
+        lines.append(
+            f"| `{result['name']}` | {result['items']} | {result['wall']:.2f}{change(result, 'wall')} | "
+            f"{result['throughput']}{change(result, 'throughput')} | "
+            f"{result['peak_rss_mb'] or 0:.0f}{change(result, 'peak_rss_mb')} | {calls['calls']} | "
+            f"{calls['throttled']} | {calls['failures']} |"
+        )
+    return "\n".join(lines)
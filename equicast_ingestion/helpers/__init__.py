@@ -1,10 +1,50 @@
 __all__ = [
+    "CircuitBreaker",
+    "Compactor",
+    "ConcurrencyController",
+    "CostHistory",
+    "DeltaStore",
     "Downloader",
+    "Freshness",
+    "Journal",
+    "MarketCalendar",
+    "Metrics",
+    "ParquetEncoder",
+    "Profiler",
+    "ResponseCache",
+    "RetryQueue",
+    "S3WorkQueue",
+    "SharedState",
     "Splitter",
+    "SqliteWorkQueue",
+    "TokenBucket",
+    "TickerStatus",
     "UploadConfig",
+    "UploadQueue",
     "Uploader",
+    "Watermarks",
+    "WorkQueue",
+    "open_work_queue",
 ]
 
+from equicast_ingestion.helpers.compactor import Compactor
+from equicast_ingestion.helpers.concurrency import ConcurrencyController
+from equicast_ingestion.helpers.costs import CostHistory
+from equicast_ingestion.helpers.delta import DeltaStore
 from equicast_ingestion.helpers.downloader import Downloader
+from equicast_ingestion.helpers.encoder import ParquetEncoder
+from equicast_ingestion.helpers.freshness import Freshness
+from equicast_ingestion.helpers.journal import Journal
+from equicast_ingestion.helpers.market_calendar import MarketCalendar
+from equicast_ingestion.helpers.metrics import Metrics
+from equicast_ingestion.helpers.profiler import Profiler
+from equicast_ingestion.helpers.rate_limiter import CircuitBreaker, TokenBucket
+from equicast_ingestion.helpers.response_cache import ResponseCache
+from equicast_ingestion.helpers.retry_queue import RetryQueue
+from equicast_ingestion.helpers.shared_state import SharedState
 from equicast_ingestion.helpers.splitter import Splitter
+from equicast_ingestion.helpers.ticker_status import TickerStatus
+from equicast_ingestion.helpers.upload_queue import UploadQueue
 from equicast_ingestion.helpers.uploader import UploadConfig, Uploader
+from equicast_ingestion.helpers.watermark import Watermarks
+from equicast_ingestion.helpers.work_queue import S3WorkQueue, SqliteWorkQueue, WorkQueue, open_work_queue
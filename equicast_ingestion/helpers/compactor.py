@@ -0,0 +1,138 @@
+import fnmatch
+import os
+import tempfile
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from equicast_ingestion.helpers.delta import DeltaStore
+
+
+@dataclass
+class Compactor:
+    directory: Path
+    mode: str  # "stock" or "fx"
+    pattern: str = "*.parquet"
+    target_file_size: int = 256 * 1024 * 1024
+    row_group_size: int = 128 * 1024
+    compression: str = "zstd"
+    temp_dir: str = field(init=False)
+
+    def __post_init__(self):
+        if self.mode not in ["stock", "fx"]:
+            raise ValueError("mode must be 'stock' or 'fx'")
+
+        self.directory = Path(self.directory)
+        self.temp_dir = tempfile.mkdtemp(prefix=f"compacted_{self.mode}_")
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    @property
+    def entity_column(self) -> str:
+        return "ticker" if self.mode == "stock" else "pair"
+
+    def _entity(self, file: Path) -> str:
+        if self.mode == "stock":
+            return file.parent.name
+
+        rel_parent = file.parent.relative_to(self.directory)
+        parts = [part.split("=", 1)[-1] for part in rel_parent.parts]
+        return "/".join(parts) or file.stem
+
+    def _collect_datasets(self) -> Dict[str, List[Path]]:
+        datasets = defaultdict(list)
+        for file in sorted(self.directory.rglob("*")):
+            if file.is_file() and fnmatch.fnmatch(file.name, self.pattern):
+                if any(part.endswith(".delta") for part in file.relative_to(self.directory).parts[:-1]):
+                    continue  # read together with the snapshot they apply to
+                datasets[file.stem].append(file)
+        return datasets
+
+    def _has_deltas(self, file: Path) -> bool:
+        return Path(self.directory, DeltaStore.delta_dir(str(file.relative_to(self.directory)))).is_dir()
+
+    def _read(self, file: Path) -> pa.Table:
+        # A snapshot with deltas is compacted as its current state
+        if self._has_deltas(file):
+            return pa.Table.from_pandas(DeltaStore().read(str(file.relative_to(self.directory)), str(self.directory)))
+        return pq.read_table(file)
+
+    def _schema(self, files: List[Path]) -> pa.Schema:
+        schemas = [
+            (self._read(file).schema if self._has_deltas(file) else pq.read_schema(file)).remove_metadata()
+            for file in files
+        ]
+        schema = pa.unify_schemas(schemas, promote_options="permissive")
+        if self.entity_column in schema.names:
+            schema = schema.remove(schema.get_field_index(self.entity_column))
+        return schema.insert(0, pa.field(self.entity_column, pa.string()))
+
+    def _conform(self, table: pa.Table, entity: str, schema: pa.Schema) -> pa.Table:
+        table = table.replace_schema_metadata(None)
+        if self.entity_column in table.column_names:
+            table = table.drop_columns([self.entity_column])
+        table = table.add_column(0, self.entity_column, pa.array([entity] * table.num_rows, pa.string()))
+
+        columns = []
+        for schema_field in schema:
+            if schema_field.name in table.column_names:
+                columns.append(table[schema_field.name].cast(schema_field.type))
+            else:
+                columns.append(pa.nulls(table.num_rows, schema_field.type))
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    def _compact_dataset(self, dataset: str, files: List[Path]) -> List[str]:
+        schema = self._schema(files)
+        output_dir = os.path.join(self.temp_dir, f"dataset={dataset}")
+        os.makedirs(output_dir, exist_ok=True)
+
+        outputs = []
+        writer = None
+        buffer: List[pa.Table] = []
+        buffered_rows = 0
+
+        def flush():
+            nonlocal writer, buffer, buffered_rows
+            if not buffer:
+                return
+
+            if writer is None:
+                path = os.path.join(output_dir, f"part-{len(outputs):05d}.parquet")
+                writer = pq.ParquetWriter(path, schema, compression=self.compression)
+                outputs.append(path)
+
+            writer.write_table(pa.concat_tables(buffer), row_group_size=self.row_group_size)
+            buffer, buffered_rows = [], 0
+
+            # Row groups are flushed on write, so the file size on disk tracks the target closely
+            if os.path.getsize(outputs[-1]) >= self.target_file_size:
+                writer.close()
+                writer = None
+
+        for file in files:
+            table = self._conform(self._read(file), self._entity(file), schema)
+            buffer.append(table)
+            buffered_rows += table.num_rows
+            if buffered_rows >= self.row_group_size:
+                flush()
+
+        flush()
+        if writer is not None:
+            writer.close()
+
+        print(f"✅ Compacted {len(files)} '{dataset}' files into {len(outputs)} files.")
+        return outputs
+
+    def compact(self):
+        datasets = self._collect_datasets()
+        if not datasets:
+            print(f"No files found in {self.directory}/ matching pattern: {self.pattern}")
+            return self.temp_dir
+
+        for dataset, files in datasets.items():
+            self._compact_dataset(dataset, files)
+
+        return self.temp_dir
@@ -0,0 +1,98 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+THROTTLE_MARKERS = ("429", "too many requests", "rate limit", "ratelimit", "throttl", "503", "timed out")
+
+
+@dataclass
+class ConcurrencyController:
+    max_limit: int
+    min_limit: int = 1
+    initial_limit: Optional[int] = None  # defaults to half of 'max_limit', so the limit can grow as well as shrink
+    increase_step: float = 1.0  # added per full window of healthy completions
+    decrease_factor: float = 0.5
+    latency_tolerance: float = 2.0  # smoothed latency above this multiple of the baseline counts as congestion
+    error_threshold: float = 0.25
+    limit: float = field(init=False)
+    _in_flight: int = field(default=0, init=False)
+    _latency: Optional[float] = field(default=None, init=False)  # fast EWMA of healthy latencies
+    _baseline: Optional[float] = field(default=None, init=False)  # slow EWMA, the latency of an uncongested upstream
+    _error_rate: float = field(default=0.0, init=False)
+    _last_decrease: float = field(default=0.0, init=False)
+    _since_decrease: int = field(default=0, init=False)  # completions since the last decrease
+    _weighted: float = field(default=0.0, init=False)
+    _elapsed: float = field(default=0.0, init=False)
+    _changed_at: float = field(init=False)
+    _condition: threading.Condition = field(default_factory=threading.Condition, init=False, repr=False)
+
+    def __post_init__(self):
+        self.min_limit = max(1, min(self.min_limit, self.max_limit))
+        initial = self.max_limit // 2 if self.initial_limit is None else self.initial_limit
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._changed_at = time.monotonic()
+        self._since_decrease = self.max_limit  # the first congestion signal may decrease right away
+
+    @staticmethod
+    def is_throttled(error: Optional[str]) -> bool:
+        message = (error or "").lower()
+        return any(marker in message for marker in THROTTLE_MARKERS)
+
+    @property
+    def current(self) -> int:
+        return int(self.limit)
+
+    @property
+    def settled(self) -> int:
+        with self._condition:
+            elapsed = self._elapsed + time.monotonic() - self._changed_at
+            weighted = self._weighted + self.limit * (time.monotonic() - self._changed_at)
+        return round(weighted / elapsed) if elapsed > 0 else self.current
+
+    def _set_limit(self, limit: float):
+        now = time.monotonic()
+        self._weighted += self.limit * (now - self._changed_at)
+        self._elapsed += now - self._changed_at
+        self._changed_at = now
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+        self._condition.notify_all()
+
+    def acquire(self) -> float:
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, error: Optional[str] = None):
+        latency = time.monotonic() - started
+        with self._condition:
+            self._in_flight -= 1
+            self._since_decrease += 1
+            self._error_rate = 0.9 * self._error_rate + 0.1 * (1.0 if error else 0.0)
+
+            if not error:
+                if self._latency is None:
+                    self._latency = self._baseline = latency
+                else:
+                    # Single slow responses are noise, only a sustained rise of the smoothed latency is congestion
+                    self._latency = 0.8 * self._latency + 0.2 * latency
+                    self._baseline = 0.99 * self._baseline + 0.01 * latency
+            slow = self._latency is not None and self._latency > self.latency_tolerance * self._baseline
+
+            congested = self.is_throttled(error) or slow or self._error_rate > self.error_threshold
+            if congested:
+                # At most one decrease per window: only requests started after the last cut, and only once a
+                # limit's worth of requests completed since, so the effect of a cut is seen before the next one
+                if started >= self._last_decrease and self._since_decrease >= int(self.limit):
+                    self._last_decrease = time.monotonic()
+                    self._since_decrease = 0
+                    self._set_limit(self.limit * self.decrease_factor)
+            elif not error:
+                self._set_limit(self.limit + self.increase_step / self.limit)
+
+            self._condition.notify_all()
+
+    def summary(self) -> str:
+        return f"current {self.current}, settled {self.settled} (range {self.min_limit}-{self.max_limit})"
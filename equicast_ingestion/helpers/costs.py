@@ -0,0 +1,45 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict
+
+
+@dataclass
+class CostHistory:
+    entries: Dict[str, dict] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def record(self, item: str, runtime: float, size: int = 0, error: bool = False):
+        with self._lock:
+            entry = self.entries.setdefault(item, {"runtime": 0.0, "attempts": 0, "retries": 0, "bytes": 0})
+            entry["runtime"] = round(entry["runtime"] + runtime, 3)
+            entry["attempts"] += 1
+            entry["retries"] += 1 if error else 0
+            entry["bytes"] += size
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for item, entry in sorted(self.entries.items()):
+                f.write(json.dumps({"item": item, **entry}) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "CostHistory":
+        history = cls()
+        if not path or not os.path.exists(path):
+            return history
+
+        files = sorted(Path(path).rglob("item_costs*.jsonl")) if os.path.isdir(path) else [Path(path)]
+        for file in files:
+            with open(file, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        history.entries[entry.pop("item")] = entry
+
+        return history
+
+    def cost(self, item: str):
+        entry = self.entries.get(item)
+        return entry["runtime"] if entry else None
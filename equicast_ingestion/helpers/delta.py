@@ -0,0 +1,207 @@
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+METADATA_KEY = b"equicast.delta"
+OP_COLUMN = "_op"  # "I"nsert, "U"pdate or "D"elete
+DATE_COLUMNS = ("date", "datetime", "timestamp")
+
+
+@dataclass
+class DeltaStore:
+    compact_every: int = 7  # deltas kept before the next write folds them into a full snapshot
+    compression: str = "snappy"
+    snapshots: int = field(default=0, init=False)
+    deltas: int = field(default=0, init=False)
+    unchanged: int = field(default=0, init=False)
+    full_bytes: int = field(default=0, init=False)
+    written_bytes: int = field(default=0, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    # Layout next to every output 'x.parquet': the snapshot itself, and 'x.delta/<sequence>.parquet' for
+    # each later change. Every file records its sequence, so the state is the snapshot plus all newer deltas.
+
+    @staticmethod
+    def delta_dir(key: str) -> str:
+        return f"{key[:-len('.parquet')] if key.endswith('.parquet') else key}.delta"
+
+    @staticmethod
+    def _info(path: str) -> dict:
+        metadata = pq.read_schema(path).metadata or {}
+        return json.loads(metadata[METADATA_KEY]) if METADATA_KEY in metadata else {"sequence": 0}
+
+    @staticmethod
+    def _date_column(schema: pa.Schema) -> Optional[str]:
+        # The stored index, or the date column of frames that only have a positional index
+        metadata = schema.metadata or {}
+        pandas_metadata = json.loads(metadata[b"pandas"]) if b"pandas" in metadata else {}
+        index = [column for column in pandas_metadata.get("index_columns", []) if isinstance(column, str)]
+        if index:
+            return index[0]
+        return next((name for name in schema.names if name.lower() in DATE_COLUMNS), None)
+
+    @staticmethod
+    def max_date(path: str) -> Optional[pd.Timestamp]:
+        # Newest date of a parquet file from its row group statistics, without reading any rows when they are written
+        parquet = pq.ParquetFile(path)
+        column = DeltaStore._date_column(parquet.schema_arrow)
+        if column is None:
+            return None
+        position = parquet.schema_arrow.get_field_index(column)
+        values = []
+        for row_group in range(parquet.metadata.num_row_groups):
+            statistics = parquet.metadata.row_group(row_group).column(position).statistics
+            if statistics is None or not statistics.has_min_max:
+                values = parquet.read(columns=[column]).column(column).to_pandas()
+                break
+            values.append(statistics.max)
+        dates = pd.to_datetime(pd.Series(values, dtype=object), utc=True, errors="coerce").dropna()
+        return None if dates.empty else dates.max().tz_localize(None)
+
+    def last_date(self, key: str, *directories: str) -> Optional[pd.Timestamp]:
+        # Newest date of the state without rebuilding it: the snapshot's statistics plus the dates of its deltas
+        snapshot, _, deltas = self._state(key, tuple(d for d in directories if d))
+        last = self.max_date(snapshot) if snapshot else None
+        for _, path in deltas:
+            column = self._date_column(pq.read_schema(path))
+            if column is None:
+                return None
+            delta = pq.read_table(path, columns=[column, OP_COLUMN]).to_pandas(ignore_metadata=True)
+            dates = pd.to_datetime(delta[column], utc=True, errors="coerce").dt.tz_localize(None)
+            if last is not None and (dates[delta[OP_COLUMN] == "D"] >= last).any():
+                return None  # the newest rows were deleted, so the last date is unknown without the full state
+            upserted = dates[delta[OP_COLUMN] != "D"].dropna()
+            if not upserted.empty:
+                last = max(last, upserted.max()) if last is not None else upserted.max()
+        return last
+
+    @staticmethod
+    def key_mode(df: pd.DataFrame) -> str:
+        # Rows are matched on the index, or on the date column of frames that only have a positional index
+        if isinstance(df.index, pd.RangeIndex):
+            for column in df.columns:
+                if str(column).lower() in DATE_COLUMNS:
+                    return f"column:{column}"
+        return "index"
+
+    @staticmethod
+    def _keyed(df: pd.DataFrame, mode: str) -> pd.DataFrame:
+        if mode.startswith("column:"):
+            df = df.set_index(mode[len("column:"):], drop=False)
+        return df.sort_index(kind="stable")
+
+    @staticmethod
+    def _unkeyed(df: pd.DataFrame, mode: str) -> pd.DataFrame:
+        return df.reset_index(drop=True) if mode.startswith("column:") else df
+
+    def _state(self, key: str, directories: Tuple[str, ...]) -> Tuple[Optional[str], dict, List[Tuple[int, str]]]:
+        snapshot, info = None, {"sequence": 0}
+        for directory in directories:
+            path = os.path.join(directory, key)
+            if os.path.exists(path) and (snapshot is None or self._info(path)["sequence"] > info["sequence"]):
+                snapshot, info = path, self._info(path)
+
+        deltas = {}
+        for directory in directories:
+            for path in Path(directory, self.delta_dir(key)).glob("*.parquet"):
+                if re.fullmatch(r"\d+", path.stem) and int(path.stem) > info["sequence"]:
+                    deltas.setdefault(int(path.stem), str(path))
+        return snapshot, info, sorted(deltas.items())
+
+    def read(self, key: str, *directories: str) -> Optional[pd.DataFrame]:
+        # Directories are searched in order, e.g. this run's outputs before the previous state
+        snapshot, info, deltas = self._state(key, tuple(d for d in directories if d))
+        if snapshot is None:
+            return None
+
+        df = pd.read_parquet(snapshot)
+        mode = info.get("key", self.key_mode(df))
+        state = self._keyed(df, mode)
+        for _, path in deltas:
+            delta = self._keyed(pd.read_parquet(path), mode)
+            ops = delta.pop(OP_COLUMN)
+            state = state.drop(index=delta.index, errors="ignore")
+            state = pd.concat([state, delta[ops != "D"].astype(state.dtypes.to_dict(), errors="ignore")])
+            state = state.sort_index(kind="stable")
+        return self._unkeyed(state, mode)
+
+    def _write_table(self, df: pd.DataFrame, path: str, info: dict) -> int:
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: json.dumps(info)})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, path, compression=self.compression)
+        return os.path.getsize(path)
+
+    def snapshot_metadata(self, key: str, *previous: str, mode: str = "index") -> dict:
+        # For writers producing the snapshot themselves, e.g. streamed full runs
+        _, info, deltas = self._state(key, tuple(d for d in previous if d))
+        sequence = max([info["sequence"], *[seq for seq, _ in deltas]]) + 1
+        return {METADATA_KEY: json.dumps({"sequence": sequence, "key": mode})}
+
+    def write(self, directory: str, key: str, *previous: str, snapshot: bool = False) -> List[str]:
+        # Turns the full file written at 'directory/key' into what has to be stored, returns those keys
+        path = os.path.join(directory, key)
+        current = pd.read_parquet(path)
+        full_bytes = os.path.getsize(path)
+        _, info, deltas = self._state(key, tuple(d for d in previous if d))
+        sequence = max([info["sequence"], *[seq for seq, _ in deltas]]) + 1
+        mode = info.get("key", self.key_mode(current))
+        before = self.read(key, *previous)
+
+        diffable = (
+            not snapshot and before is not None and len(deltas) < self.compact_every
+            and list(before.columns) == list(current.columns)
+            and before.dtypes.astype(str).tolist() == current.dtypes.astype(str).tolist()
+            and self.key_mode(current) == mode and self._keyed(current, mode).index.is_unique
+        )
+        try:
+            if diffable:
+                new, old = self._keyed(current, mode), self._keyed(before, mode)
+                inserted = new.index.difference(old.index)
+                deleted = old.index.difference(new.index)
+                common = new.index.intersection(old.index)
+                left, right = new.loc[common], old.loc[common]
+                updated = common[((left != right) & ~(left.isna() & right.isna())).any(axis=1).to_numpy()]
+        except (TypeError, ValueError):
+            diffable = False  # values that cannot be compared element-wise, e.g. nested objects
+
+        if not diffable:
+            written = self._write_table(current, path, {"sequence": sequence, "key": self.key_mode(current)})
+            self._count(full_bytes, written, "snapshots")
+            return [key]
+
+        os.remove(path)
+        if not len(inserted) and not len(deleted) and not len(updated):
+            self._count(full_bytes, 0, "unchanged")
+            return []
+
+        delta = pd.concat([
+            new.loc[inserted].assign(**{OP_COLUMN: "I"}),
+            new.loc[updated].assign(**{OP_COLUMN: "U"}),
+            old.loc[deleted].assign(**{OP_COLUMN: "D"}),
+        ]).sort_index(kind="stable")
+        delta_key = f"{self.delta_dir(key)}/{sequence:06d}.parquet"
+        written = self._write_table(self._unkeyed(delta, mode), os.path.join(directory, delta_key),
+                                    {"sequence": sequence, "key": mode})
+        self._count(full_bytes, written, "deltas")
+        return [delta_key]
+
+    def _count(self, full_bytes: int, written: int, kind: str):
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+            self.full_bytes += full_bytes
+            self.written_bytes += written
+
+    def summary(self) -> str:
+        saved = 1 - self.written_bytes / self.full_bytes if self.full_bytes else 0.0
+        return (f"{self.deltas} deltas, {self.snapshots} snapshots, {self.unchanged} unchanged, "
+                f"{self.written_bytes / 1024 / 1024:.1f} MiB stored instead of {self.full_bytes / 1024 / 1024:.1f} MiB "
+                f"({saved:.0%} saved)")
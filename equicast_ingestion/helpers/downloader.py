@@ -1,10 +1,22 @@
+import concurrent.futures
+import json
 import os
+import shutil
 import tempfile
+import time
+import uuid
 from dataclasses import dataclass, field
-from typing import Dict, List
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+import boto3
+from botocore.exceptions import ClientError
 from equicast_awsutils import S3
 
+from equicast_ingestion.helpers.delta import DeltaStore
+from equicast_ingestion.helpers.metrics import Metrics
+from equicast_ingestion.helpers.watermark import Watermarks
+
 
 @dataclass
 class Downloader:
@@ -12,7 +24,11 @@ class Downloader:
     buckets: Dict[str, str] = field(
         default_factory=lambda: {
             "fx": "equicast-tickers",
-            "stock": "equicast-tickers"
+            "stock": "equicast-tickers",
+            "fx_state": "equicast-ingestion",
+            "stock_state": "equicast-ingestion",
+            "cache": "equicast-ingestion",
+            "costs": "equicast-ingestion"
         }
     )
     files: Dict[str, Dict[str, List[str]]] = field(
@@ -23,21 +39,145 @@ class Downloader:
             },
             "stock": {
                 "mandatory": ["tickers.json"],
-                "optional": ["ticker_status.json"]
+                "optional": ["ticker_status.json", "freshness.json"]
+            },
+            "fx_state": {
+                "mandatory": [],
+                "optional": []
+            },
+            "stock_state": {
+                "mandatory": [],
+                "optional": []
+            },
+            "cache": {
+                "mandatory": [],
+                "optional": ["response_cache.tar"]
+            },
+            "costs": {
+                "mandatory": [],
+                "optional": []
             }
         }
     )
+    cache_dir: Optional[str] = None  # persistent cache, unchanged objects only cost a HEAD request
+    max_workers: int = 8
+    part_size: int = 8 * 1024 * 1024
+    multipart_threshold: int = 16 * 1024 * 1024  # larger objects are fetched as parallel ranged GETs
+    endpoint_url: Optional[str] = None  # e.g. a local S3 stand-in
+    client_factory: Optional[Callable[..., Any]] = None  # returns a boto3-compatible S3 client
+    metrics: Metrics = field(default_factory=Metrics)
     temp_dir: str = field(init=False)
 
     def __post_init__(self):
         self.temp_dir = tempfile.mkdtemp(prefix="downloads_")
         os.makedirs(self.temp_dir, exist_ok=True)
 
+    def _client(self):
+        if self.client_factory:
+            return self.client_factory(region_name=self.region_name, endpoint_url=self.endpoint_url)
+        return boto3.client("s3", region_name=self.region_name, endpoint_url=self.endpoint_url)
+
+    def _ranged_get(self, client, bucket: str, key: str, etag: str, size: int, path: Path):
+        with open(path, "wb") as f:
+            f.truncate(size)
+
+        def fetch(start: int):
+            end = min(start + self.part_size, size) - 1
+            body = client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag)["Body"]
+            with open(path, "r+b") as f:
+                f.seek(start)
+                shutil.copyfileobj(body, f)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(fetch, range(0, size, self.part_size)))
+
+    def _fetch(self, client, bucket: str, key: str) -> Tuple[str, int]:
+        cached = Path(self.cache_dir, bucket, key)
+        meta_path = cached.with_name(f"{cached.name}.meta.json")
+        meta = {}
+        if cached.exists() and meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+        try:
+            head = client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return "missing", 0
+            raise
+
+        etag, size = head["ETag"], head["ContentLength"]
+        last_modified = head["LastModified"].isoformat() if head.get("LastModified") else None
+        if meta.get("etag") == etag and meta.get("last_modified") == last_modified and meta.get("size") == size:
+            return "not_modified", 0
+
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cached.with_name(f"{cached.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            if size > self.multipart_threshold:
+                self._ranged_get(client, bucket, key, etag, size, tmp_path)
+            else:
+                body = client.get_object(Bucket=bucket, Key=key, IfMatch=etag)["Body"]
+                with open(tmp_path, "wb") as f:
+                    shutil.copyfileobj(body, f)
+            os.replace(tmp_path, cached)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"etag": etag, "last_modified": last_modified, "size": size}, f)
+        return "downloaded", size
+
+    def _cached_download(self, bucket: str, files: List[dict]) -> dict:
+        client = self._client()
+        status = {"downloaded": [], "not_modified": [], "missing_mandatory": [], "bytes": 0}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(lambda file: self._fetch(client, bucket, file['key']), files)
+            for file, (state, size) in zip(files, results):
+                if state == "missing":
+                    if file['mandatory']:
+                        status["missing_mandatory"].append(file['key'])
+                    continue
+
+                local = Path(self.temp_dir, file['key'])
+                local.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(Path(self.cache_dir, bucket, file['key']), local)
+                status["downloaded"].append(file['key'])
+                if state == "not_modified":
+                    status["not_modified"].append(file['key'])
+                status["bytes"] += size
+
+        print(f"🗄️ {len(status['not_modified'])} of {len(files)} files unchanged since the cached copy.")
+        return status
+
+    def _download_files(self, data_type: str, files: List[dict]) -> dict:
+        bucket = self.buckets[data_type]
+        started = time.monotonic()
+        try:
+            if self.cache_dir:
+                status = self._cached_download(bucket, files)
+            else:
+                s3_obj = S3(bucket_name=bucket, region_name=self.region_name)
+                status = s3_obj.download_files(local_dir=self.temp_dir, files=files)
+        except Exception as e:
+            self.metrics.record(f"download.{data_type}", bucket, time.monotonic() - started, e, items=len(files))
+            raise
+
+        paths = [os.path.join(self.temp_dir, file['key']) for file in files]
+        missing = status.get("missing_mandatory", [])
+        self.metrics.record(
+            f"download.{data_type}", bucket, time.monotonic() - started,
+            f"{len(missing)} mandatory files missing" if missing else None,
+            items=len(files), not_modified=len(status.get("not_modified", [])) if self.cache_dir else None,
+            bytes=status["bytes"] if self.cache_dir else sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+        )
+        return status
+
     def download(self, data_type: str):
         if data_type not in self.buckets:
-            raise ValueError("data_type must be either 'fx' or 'stock'.")
+            raise ValueError(f"data_type must be one of {list(self.buckets)}.")
 
-        bucket_name = self.buckets[data_type]
         files = []
         for file_name in self.files[data_type]["mandatory"]:
             files.append({'key': file_name, 'mandatory': True})
@@ -45,8 +185,7 @@ class Downloader:
         for file_name in self.files[data_type]["optional"]:
             files.append({'key': file_name, 'mandatory': False})
 
-        s3_obj = S3(bucket_name=bucket_name, region_name=self.region_name)
-        status = s3_obj.download_files(local_dir=self.temp_dir, files=files)
+        status = self._download_files(data_type, files)
 
         if len(status.get("missing_mandatory", [])) > 0:
             print(f"⚠️ Some of the mandatory files are missing: {status.get('missing_mandatory')}")
@@ -54,3 +193,61 @@ class Downloader:
             print(f"✅ Successfully downloaded {len(files)} files")
 
         return self.temp_dir
+
+    def download_keys(self, data_type: str, keys: Iterable[str]):
+        if data_type not in self.buckets:
+            raise ValueError(f"data_type must be one of {list(self.buckets)}.")
+
+        files = [{'key': key, 'mandatory': False} for key in keys]
+        if not files:
+            return self.temp_dir
+
+        status = self._download_files(data_type, files)
+        print(f"✅ Downloaded {len(status.get('downloaded', []))} of {len(files)} files")
+
+        return self.temp_dir
+
+    def _list(self, data_type: str, prefix: str) -> List[str]:
+        client, keys, token = self._client(), [], None
+        while True:
+            kwargs = {"ContinuationToken": token} if token else {}
+            response = client.list_objects_v2(Bucket=self.buckets[data_type], Prefix=prefix, **kwargs)
+            keys.extend(item["Key"] for item in response.get("Contents", []))
+            if not response.get("IsTruncated"):
+                return keys
+            token = response["NextContinuationToken"]
+
+    def _list_all(self, data_type: str, prefixes: Iterable[str]) -> List[str]:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return [key for keys in executor.map(lambda prefix: self._list(data_type, prefix), prefixes)
+                    for key in keys]
+
+    def download_fx_state(self, pairs: List[str], delta: bool = False):
+        watermarks = Watermarks(self.temp_dir)
+        self.download_keys("fx_state", [watermarks.key(fx) for fx in pairs])
+        watermarks.load(pairs)
+        files = watermarks.files()
+        # Deltas written since each snapshot, without them the state is rebuilt from a stale snapshot. Only runs
+        # with delta output write them, the others skip a LIST per file.
+        deltas = self._list_all("fx_state", [f"{DeltaStore.delta_dir(key)}/" for key in files]) if delta else []
+        self.download_keys("fx_state", [*files, *deltas])
+
+        return self.temp_dir
+
+    def download_costs(self, mode: str):
+        # Every chunk's 'item_costs*.jsonl' of the previous runs, the splitter balances the next chunks with them
+        keys = self._list("costs", f"item_costs/{mode}/")
+        self.download_keys("costs", [key for key in keys if key.endswith(".jsonl")])
+
+        return os.path.join(self.temp_dir, "item_costs", mode)
+
+    def download_stock_state(self, tickers: List[str]):
+        # Uploaded as 'ticker=<ticker>/...', restored in the '<ticker>/...' layout StockProcessor writes
+        keys = self._list_all("stock_state", [f"ticker={ticker}/" for ticker in dict.fromkeys(tickers)])
+        self.download_keys("stock_state", [key for key in keys if key.endswith(".parquet")])
+        for ticker in dict.fromkeys(tickers):
+            source = os.path.join(self.temp_dir, f"ticker={ticker}")
+            if os.path.isdir(source):
+                os.replace(source, os.path.join(self.temp_dir, ticker))
+
+        return self.temp_dir
@@ -0,0 +1,140 @@
+import concurrent.futures
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from equicast_ingestion.helpers.metrics import Metrics
+
+
+def _encode_file(ipc_path: str, path: str, compression: str, compression_level: Optional[int]) -> tuple:
+    started = time.perf_counter()
+    try:
+        with pa.memory_map(ipc_path) as source:
+            table = pa.ipc.open_file(source).read_all()  # zero-copy view of the handed-off buffers
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            pq.write_table(table, tmp_path, compression=compression, compression_level=compression_level)
+        os.replace(tmp_path, path)
+    finally:
+        os.remove(ipc_path)
+    return time.perf_counter() - started, table.num_rows
+
+
+@dataclass
+class ParquetEncoder:
+    processes: int = 0  # 0 encodes on the calling thread, -1 uses one process per CPU
+    compression: str = "snappy"
+    compression_level: Optional[int] = None
+    max_in_flight: int = 0  # files handed off but not yet written, 0 uses twice the processes
+    metrics: Metrics = field(default_factory=Metrics)
+    offloaded: float = field(default=0.0, init=False)  # encoding seconds moved off the calling threads
+    handoff: float = field(default=0.0, init=False)  # seconds the calling threads spent handing off
+    files: int = field(default=0, init=False)
+    _executor: Optional[concurrent.futures.ProcessPoolExecutor] = field(default=None, init=False, repr=False)
+    _slots: Optional[threading.BoundedSemaphore] = field(default=None, init=False, repr=False)
+    _ipc_dir: Optional[str] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.processes < 0:
+            self.processes = os.cpu_count() or 1
+        if self.processes:
+            self._slots = threading.BoundedSemaphore(self.max_in_flight or 2 * self.processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                # Buffers are exchanged through memory-mapped files, on tmpfs when the runner has one
+                shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+                self._ipc_dir = tempfile.mkdtemp(prefix="encoder_", dir=shm)
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+                )
+
+    def _inline(self, df: pd.DataFrame, path: str, item: Optional[str], stage: str) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        started = time.perf_counter()
+        try:
+            with self.metrics.stage(stage):
+                df.to_parquet(path, compression=self.compression, compression_level=self.compression_level)
+        except Exception as e:
+            self.metrics.record(stage, item, time.perf_counter() - started, e)
+            future.set_exception(e)
+            return future
+
+        self.metrics.record(stage, item, time.perf_counter() - started, rows=len(df), bytes=os.path.getsize(path))
+        future.set_result(path)
+        return future
+
+    def write(self, df: pd.DataFrame, path: str, item: Optional[str] = None,
+              stage: str = "encode") -> concurrent.futures.Future:
+        with self._lock:
+            self.files += 1
+        if not self.processes:
+            return self._inline(df, path, item, stage)
+
+        self._start()
+        self._slots.acquire()
+        started = time.perf_counter()
+        try:
+            # Only the handoff runs in this process, the encoding itself is not seen by a profiler here
+            with self.metrics.stage(f"{stage}.handoff"):
+                table = pa.Table.from_pandas(df)
+                ipc_path = os.path.join(self._ipc_dir, f"{uuid.uuid4().hex}.arrow")
+                with pa.OSFile(ipc_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            encoded = self._executor.submit(_encode_file, ipc_path, path, self.compression, self.compression_level)
+        except Exception:
+            self._slots.release()
+            raise
+        finally:
+            with self._lock:
+                self.handoff += time.perf_counter() - started
+
+        future = concurrent.futures.Future()
+
+        def done(result: concurrent.futures.Future):
+            self._slots.release()
+            try:
+                seconds, rows = result.result()
+            except Exception as e:
+                self.metrics.record(stage, item, 0.0, e)
+                future.set_exception(e)
+                return
+
+            with self._lock:
+                self.offloaded += seconds
+            self.metrics.record(stage, item, seconds, rows=rows, bytes=os.path.getsize(path), offloaded=True)
+            future.set_result(path)
+
+        encoded.add_done_callback(done)
+        return future
+
+    def summary(self) -> str:
+        if not self.processes:
+            return f"{self.files} files encoded inline ({self.compression})"
+        return (f"{self.files} files encoded by {self.processes} processes ({self.compression}), "
+                f"{self.offloaded:.1f}s moved off the I/O threads for {self.handoff:.1f}s of hand-off")
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._ipc_dir:
+            shutil.rmtree(self._ipc_dir, ignore_errors=True)
+            self._ipc_dir = None
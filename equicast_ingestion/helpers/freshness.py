@@ -0,0 +1,42 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from equicast_ingestion.helpers.shared_state import SharedState
+
+# Slightly shorter than the matching cron interval so a late scheduled run still refreshes
+DEFAULT_TTLS = {
+    "prices": timedelta(hours=20),
+    "dividends": timedelta(days=6, hours=20),
+    "company_profile": timedelta(days=27),
+    "fundamentals": timedelta(days=88),
+}
+
+
+@dataclass
+class Freshness(SharedState):
+    ttls: Dict[str, timedelta] = field(default_factory=lambda: dict(DEFAULT_TTLS))
+
+    def merge(self, entries: Dict[str, Dict[str, str]]):
+        # The latest fetch of each dataset wins, whichever chunk made it
+        with self._lock:
+            for item, datasets in entries.items():
+                current = self.entries.setdefault(item, {})
+                for dataset, fetched_at in datasets.items():
+                    if dataset not in current or (
+                            datetime.fromisoformat(fetched_at) > datetime.fromisoformat(current[dataset])):
+                        current[dataset] = fetched_at
+
+    def fetched_at(self, item: str, dataset: str) -> Optional[datetime]:
+        value = self.entries.get(item, {}).get(dataset)
+        return datetime.fromisoformat(value) if value else None
+
+    def is_stale(self, item: str, dataset: str, now: Optional[datetime] = None) -> bool:
+        fetched_at = self.fetched_at(item, dataset)
+        if fetched_at is None or dataset not in self.ttls:
+            return True
+        return (now or datetime.now(timezone.utc)) - fetched_at >= self.ttls[dataset]
+
+    def mark(self, item: str, dataset: str, now: Optional[datetime] = None):
+        with self._lock:
+            self.entries.setdefault(item, {})[dataset] = (now or datetime.now(timezone.utc)).isoformat()
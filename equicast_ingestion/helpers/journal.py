@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+
+def checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def run_key(*inputs: str) -> str:
+    # A CI re-run keeps its run id, local runs only resume on the same day, both for the same inputs
+    run = os.environ.get("GITHUB_RUN_ID") or datetime.now(timezone.utc).date().isoformat()
+    digest = hashlib.sha256()
+    for value in (run, *inputs):
+        digest.update(value.encode("utf-8") + b"\0")
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class Journal:
+    path: str
+    run: Optional[str] = None  # entries of other runs are ignored, so a reused work dir never skips new work
+    entries: Dict[Tuple[str, str], dict] = field(default_factory=dict, init=False)
+    verified: int = field(default=0, init=False)
+    corrupt: int = field(default=0, init=False)
+    expired: int = field(default=0, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by a cancelled run, its unit is simply redone
+                if entry.get("run") != self.run:
+                    self.expired += 1
+                    continue
+                self.entries[(entry["item"], entry["dataset"])] = entry
+        return self
+
+    def record(self, item: str, dataset: str, directory: str, files: List[str], **fields):
+        entry = {
+            "item": item,
+            "dataset": dataset,
+            "files": {key: checksum(os.path.join(directory, key)) for key in files},
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+            "run": self.run,
+            **fields
+        }
+        with self._lock:
+            self.entries[(item, dataset)] = entry
+            # Append-only and synced, a run killed at any point leaves every earlier line intact
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, sort_keys=True) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def completed(self, item: str, dataset: str, directory: str) -> Optional[dict]:
+        entry = self.entries.get((item, dataset))
+        if entry is None:
+            return None
+
+        for key, expected in entry["files"].items():
+            path = os.path.join(directory, key)
+            if not os.path.exists(path) or checksum(path) != expected:
+                with self._lock:
+                    self.corrupt += 1
+                print(f"⚠️ Journaled output '{key}' of {item} is missing or corrupt, fetching it again.")
+                return None
+
+        with self._lock:
+            self.verified += 1
+        return entry
+
+    def clear(self):
+        # Once a run completed there is nothing left to resume
+        with self._lock:
+            self.entries.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def summary(self) -> str:
+        return (f"{self.verified} units resumed from the journal, {self.corrupt} refetched as missing or corrupt, "
+                f"{self.expired} entries of other runs ignored")
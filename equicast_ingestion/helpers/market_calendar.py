@@ -0,0 +1,149 @@
+import functools
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Set
+
+
+def _easter(year: int) -> date:
+    # Anonymous Gregorian algorithm
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l_ = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l_) // 451
+    month, day = divmod(h + l_ - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    # n >= 1 counts from the start of the month, n = -1 is the last one
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _nyse_observed(day: date) -> date:
+    return day - timedelta(days=1) if day.weekday() == 5 else day + timedelta(days=1) if day.weekday() == 6 else day
+
+
+def _nyse_holidays(year: int) -> Set[date]:
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _nyse_observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _nyse_observed(date(year, 12, 25)),
+    }
+    if date(year, 1, 1).weekday() != 5:  # a Saturday New Year's Day is not observed on the Friday before
+        holidays.add(_nyse_observed(date(year, 1, 1)))
+    if year >= 2022:
+        holidays.add(_nyse_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+
+def _lse_holidays(year: int) -> Set[date]:
+    def substitute(day: date, taken: Set[date]) -> date:
+        while day.weekday() >= 5 or day in taken:
+            day += timedelta(days=1)
+        return day
+
+    christmas = substitute(date(year, 12, 25), set())
+    easter = _easter(year)
+    return {
+        substitute(date(year, 1, 1), set()),
+        easter - timedelta(days=2),  # Good Friday
+        easter + timedelta(days=1),  # Easter Monday
+        _nth_weekday(year, 5, 0, 1),  # Early May bank holiday
+        _nth_weekday(year, 5, 0, -1),  # Spring bank holiday
+        _nth_weekday(year, 8, 0, -1),  # Summer bank holiday
+        christmas,
+        substitute(date(year, 12, 26), {christmas}),  # Boxing Day
+    }
+
+
+def _fx_holidays(year: int) -> Set[date]:
+    return {date(year, 1, 1), date(year, 12, 25)}
+
+
+@dataclass(frozen=True)
+class Market:
+    name: str
+    opens: timedelta  # UTC offset from midnight of the session day, earliest across daylight saving
+    closes: timedelta  # latest UTC offset by which the day's bar is final
+    holidays: Callable[[int], Set[date]] = lambda year: set()
+    weekdays: frozenset = frozenset(range(5))
+
+
+MARKETS: Dict[str, Market] = {
+    "NYSE": Market("NYSE", timedelta(hours=13, minutes=30), timedelta(hours=22), _nyse_holidays),
+    "LSE": Market("LSE", timedelta(hours=7), timedelta(hours=17, minutes=30), _lse_holidays),
+    # FX trades 24/5, Monday's session opens on Sunday evening UTC
+    "FX": Market("FX", timedelta(hours=-2), timedelta(hours=24), _fx_holidays),
+    # Exchanges without holiday rules here, every weekday counts so nothing is skipped wrongly
+    "WEEKDAYS": Market("WEEKDAYS", timedelta(0), timedelta(hours=24)),
+}
+MARKETS["NASDAQ"] = MARKETS["NYSE"]
+
+
+@dataclass
+class MarketCalendar:
+    default_market: str = "NYSE"  # market of tickers without an exchange suffix
+    suffixes: Dict[str, str] = field(default_factory=lambda: {".L": "LSE", ".IL": "LSE"})
+    skipped: Dict[str, int] = field(default_factory=dict, init=False)  # market -> fetches avoided
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.default_market not in MARKETS:
+            raise ValueError(f"Unknown market '{self.default_market}'. Expected any of {list(MARKETS)}.")
+
+    def market(self, ticker: str) -> str:
+        if "/" in ticker:
+            return "FX"
+        if "." not in ticker:
+            return self.default_market
+        return self.suffixes.get(ticker[ticker.rindex("."):].upper(), "WEEKDAYS")
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _holidays(name: str, year: int) -> frozenset:
+        return frozenset(MARKETS[name].holidays(year))
+
+    def is_session(self, name: str, day: date) -> bool:
+        return day.weekday() in MARKETS[name].weekdays and day not in self._holidays(name, day.year)
+
+    def has_session(self, name: str, since: datetime, now: Optional[datetime] = None) -> bool:
+        # True when a session was open at any point after 'since', i.e. the upstream may have new bars
+        now = now or datetime.now(timezone.utc)
+        market = MARKETS[name]
+        day = (since - market.closes).date()
+        while True:
+            start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+            if start + market.opens >= now:
+                return False
+            if start + market.closes > since and self.is_session(name, day):
+                return True
+            day += timedelta(days=1)
+
+    def should_fetch(self, item: str, since: Optional[datetime], now: Optional[datetime] = None) -> bool:
+        if since is None:
+            return True
+        name = self.market(item)
+        if self.has_session(name, since, now):
+            return True
+        with self._lock:
+            self.skipped[name] = self.skipped.get(name, 0) + 1
+        return False
+
+    def summary(self) -> str:
+        if not self.skipped:
+            return "no fetches avoided"
+        markets = ", ".join(f"{name} {count}" for name, count in sorted(self.skipped.items()))
+        return f"{sum(self.skipped.values())} fetches avoided without a session since the last fetch ({markets})"
@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from equicast_ingestion.helpers.concurrency import ConcurrencyController
+from equicast_ingestion.helpers.profiler import Profiler
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def parquet_rows(path) -> Optional[int]:
+    try:
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows  # footer only, the data pages are not read
+    except Exception:
+        return None
+
+
+@dataclass
+class Metrics:
+    profiler: Optional[Profiler] = None  # opt-in, every span is also timed as a profiler stage
+    records: List[dict] = field(default_factory=list, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @staticmethod
+    def error_class(error) -> Optional[str]:
+        if error is None or error == "":
+            return None
+        if isinstance(error, BaseException):
+            return type(error).__name__
+        return "Throttled" if ConcurrencyController.is_throttled(str(error)) else "Error"
+
+    def record(self, stage: str, item: Optional[str] = None, latency: float = 0.0, error=None, **fields):
+        record = {
+            "ts": round(time.time(), 3),
+            "stage": stage,
+            "item": item,
+            "latency": round(latency, 4),
+            "error_class": self.error_class(error),
+            **{key: value for key, value in fields.items() if value is not None}
+        }
+        with self._lock:
+            self.records.append(record)
+
+    def stage(self, name: str):
+        return self.profiler.stage(name) if self.profiler else nullcontext()
+
+    @contextmanager
+    def span(self, stage: str, item: Optional[str] = None, **fields):
+        started = time.monotonic()
+        try:
+            with self.stage(stage):
+                yield fields
+        except Exception as e:
+            self.record(stage, item, time.monotonic() - started, e, **fields)
+            raise
+        self.record(stage, item, time.monotonic() - started, **fields)
+
+    def summary(self) -> Dict[str, dict]:
+        stages = defaultdict(list)
+        with self._lock:
+            for record in self.records:
+                stages[record["stage"]].append(record)
+
+        summary = {}
+        for stage, records in sorted(stages.items()):
+            latencies = [record["latency"] for record in records]
+            summary[stage] = {
+                "count": len(records),
+                "errors": sum(1 for record in records if record["error_class"]),
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p99": percentile(latencies, 99),
+                "max": max(latencies),
+                "total": sum(latencies),
+                "retries": sum(1 for record in records if record.get("attempt", 1) > 1),
+                "rows": sum(record.get("rows", 0) for record in records),
+                "bytes": sum(record.get("bytes", 0) for record in records),
+                "workers": max(record.get("workers", 0) for record in records),
+            }
+        return summary
+
+    def write(self, path: str):
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+        with open(f"{os.path.splitext(path)[0]}_summary.json", "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=4)
+
+    def write_summary(self, title: str):
+        summary_path = os.environ.get("GITHUB_STEP_SUMMARY")
+        if not summary_path:
+            return
+
+        lines = [
+            f"### 📊 {title}",
+            "| Stage | Count | Errors | Retries | p50 (s) | p90 (s) | p99 (s) | Max (s) | Rows | Bytes |",
+            "|-------|-------|--------|---------|---------|---------|---------|---------|------|-------|",
+        ]
+        for stage, values in self.summary().items():
+            lines.append(
+                f"| `{stage}` | {values['count']} | {values['errors']} | {values['retries']} | {values['p50']:.3f} | "
+                f"{values['p90']:.3f} | {values['p99']:.3f} | {values['max']:.3f} | {values['rows']} | "
+                f"{values['bytes']} |"
+            )
+
+        with open(summary_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n\n")
+
+    def write_outputs(self, prefix: str = ""):
+        gh_output = os.environ.get("GITHUB_OUTPUT")
+        if not gh_output:
+            return
+
+        with open(gh_output, "a", encoding="utf-8") as f:
+            for stage, values in self.summary().items():
+                if not stage.startswith(prefix):
+                    continue
+                name = stage.replace(".", "_")
+                f.write(f"{name}_count={values['count']}\n")
+                f.write(f"{name}_errors={values['errors']}\n")
+                f.write(f"{name}_p50_ms={values['p50'] * 1000:.0f}\n")
+                f.write(f"{name}_p99_ms={values['p99'] * 1000:.0f}\n")
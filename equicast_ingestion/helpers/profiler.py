@@ -0,0 +1,126 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class Profiler:
+    interval: float = 0.01  # seconds between samples of every thread's stack
+    max_depth: int = 64
+    samples: Counter = field(default_factory=Counter, init=False)  # collapsed stack -> sample count
+    stages: Dict[str, dict] = field(default_factory=dict, init=False)
+    sampled: int = field(default=0, init=False)
+    wall: float = field(default=0.0, init=False)
+    _active: Dict[int, List[str]] = field(default_factory=dict, init=False, repr=False)  # thread -> open stages
+    _stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _thread: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+    _started: float = field(default=0.0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self._stop.clear()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.wall += time.perf_counter() - self._started
+
+    @staticmethod
+    def _frame(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        # Stacks of all threads at a fixed rate, a sample costs a frame walk instead of a hook on every call
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(self._frame(frame))
+                    frame = frame.f_back
+                # Pool threads are merged by pool, e.g. 'ThreadPoolExecutor-0_12' into 'ThreadPoolExecutor-0'
+                thread = re.sub(r"_\d+$", "", names.get(ident, "thread"))
+                stages = [f"[{stage}]" for stage in list(self._active.get(ident, ()))]
+                self.samples[";".join([thread, *stages, *reversed(stack)])] += 1
+            self.sampled += 1
+
+    @contextmanager
+    def stage(self, name: str):
+        # Wall time of the stage and CPU time of the thread running it, waiting on I/O or locks is wall only
+        stages = self._active.setdefault(threading.get_ident(), [])
+        stages.append(name)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            stages.pop()
+            with self._lock:
+                totals = self.stages.setdefault(name, {"count": 0, "wall": 0.0, "cpu": 0.0, "max": 0.0})
+                totals["count"] += 1
+                totals["wall"] += wall
+                totals["cpu"] += cpu
+                totals["max"] = max(totals["max"], wall)
+
+    def write(self, directory: str, name: str = "profile"):
+        # '<name>.collapsed' feeds flamegraph.pl or speedscope, '<name>_stages.json' has the stage table
+        with open(os.path.join(directory, f"{name}.collapsed"), "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+        with self._lock:
+            stages = {stage: dict(totals) for stage, totals in sorted(self.stages.items())}
+        with open(os.path.join(directory, f"{name}_stages.json"), "w", encoding="utf-8") as f:
+            json.dump({"interval": self.interval, "samples": self.sampled, "wall": self.wall, "stages": stages},
+                      f, indent=4)
+
+    def write_summary(self, title: str):
+        summary_path = os.environ.get("GITHUB_STEP_SUMMARY")
+        if not summary_path:
+            return
+
+        lines = [
+            f"### 🔬 {title}",
+            f"{self.sampled} samples every {self.interval * 1000:.0f} ms over {self.wall:.1f} s. "
+            f"Stages are inclusive of the stages nested in them.",
+            "",
+            "| Stage | Count | Wall (s) | CPU (s) | CPU % | Max (s) |",
+            "|-------|-------|----------|---------|-------|---------|",
+        ]
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1]["wall"], reverse=True)
+        for stage, totals in stages:
+            share = totals["cpu"] / totals["wall"] if totals["wall"] else 0.0
+            lines.append(
+                f"| `{stage}` | {totals['count']} | {totals['wall']:.3f} | {totals['cpu']:.3f} | {share:.0%} | "
+                f"{totals['max']:.3f} |"
+            )
+
+        with open(summary_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n\n")
+
+    def summary(self) -> str:
+        return f"{self.sampled} samples of {len(self.samples)} distinct stacks, {len(self.stages)} stages timed"
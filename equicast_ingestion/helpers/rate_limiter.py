@@ -0,0 +1,164 @@
+import collections
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict
+
+from equicast_ingestion.helpers.concurrency import ConcurrencyController
+
+
+@dataclass
+class TokenBucket:
+    rate: float  # tokens per second, <= 0 disables the limit
+    burst: float = 10.0
+    waited: float = field(default=0.0, init=False)
+    _tokens: float = field(init=False)
+    _updated: float = field(init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        self.burst = max(1.0, self.burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                delay = (tokens - self._tokens) / self.rate
+                self.waited += delay
+            time.sleep(delay)
+
+
+@dataclass
+class CircuitBreaker:
+    error_threshold: float = 0.5  # share of failed calls in the window that opens the circuit, 0 disables
+    window: int = 50
+    min_calls: int = 20
+    cool_down: float = 30.0  # seconds without dispatching once open
+    opened: int = field(default=0, init=False)
+    _outcomes: Deque[bool] = field(init=False, repr=False)
+    _state: str = field(default="closed", init=False)
+    _opened_at: float = field(default=0.0, init=False)
+    _condition: threading.Condition = field(default_factory=threading.Condition, init=False, repr=False)
+
+    def __post_init__(self):
+        self._outcomes = collections.deque(maxlen=self.window)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def wait(self):
+        with self._condition:
+            while True:
+                if self._state == "closed":
+                    return
+                if self._state == "open":
+                    remaining = self._opened_at + self.cool_down - time.monotonic()
+                    if remaining <= 0:
+                        # Half-open lets exactly one trial call through, its outcome decides for everyone
+                        self._state = "half_open"
+                        return
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait()
+
+    def _open(self):
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
+        print(f"⛔ Circuit opened, pausing upstream calls for {self.cool_down:g}s.")
+
+    def record(self, error: bool):
+        with self._condition:
+            if self._state == "half_open":
+                if error:
+                    self._open()
+                else:
+                    self._state = "closed"
+                self._condition.notify_all()
+                return
+
+            self._outcomes.append(error)
+            failures = sum(self._outcomes)
+            if (self._state == "closed" and self.error_threshold > 0 and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.error_threshold):
+                self._open()
+                self._condition.notify_all()
+
+
+@dataclass
+class Upstream:
+    name: str
+    bucket: TokenBucket
+    breaker: CircuitBreaker
+
+    @contextmanager
+    def guard(self):
+        self.breaker.wait()
+        self.bucket.acquire()
+        try:
+            yield
+        except Exception as e:
+            # Only throttling and connection failures say something about the upstream, a bad symbol does not
+            self.breaker.record(ConcurrencyController.is_throttled(str(e)) or isinstance(e, OSError))
+            raise
+        self.breaker.record(False)
+
+    def wrap(self, extractor):
+        return _GuardedExtractor(self, extractor)
+
+    def summary(self) -> str:
+        rate = f"{self.bucket.rate:g}/s burst {self.bucket.burst:g}" if self.bucket.rate > 0 else "unlimited"
+        return (f"'{self.name}' {rate}, workers waited {self.bucket.waited:.1f}s for tokens, "
+                f"circuit opened {self.breaker.opened} times")
+
+
+class _GuardedExtractor:
+    # Guards every 'extract_*' call, so stages that skip the upstream do not spend tokens
+    def __init__(self, upstream: Upstream, extractor):
+        self._upstream = upstream
+        self._extractor = extractor
+
+    def __getattr__(self, name: str):
+        value = getattr(self._extractor, name)
+        if not name.startswith("extract") or not callable(value):
+            return value
+
+        def guarded(*args, **kwargs):
+            with self._upstream.guard():
+                return value(*args, **kwargs)
+
+        return guarded
+
+
+_UPSTREAMS: Dict[str, Upstream] = {}
+_UPSTREAMS_LOCK = threading.Lock()
+
+
+def get_upstream(name: str, rate: float = 0.0, burst: float = 10.0, error_threshold: float = 0.5,
+                 cool_down: float = 30.0) -> Upstream:
+    # One limiter per upstream for the whole process, every processor hitting it shares the same budget
+    with _UPSTREAMS_LOCK:
+        if name not in _UPSTREAMS:
+            _UPSTREAMS[name] = Upstream(
+                name=name,
+                bucket=TokenBucket(rate=rate, burst=burst),
+                breaker=CircuitBreaker(error_threshold=error_threshold, cool_down=cool_down)
+            )
+
+        upstream = _UPSTREAMS[name]
+        upstream.bucket.rate, upstream.bucket.burst = rate, max(1.0, burst)
+        upstream.breaker.error_threshold, upstream.breaker.cool_down = error_threshold, cool_down
+        return upstream
@@ -0,0 +1,251 @@
+import base64
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import tarfile
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+ENTRY_SUFFIX = ".json.z"
+ENTRY_NAME = re.compile(r"[0-9a-f]{2}/[0-9a-f]{64}\.json\.z")  # the only members restored from an archive
+# Yahoo Finance endpoints whose data changes a few times a day at most, checked after the configured TTLs
+ENDPOINT_TTLS = {
+    "*/v10/finance/quoteSummary/*": 6 * 3600.0,  # profiles, fundamentals and analyst forecasts
+    "*/ws/fundamentals-timeseries/*": 6 * 3600.0,  # financial statements
+}
+
+
+@dataclass
+class ResponseCache:
+    directory: str
+    default_ttl: float = 900.0  # seconds
+    ttls: Dict[str, float] = field(default_factory=dict)  # URL glob -> seconds, first match wins, then ENDPOINT_TTLS
+    max_bytes: int = 512 * 1024 * 1024
+    ignored_params: tuple = ("crumb", "_")
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+    _size: int = field(default=0, init=False, repr=False)
+    _originals: Dict[str, Callable] = field(default_factory=dict, init=False, repr=False)  # transport -> method
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path in self._entries())
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(ENTRY_SUFFIX):
+                    yield os.path.join(root, name)
+
+    def normalize(self, method: str, url: str, body: Optional[bytes] = None) -> str:
+        parts = urlsplit(url)
+        query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if k not in self.ignored_params)
+        normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ""))
+        digest = hashlib.sha256(f"{method.upper()} {normalized}".encode())
+        if body:
+            digest.update(body if isinstance(body, bytes) else str(body).encode())
+        return digest.hexdigest()
+
+    def ttl(self, url: str) -> float:
+        for pattern, seconds in [*self.ttls.items(), *ENDPOINT_TTLS.items()]:
+            if fnmatch.fnmatch(url, pattern):
+                return seconds
+        return self.default_ttl
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{ENTRY_SUFFIX}")
+
+    def get(self, key: str, ttl: float) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > ttl:
+                return None
+            with open(path, "rb") as f:
+                # Plain JSON, entries restored from a downloaded archive are data and never executed
+                entry = json.loads(zlib.decompress(f.read()))
+            entry["content"] = base64.b64decode(entry["content"])
+            os.utime(path, (time.time(), os.path.getmtime(path)))  # atime drives LRU eviction
+            return entry
+        except (FileNotFoundError, zlib.error, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, key: str, entry: dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {**entry, "content": base64.b64encode(entry["content"]).decode("ascii")}
+        payload = zlib.compress(json.dumps(entry).encode("utf-8"), 6)
+
+        # Write-then-rename keeps readers in other threads and processes from seeing partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += len(payload)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+                entries.append((stat.st_atime, stat.st_size, path))
+            except FileNotFoundError:
+                continue
+
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def _lookup(self, url: str, body=None) -> tuple:
+        key = self.normalize("GET", url, body)
+        entry = self.get(key, self.ttl(url))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return key, entry
+
+    def _store(self, key: str, response, content: bytes):
+        if response.status_code == 200:
+            self.put(key, {
+                "status_code": response.status_code,
+                "headers": dict(response.headers),
+                "content": content,
+                "encoding": response.encoding,
+                "reason": response.reason,
+                "url": str(response.url)
+            })
+
+    def _send(self, session, request, **kwargs):
+        # requests, e.g. extractors built on a plain requests.Session
+        original = self._originals["requests"]
+        if request.method != "GET" or kwargs.get("stream"):
+            return original(session, request, **kwargs)
+
+        import requests
+
+        key, entry = self._lookup(request.url, request.body)
+        if entry is not None:
+            response = requests.Response()
+            response.status_code = entry["status_code"]
+            response.headers = requests.structures.CaseInsensitiveDict(entry["headers"])
+            response._content = entry["content"]
+            response.encoding = entry["encoding"]
+            response.reason = entry["reason"]
+            response.url = entry["url"]
+            response.request = request
+            return response
+
+        response = original(session, request, **kwargs)
+        self._store(key, response, response.content)
+        return response
+
+    def _curl_request(self, session, method, url, params=None, **kwargs):
+        # curl_cffi, the transport of yfinance's sessions
+        original = self._originals["curl_cffi"]
+        if (str(method).upper() != "GET" or kwargs.get("stream") or kwargs.get("data") is not None
+                or kwargs.get("json") is not None or kwargs.get("content_callback")):
+            return original(session, method, url, params=params, **kwargs)
+
+        from curl_cffi.requests import Headers, Response
+
+        full_url = url
+        if params:
+            full_url = f"{url}{'&' if urlsplit(url).query else '?'}{urlencode(params, doseq=True)}"
+        key, entry = self._lookup(full_url)
+        if entry is not None:
+            response = Response()
+            response.url = entry["url"]
+            response.content = entry["content"]
+            response.status_code = entry["status_code"]
+            response.reason = entry["reason"]
+            response.headers = Headers(entry["headers"])
+            response.encoding = entry["encoding"] or "utf-8"
+            return response
+
+        response = original(session, method, url, params=params, **kwargs)
+        self._store(key, response, response.content)
+        return response
+
+    @staticmethod
+    def _transports() -> Dict[str, tuple]:
+        # Session classes and the method every request of theirs goes through, for each installed transport
+        transports = {}
+        try:
+            import requests
+
+            transports["requests"] = (requests.Session, "send", "_send")
+        except ImportError:
+            pass
+        try:
+            import curl_cffi.requests
+
+            transports["curl_cffi"] = (curl_cffi.requests.Session, "request", "_curl_request")
+        except ImportError:
+            pass
+        return transports
+
+    @staticmethod
+    def _patched(hook: Callable) -> Callable:
+        def method(session, *args, **kwargs):
+            return hook(session, *args, **kwargs)
+        return method
+
+    def install(self):
+        for name, (session_class, method, hook) in self._transports().items():
+            if name not in self._originals:
+                self._originals[name] = getattr(session_class, method)
+                setattr(session_class, method, self._patched(getattr(self, hook)))
+        return self
+
+    def uninstall(self):
+        transports = self._transports()
+        for name, original in list(self._originals.items()):
+            session_class, method, _ = transports[name]
+            setattr(session_class, method, original)
+            del self._originals[name]
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0.0
+        return (f"{self.hits} hits, {self.misses} misses ({ratio:.0%} hit rate), {self.evictions} evictions, "
+                f"{self._size / 1024 / 1024:.1f} MiB on disk")
+
+    def pack(self, archive_path: str) -> str:
+        with tarfile.open(archive_path, "w") as tar:
+            for path in self._entries():
+                tar.add(path, arcname=os.path.relpath(path, self.directory))
+        return archive_path
+
+    def unpack(self, archive_path: str):
+        if os.path.exists(archive_path):
+            with tarfile.open(archive_path, "r") as tar:
+                # Only regular files named like entries, so a crafted archive cannot write elsewhere. The 'data'
+                # filter is added on interpreters that ship it (3.10.12+).
+                members = [member for member in tar.getmembers() if member.isfile() and ENTRY_NAME.fullmatch(
+                    member.name)]
+                kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+                tar.extractall(self.directory, members=members, **kwargs)
+            self._size = sum(os.path.getsize(path) for path in self._entries())
+        return self
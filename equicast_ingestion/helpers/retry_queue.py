@@ -0,0 +1,68 @@
+import concurrent.futures
+import heapq
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterable
+
+from tqdm import tqdm
+
+
+@dataclass
+class RetryQueue:
+    max_workers: int
+    max_attempts: int = 5
+    base_delay: float = 2.0
+    max_delay: float = 30.0
+    desc: str = "Processing"
+    unit: str = "item"
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def run(self, items: Iterable[Hashable], work: Callable[[Hashable], dict]) -> Dict[Hashable, dict]:
+        items = list(dict.fromkeys(items))
+        sequence = itertools.count()
+        scheduled = [(0.0, next(sequence), item) for item in items]
+        attempts = {item: 0 for item in items}
+        pending = {}
+        results = {}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor, \
+                tqdm(total=len(items), desc=self.desc, unit=self.unit) as progress:
+            while scheduled or pending:
+                now = time.monotonic()
+                while scheduled and scheduled[0][0] <= now:
+                    _, _, item = heapq.heappop(scheduled)
+                    attempts[item] += 1
+                    pending[executor.submit(work, item)] = item
+
+                timeout = max(scheduled[0][0] - now, 0) if scheduled else None
+                if not pending:
+                    time.sleep(timeout)
+                    continue
+
+                done, _ = concurrent.futures.wait(
+                    pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"success": False, "error": str(e)}
+                    result["attempts"] = attempts[item]
+
+                    if result.get("error") and result.get("retry", True) and attempts[item] < self.max_attempts:
+                        delay = self.backoff(attempts[item])
+                        print(f"🔁 Retrying {item} in {delay:.1f}s (attempt {attempts[item] + 1}/"
+                              f"{self.max_attempts}): {result['error']}")
+                        heapq.heappush(scheduled, (time.monotonic() + delay, next(sequence), item))
+                        continue
+
+                    results[item] = result
+                    progress.update(1)
+
+        return results
@@ -0,0 +1,68 @@
+import abc
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+from equicast_ingestion.helpers.work_queue import CONFLICT_CODES
+
+
+@dataclass
+class SharedState(abc.ABC):
+    # A JSON file of entries every chunk updates, e.g. 'ticker_status.json' or 'freshness.json'
+    entries: Dict[str, Any] = field(default_factory=dict, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def load(self, path: str):
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        return self
+
+    def save(self, path: str):
+        with self._lock:
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=4, sort_keys=True)
+            os.replace(f"{path}.tmp", path)
+
+    @abc.abstractmethod
+    def merge(self, entries: Dict[str, Any]):
+        ...
+
+    @staticmethod
+    def _get(client, bucket: str, key: str) -> Tuple[Optional[dict], Optional[str]]:
+        try:
+            response = client.get_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None, None
+            raise
+        return json.loads(response["Body"].read()), response["ETag"]
+
+    def sync(self, bucket: str, key: str, region_name: str = "eu-west-1", endpoint_url: Optional[str] = None,
+             client_factory: Optional[Callable[..., Any]] = None, max_attempts: int = 5) -> bool:
+        # Read, merge and write back only if no other chunk wrote in between, otherwise merge their copy too
+        factory = client_factory or (lambda **kwargs: boto3.client("s3", **kwargs))
+        client = factory(region_name=region_name, endpoint_url=endpoint_url)
+        for attempt in range(1, max_attempts + 1):
+            remote, etag = self._get(client, bucket, key)
+            if remote:
+                self.merge(remote)
+
+            with self._lock:
+                body = json.dumps(self.entries, indent=4, sort_keys=True).encode("utf-8")
+            condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+            try:
+                client.put_object(Bucket=bucket, Key=key, Body=body, **condition)
+                return True
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in CONFLICT_CODES:
+                    raise
+            print(f"🔁 '{key}' changed while merging it (attempt {attempt}/{max_attempts}), merging again.")
+
+        print(f"⚠️ Failed to write '{key}', it kept changing while merging it.")
+        return False
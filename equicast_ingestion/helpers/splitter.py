@@ -1,7 +1,12 @@
+import heapq
 import json
 import os
+import statistics
 import tempfile
 from dataclasses import dataclass, field
+from typing import List, Optional
+
+from equicast_ingestion.helpers.costs import CostHistory
 
 
 @dataclass
@@ -9,6 +14,7 @@ class Splitter:
     mode: str  # Example: "stock" or "fx". FX is not currently supported
     filepath: str
     pref_chunk_size: int
+    cost_file: Optional[str] = None  # per-item cost history ('item_costs.jsonl' file or directory) for balanced chunks
     max_chunks: int = field(default=256, init=False)
     temp_dir: str = field(init=False)
 
@@ -16,6 +22,27 @@ class Splitter:
         self.temp_dir = tempfile.mkdtemp(prefix=f"chunks_{self.mode}_")
         os.makedirs(self.temp_dir, exist_ok=True)
 
+    def _balanced_chunks(self, elements: List[str], num_chunks: int, history: CostHistory) -> List[List[str]]:
+        known = [history.cost(element) for element in elements if history.cost(element) is not None]
+        default_cost = statistics.median(known)
+        costs = {
+            element: default_cost if history.cost(element) is None else history.cost(element)
+            for element in elements
+        }
+
+        # Longest processing time first: the heaviest item always goes to the lightest chunk
+        loads = [(0.0, idx) for idx in range(num_chunks)]
+        chunks = [[] for _ in range(num_chunks)]
+        for element in sorted(elements, key=lambda e: costs[e], reverse=True):
+            load, idx = heapq.heappop(loads)
+            chunks[idx].append(element)
+            heapq.heappush(loads, (load + costs[element], idx))
+
+        predicted = sorted(load for load, _ in loads)
+        print(f"⚖️ Balanced {len(elements)} elements ({len(known)} with history) into {num_chunks} chunks, "
+              f"predicted runtime {predicted[0]:.1f}s - {predicted[-1]:.1f}s.")
+        return [chunk for chunk in chunks if chunk]
+
     def split(self):
         if self.mode not in ["stock", "fx"]:
             raise ValueError("mode must be 'stock' or 'fx'")
@@ -40,10 +67,14 @@ class Splitter:
                 print(f"⚠️ Too many chunks ({num_chunks}) for preferred chunk size {self.pref_chunk_size}.")
                 print(f"➡️ Increasing chunk size to {chunk_size} to keep chunks <= {self.max_chunks}.")
 
-            chunks = [
-                unique_elements[i:i + chunk_size]
-                for i in range(0, len(unique_elements), chunk_size)
-            ]
+            history = CostHistory.load(self.cost_file)
+            if any(history.cost(element) is not None for element in unique_elements):
+                chunks = self._balanced_chunks(unique_elements, num_chunks, history)
+            else:
+                chunks = [
+                    unique_elements[i:i + chunk_size]
+                    for i in range(0, len(unique_elements), chunk_size)
+                ]
             for idx, chunk in enumerate(chunks):
                 output_filepath = os.path.join(self.temp_dir, f"chunk_{idx + 1}.json")
                 with open(output_filepath, "w", encoding="utf-8") as f:
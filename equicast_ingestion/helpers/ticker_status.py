@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from equicast_ingestion.helpers.shared_state import SharedState
+
+DELISTED_MARKERS = ("delisted",)
+
+
+@dataclass
+class TickerStatus(SharedState):
+    failure_threshold: int = 3  # consecutive failed runs before a ticker is quarantined
+    base_interval: timedelta = timedelta(days=1)
+    max_interval: timedelta = timedelta(days=32)
+
+    def merge(self, entries: Dict[str, dict]):
+        # The latest update of each ticker wins, whichever chunk made it
+        with self._lock:
+            for ticker, entry in entries.items():
+                current = self.entries.get(ticker)
+                if current is None or entry.get("updated_at", "") > current.get("updated_at", ""):
+                    self.entries[ticker] = entry
+
+    def _backoff(self, failures: int) -> timedelta:
+        exponent = max(failures - self.failure_threshold, 0)
+        return min(self.max_interval, self.base_interval * 2 ** min(exponent, 16))
+
+    def is_quarantined(self, ticker: str) -> bool:
+        entry = self.entries.get(ticker, {})
+        return bool(entry.get("is_delisted") or entry.get("is_quarantined"))
+
+    def should_probe(self, ticker: str, now: Optional[datetime] = None) -> bool:
+        entry = self.entries.get(ticker)
+        if not entry or not self.is_quarantined(ticker):
+            return True
+        if not entry.get("next_probe"):
+            return False  # flagged delisted outside this project, never probed
+        return (now or datetime.now(timezone.utc)) >= datetime.fromisoformat(entry["next_probe"])
+
+    def record_success(self, ticker: str, now: Optional[datetime] = None):
+        now = (now or datetime.now(timezone.utc)).isoformat()
+        with self._lock:
+            entry = self.entries.setdefault(ticker, {})
+            entry.update({
+                "consecutive_failures": 0,
+                "last_success": now,
+                "is_delisted": False,
+                "is_quarantined": False,
+                "next_probe": None,
+                "updated_at": now
+            })
+
+    def record_failure(self, ticker: str, error: str, now: Optional[datetime] = None):
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            entry = self.entries.setdefault(ticker, {})
+            failures = entry.get("consecutive_failures", 0) + 1
+            quarantined = failures >= self.failure_threshold
+            delisted = any(marker in str(error).lower() for marker in DELISTED_MARKERS)
+
+            # Delisted symbols stay on the slowest probe schedule in case they are relisted
+            interval = self.max_interval if delisted else self._backoff(failures)
+            entry.update({
+                "consecutive_failures": failures,
+                "last_failure": now.isoformat(),
+                "last_error": str(error)[:500],
+                "is_delisted": delisted and quarantined,
+                "is_quarantined": quarantined,
+                "next_probe": (now + interval).isoformat() if quarantined else None,
+                "updated_at": now.isoformat()
+            })
+
+    def summary(self) -> str:
+        quarantined = sum(1 for ticker in self.entries if self.is_quarantined(ticker))
+        delisted = sum(1 for entry in self.entries.values() if entry.get("is_delisted"))
+        return f"{len(self.entries)} tracked, {quarantined} quarantined ({delisted} delisted)"
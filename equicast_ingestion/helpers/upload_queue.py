@@ -0,0 +1,136 @@
+import fnmatch
+import queue
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+from equicast_ingestion.helpers.uploader import Uploader
+
+
+@dataclass
+class UploadQueue:
+    uploader: Uploader
+    max_pending: int = 256  # producers block once this many files wait for upload
+    batch_size: int = 32
+    workers: int = 2
+    uploaded: List[str] = field(default_factory=list, init=False)
+    failed: List[str] = field(default_factory=list, init=False)
+    skipped: List[str] = field(default_factory=list, init=False)
+    skipped_bytes: int = field(default=0, init=False)
+    _queue: queue.Queue = field(init=False, repr=False)
+    _s3: object = field(default=None, init=False, repr=False)
+    _threads: List[threading.Thread] = field(default_factory=list, init=False, repr=False)
+    _manifest: Dict[str, dict] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _closed: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self):
+        self._queue = queue.Queue(maxsize=self.max_pending)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        config = self.uploader.config
+        self._s3 = self.uploader.s3_factory(bucket_name=config.bucket, region_name=self.uploader.region_name)
+        if config.manifest_key:
+            self._manifest = self.uploader._load_manifest(self._s3)
+
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, file):
+        file = Path(file)
+        if fnmatch.fnmatch(file.name, self.uploader.config.pattern):
+            self._queue.put(file)
+
+    def _key(self, file: Path) -> str:
+        try:
+            return self.uploader._make_key(file)
+        except Exception:
+            return str(file)
+
+    def _upload(self, batch: List[Path]):
+        files, fingerprints, skipped = [], {}, []
+        status = {"uploaded": [], "failed": []}
+        try:
+            for file in dict.fromkeys(batch):
+                key = self.uploader._make_key(file)
+                if self.uploader.config.manifest_key:
+                    fingerprints[key] = self.uploader._fingerprint(file)
+                    with self._lock:
+                        unchanged = self._manifest.get(key) == fingerprints[key]
+                    if unchanged:
+                        skipped.append(key)
+                        continue
+                files.append({'key': key, 'path': file})
+
+            if files:
+                status = self.uploader.upload_batch(self._s3, files)
+        except Exception as e:
+            # Keys, fingerprints or the upload itself, the worker survives so close() still drains the queue
+            print(f"⚠️ Upload batch failed: {e}")
+            fingerprints, skipped = {}, []
+            status = {"uploaded": [], "failed": [self._key(file) for file in dict.fromkeys(batch)]}
+
+        failed_keys = {self.uploader._status_key(entry) for entry in status.get("failed", [])}
+        with self._lock:
+            self.skipped.extend(skipped)
+            self.skipped_bytes += sum(fingerprints[key]["size"] for key in skipped)
+            self.uploaded.extend(self.uploader._status_key(entry) for entry in status.get("uploaded", []))
+            self.failed.extend(failed_keys)
+            for key, fingerprint in fingerprints.items():
+                if key not in failed_keys:
+                    self._manifest[key] = fingerprint
+
+    def _worker(self):
+        while True:
+            file = self._queue.get()
+            if file is None:
+                return
+
+            batch = [file]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    file = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    break
+                if file is None:
+                    stop = True
+                    break
+                batch.append(file)
+
+            self._upload(batch)
+            if stop:
+                return
+
+    def close(self) -> dict:
+        if self._closed:
+            return {"uploaded": self.uploaded, "failed": self.failed, "skipped": self.skipped}
+        self._closed = True
+
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        config = self.uploader.config
+        if config.manifest_key and (self.uploaded or self.failed):
+            self.uploader._save_manifest(self._s3, self._manifest)
+
+        if self.failed:
+            print(f"⚠️ Upload failed for some of the files: {self.failed}")
+        print(f"☁️ Uploaded {len(self.uploaded)} files, skipped {len(self.skipped)} unchanged, "
+              f"{len(self.failed)} failed.")
+        self.uploader.write_outputs(len(self.uploaded), len(self.failed), len(self.skipped), self.skipped_bytes)
+
+        return {"uploaded": self.uploaded, "failed": self.failed, "skipped": self.skipped}
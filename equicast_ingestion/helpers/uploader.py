@@ -1,11 +1,17 @@
 import fnmatch
+import hashlib
+import json
 import os
-from dataclasses import dataclass
+import tempfile
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, List
 
 from equicast_awsutils import S3
 
+from equicast_ingestion.helpers.metrics import Metrics
+
 
 @dataclass
 class UploadConfig:
@@ -13,14 +19,17 @@ class UploadConfig:
     pattern: str
     message: str
     bucket: str
-    mode: str  # "generic", "stock", "fx"
+    mode: str  # "generic", "stock", "fx", "compacted"
     prefix: str = ""  # optional prefix before key
+    manifest_key: str = ""  # S3 key of the 'key -> content hash, size' manifest, enables skip-unchanged uploads
 
 
 @dataclass
 class Uploader:
     config: UploadConfig
     region_name: str = "eu-west-1"
+    s3_factory: Callable[..., Any] = S3  # swap for a local S3 stand-in in tests
+    metrics: Metrics = field(default_factory=Metrics)
 
     def _collect_files(self) -> List[Path]:
         all_files = [f for f in self.config.directory.rglob("*") if f.is_file()]
@@ -32,16 +41,77 @@ class Uploader:
         elif self.config.mode == "stock":
             ticker = file.parent.name
             key = f"ticker={ticker}/{file.name}"
-        elif self.config.mode == "fx":
+            if ticker.endswith(".delta"):  # '<ticker>/<dataset>.delta/<sequence>.parquet' from delta output
+                key = f"ticker={file.parent.parent.name}/{ticker}/{file.name}"
+        elif self.config.mode in ["fx", "compacted"]:
             rel_path = file.relative_to(self.config.directory)
             key = str(rel_path).replace("\\", "/")
         else:
             raise ValueError(f"Unknown mode: {self.config.mode}")
 
+        if self.config.prefix:
+            key = f"{self.config.prefix.strip('/')}/{key}"
         return key
 
+    @staticmethod
+    def _fingerprint(file: Path) -> dict:
+        digest = hashlib.sha256()
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return {"sha256": digest.hexdigest(), "size": os.path.getsize(file)}
+
+    @staticmethod
+    def _status_key(entry) -> str:
+        return entry.get("key") if isinstance(entry, dict) else str(entry)
+
+    def _load_manifest(self, s3_obj) -> Dict[str, dict]:
+        local_dir = tempfile.mkdtemp(prefix="manifest_")
+        s3_obj.download_files(local_dir=local_dir, files=[{'key': self.config.manifest_key, 'mandatory': False}])
+
+        path = os.path.join(local_dir, self.config.manifest_key)
+        if not os.path.exists(path):
+            print(f"⚠️ No upload manifest found at '{self.config.manifest_key}', uploading all files.")
+            return {}
+
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self, s3_obj, manifest: Dict[str, dict]):
+        local_dir = tempfile.mkdtemp(prefix="manifest_")
+        path = os.path.join(local_dir, "manifest.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=4, sort_keys=True)
+        os.replace(f"{path}.tmp", path)
+
+        status = s3_obj.upload_files(files=[{'key': self.config.manifest_key, 'path': Path(path)}])
+        if len(status.get("failed", [])) > 0:
+            print(f"⚠️ Failed to update upload manifest '{self.config.manifest_key}'.")
+
+    def upload_batch(self, s3_obj, files: List[dict]) -> dict:
+        started = time.monotonic()
+        try:
+            with self.metrics.stage("upload.batch"):
+                status = s3_obj.upload_files(files=files)
+        except Exception as e:
+            self.metrics.record("upload.batch", self.config.bucket, time.monotonic() - started, e, items=len(files))
+            raise
+
+        failed = status.get("failed", [])
+        self.metrics.record(
+            "upload.batch", self.config.bucket, time.monotonic() - started,
+            f"{len(failed)} of {len(files)} files failed" if failed else None,
+            items=len(files), bytes=sum(os.path.getsize(file['path']) for file in files)
+        )
+        return status
+
     def upload(self):
-        artifacts = self._collect_files()
+        with self.metrics.stage("upload"):
+            self._upload()
+
+    def _upload(self):
+        with self.metrics.stage("upload.collect"):
+            artifacts = self._collect_files()
 
         if not artifacts:
             print(f"No files found in {self.config.directory}/ matching pattern: {self.config.pattern}")
@@ -52,16 +122,38 @@ class Uploader:
             key = self._make_key(file)
             files.append({'key': key, 'path': file})
 
-        s3_obj = S3(bucket_name=self.config.bucket, region_name=self.region_name)
-        status = s3_obj.upload_files(files=files)
+        s3_obj = self.s3_factory(bucket_name=self.config.bucket, region_name=self.region_name)
+
+        manifest, fingerprints, skipped = {}, {}, []
+        if self.config.manifest_key:
+            manifest = self._load_manifest(s3_obj)
+            with self.metrics.stage("upload.fingerprint"):
+                fingerprints = {file['key']: self._fingerprint(file['path']) for file in files}
+            skipped = [file for file in files if manifest.get(file['key']) == fingerprints[file['key']]]
+            files = [file for file in files if manifest.get(file['key']) != fingerprints[file['key']]]
+            print(f"⏭️ Skipping {len(skipped)} unchanged files.")
+
+        status = self.upload_batch(s3_obj, files) if files else {"uploaded": [], "failed": []}
 
         if len(status.get("failed", [])) > 0:
             print(f"⚠️ Upload failed for some of the files: {status.get('failed')}")
         elif len(files) == len(status.get("uploaded", [])):
             print(f"✅ Successfully uploaded {len(files)} files")
 
+        if self.config.manifest_key and files:
+            failed_keys = {self._status_key(entry) for entry in status.get("failed", [])}
+            for file in files:
+                if file['key'] not in failed_keys:
+                    manifest[file['key']] = fingerprints[file['key']]
+            self._save_manifest(s3_obj, manifest)
+
         # self.write_summary(status.get("uploaded", []), status.get("failed", []))
-        self.write_outputs(len(status.get("uploaded", [])), len(status.get("failed", [])))
+        self.write_outputs(
+            len(status.get("uploaded", [])),
+            len(status.get("failed", [])),
+            len(skipped),
+            sum(fingerprints[file['key']]["size"] for file in skipped)
+        )
 
     def write_summary(self, uploaded: list, failed: list):
         summary_path = os.environ.get("GITHUB_STEP_SUMMARY")
@@ -78,9 +170,12 @@ class Uploader:
             for file in failed:
                 f.write(f"| ❌ Failed | `{file}` |\n")
 
-    def write_outputs(self, uploaded: int, failed: int):
+    def write_outputs(self, uploaded: int, failed: int, skipped: int = 0, skipped_bytes: int = 0):
         gh_output = os.environ.get("GITHUB_OUTPUT")
         if gh_output:
             with open(gh_output, "a", encoding="utf-8") as f:
                 f.write(f"uploaded_count={uploaded}\n")
                 f.write(f"failed_count={failed}\n")
+                f.write(f"skipped_count={skipped}\n")
+                f.write(f"skipped_bytes={skipped_bytes}\n")
+        self.metrics.write_outputs("upload")
@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass
+class Watermarks:
+    directory: str
+    prefix: str = "fx_watermarks"
+    entries: Dict[str, Dict[str, dict]] = field(default_factory=dict, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def key(self, fx: str) -> str:
+        return f"{self.prefix}/{fx.replace('/', '_')}.json"
+
+    def load(self, pairs: Iterable[str]):
+        for fx in pairs:
+            path = os.path.join(self.directory, self.key(fx))
+            if not os.path.exists(path):
+                continue
+
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries[fx] = json.load(f)
+
+        return self
+
+    def get(self, fx: str, dataset: str) -> Optional[dict]:
+        return self.entries.get(fx, {}).get(dataset)
+
+    def last_date(self, fx: str, dataset: str) -> Optional[date]:
+        entry = self.get(fx, dataset)
+        if not entry:
+            return None
+        return date.fromisoformat(entry["last_date"])
+
+    def fetched_at(self, fx: str, dataset: str) -> Optional[datetime]:
+        entry = self.get(fx, dataset)
+        if not entry or not entry.get("fetched_at"):
+            return None
+        return datetime.fromisoformat(entry["fetched_at"])
+
+    def files(self) -> List[str]:
+        return sorted({
+            key
+            for datasets in self.entries.values()
+            for entry in datasets.values()
+            for key in entry.get("files", [])
+        })
+
+    def update(self, fx: str, dataset: str, last_date: date, files: List[str], fetched_at: Optional[datetime] = None):
+        with self._lock:
+            self.entries.setdefault(fx, {})[dataset] = {
+                "last_date": last_date.isoformat(),
+                "files": sorted(files),
+                "fetched_at": fetched_at.isoformat() if fetched_at else None
+            }
+
+    def save(self, output_dir: str, pairs: Iterable[str]):
+        for fx in pairs:
+            if fx not in self.entries:
+                continue
+
+            path = os.path.join(output_dir, self.key(fx))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.entries[fx], f, indent=4, sort_keys=True)
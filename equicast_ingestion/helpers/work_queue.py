@@ -0,0 +1,314 @@
+import abc
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import boto3
+from botocore.exceptions import ClientError
+
+CONFLICT_CODES = ("PreconditionFailed", "ConditionalRequestConflict", "412", "409")
+
+
+def default_worker() -> str:
+    return f"{os.environ.get('GITHUB_JOB', socket.gethostname())}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+@dataclass
+class Batch:
+    id: str
+    items: List[str]
+    token: Optional[str] = None  # backend version of the lease, e.g. the lease object's ETag
+
+
+@dataclass
+class WorkQueue(abc.ABC):
+    lease_seconds: float = 300.0  # a batch whose lease is not renewed in time is handed to another worker
+    max_claims: int = 3  # claims before a batch that keeps crashing its workers is given up
+    poll_interval: float = 5.0
+    worker: str = field(default_factory=default_worker)
+    claimed: int = field(default=0, init=False)
+
+    @abc.abstractmethod
+    def publish(self, items: List[str], batch_size: int) -> int:
+        ...
+
+    @abc.abstractmethod
+    def claim(self) -> Optional[Batch]:
+        ...
+
+    @abc.abstractmethod
+    def extend(self, batch: Batch) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def complete(self, batch: Batch) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def drained(self) -> bool:
+        ...
+
+    @staticmethod
+    def _batches(items: List[str], batch_size: int) -> List[List[str]]:
+        items = list(dict.fromkeys(items))
+        return [items[i:i + batch_size] for i in range(0, len(items), max(1, batch_size))]
+
+    @contextlib.contextmanager
+    def _heartbeat(self, batch: Batch):
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(self.lease_seconds / 3):
+                if not self.extend(batch):
+                    print(f"⚠️ Lost the lease on batch {batch.id}, another worker may process it too.")
+                    return
+
+        thread = threading.Thread(target=renew, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def consume(self, handle: Callable[[List[str]], Any]):
+        # Claim until every batch is done, waiting on leases held by other workers in case they crash
+        while True:
+            batch = self.claim()
+            if batch is None:
+                if self.drained():
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            self.claimed += 1
+            print(f"📦 Claimed batch {batch.id} with {len(batch.items)} items as '{self.worker}'.")
+            with self._heartbeat(batch):
+                handle(batch.items)
+            self.complete(batch)
+
+    def summary(self) -> str:
+        return f"worker '{self.worker}' claimed {self.claimed} batches"
+
+
+@dataclass
+class SqliteWorkQueue(WorkQueue):
+    path: str = "work_queue.db"
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS batches (id INTEGER PRIMARY KEY, items TEXT NOT NULL, worker TEXT, "
+            "lease_until REAL, claims INTEGER NOT NULL DEFAULT 0, done INTEGER NOT NULL DEFAULT 0, "
+            "failed INTEGER NOT NULL DEFAULT 0)"
+        )
+        return connection
+
+    def publish(self, items: List[str], batch_size: int) -> int:
+        batches = self._batches(items, batch_size)
+        with contextlib.closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM batches")
+            connection.executemany("INSERT INTO batches (items) VALUES (?)", [(json.dumps(b),) for b in batches])
+            connection.execute("COMMIT")
+        return len(batches)
+
+    def claim(self) -> Optional[Batch]:
+        with contextlib.closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")  # one writer at a time, so a batch has exactly one owner
+            try:
+                while True:
+                    row = connection.execute(
+                        "SELECT id, items, claims FROM batches WHERE done = 0 AND "
+                        "(lease_until IS NULL OR lease_until < ?) ORDER BY id LIMIT 1", (time.time(),)
+                    ).fetchone()
+                    if row is None:
+                        return None
+
+                    batch_id, items, claims = row
+                    if claims >= self.max_claims:
+                        print(f"⚠️ Giving up batch {batch_id} after {claims} expired claims.")
+                        connection.execute("UPDATE batches SET done = 1, failed = 1 WHERE id = ?", (batch_id,))
+                        continue
+
+                    connection.execute(
+                        "UPDATE batches SET worker = ?, lease_until = ?, claims = claims + 1 WHERE id = ?",
+                        (self.worker, time.time() + self.lease_seconds, batch_id)
+                    )
+                    return Batch(id=str(batch_id), items=json.loads(items))
+            finally:
+                connection.execute("COMMIT")
+
+    def _update(self, sql: str, batch: Batch, *args) -> bool:
+        with contextlib.closing(self._connect()) as connection:
+            cursor = connection.execute(f"{sql} WHERE id = ? AND worker = ? AND done = 0",
+                                        (*args, int(batch.id), self.worker))
+            return cursor.rowcount == 1
+
+    def extend(self, batch: Batch) -> bool:
+        return self._update("UPDATE batches SET lease_until = ?", batch, time.time() + self.lease_seconds)
+
+    def complete(self, batch: Batch) -> bool:
+        return self._update("UPDATE batches SET done = 1", batch)
+
+    def drained(self) -> bool:
+        with contextlib.closing(self._connect()) as connection:
+            return connection.execute("SELECT COUNT(*) FROM batches WHERE done = 0").fetchone()[0] == 0
+
+
+@dataclass
+class S3WorkQueue(WorkQueue):
+    bucket: str = ""
+    prefix: str = "work_queue"
+    region_name: str = "eu-west-1"
+    endpoint_url: Optional[str] = None
+    client_factory: Optional[Callable[..., Any]] = None  # returns a boto3-compatible S3 client
+    _client: Any = field(default=None, init=False, repr=False)
+    _ids: List[str] = field(default_factory=list, init=False, repr=False)
+    _done: Set[str] = field(default_factory=set, init=False, repr=False)
+
+    def __post_init__(self):
+        factory = self.client_factory or (lambda **kwargs: boto3.client("s3", **kwargs))
+        self._client = factory(region_name=self.region_name, endpoint_url=self.endpoint_url)
+
+    def _key(self, *parts: str) -> str:
+        return "/".join([self.prefix.strip("/"), *parts])
+
+    def _get(self, key: str) -> Optional[tuple]:
+        try:
+            response = self._client.get_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return json.loads(response["Body"].read()), response["ETag"]
+
+    def _put_lease(self, batch_id: str, lease: dict, etag: Optional[str]) -> Optional[str]:
+        # Conditional writes make S3 the arbiter, the loser of a race gets a 412 and moves on
+        condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        try:
+            response = self._client.put_object(Bucket=self.bucket, Key=self._key("leases", f"{batch_id}.json"),
+                                               Body=json.dumps(lease).encode("utf-8"), **condition)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in CONFLICT_CODES:
+                return None
+            raise
+        return response["ETag"]
+
+    def _list(self, prefix: str) -> List[dict]:
+        objects, token = [], None
+        while True:
+            kwargs = {"ContinuationToken": token} if token else {}
+            response = self._client.list_objects_v2(Bucket=self.bucket, Prefix=prefix, **kwargs)
+            objects.extend(response.get("Contents", []))
+            if not response.get("IsTruncated"):
+                return objects
+            token = response["NextContinuationToken"]
+
+    @staticmethod
+    def _batch_id(key: str) -> str:
+        return key.rsplit("/", 1)[-1].removesuffix(".json")
+
+    def publish(self, items: List[str], batch_size: int) -> int:
+        for item in self._list(self._key("")):
+            self._client.delete_object(Bucket=self.bucket, Key=item["Key"])
+
+        batches = self._batches(items, batch_size)
+        ids = [f"{idx:05d}" for idx in range(len(batches))]
+        for batch_id, batch in zip(ids, batches):
+            self._client.put_object(Bucket=self.bucket, Key=self._key("batches", f"{batch_id}.json"),
+                                    Body=json.dumps(batch).encode("utf-8"))
+        self._client.put_object(Bucket=self.bucket, Key=self._key("manifest.json"),
+                                Body=json.dumps(ids).encode("utf-8"))
+        return len(batches)
+
+    def _batch_ids(self) -> List[str]:
+        if not self._ids:
+            manifest = self._get(self._key("manifest.json"))
+            if manifest is None:
+                raise RuntimeError(f"No work queue published at s3://{self.bucket}/{self._key('')}.")
+            self._ids = manifest[0]
+        return self._ids
+
+    def _mark_done(self, batch_id: str):
+        # An empty 'done/' marker per batch, so finished batches are known from a listing without reading leases
+        self._client.put_object(Bucket=self.bucket, Key=self._key("done", f"{batch_id}.json"), Body=b"{}")
+        self._done.add(batch_id)
+
+    def _open(self) -> Dict[str, Optional[dict]]:
+        # One listing of 'done/' and 'leases/' per call instead of a GET per batch, open batch -> listed lease
+        self._done.update(self._batch_id(item["Key"]) for item in self._list(self._key("done", "")))
+        leases = {self._batch_id(item["Key"]): item for item in self._list(self._key("leases", ""))}
+        return {batch_id: leases.get(batch_id) for batch_id in self._batch_ids() if batch_id not in self._done}
+
+    def claim(self) -> Optional[Batch]:
+        for batch_id, listed in self._open().items():
+            lease, etag = {"claims": 0}, None
+            if listed is not None:
+                # A lease written within 'lease_seconds' is still held, only leases that may have expired are read
+                if listed["LastModified"].timestamp() + self.lease_seconds >= time.time():
+                    continue
+                current = self._get(self._key("leases", f"{batch_id}.json"))
+                if current:
+                    lease, etag = current
+                if lease.get("done"):
+                    self._mark_done(batch_id)
+                    continue
+                if lease.get("lease_until", 0) >= time.time():
+                    continue
+
+            claims = lease.get("claims", 0)
+            if claims >= self.max_claims:
+                print(f"⚠️ Giving up batch {batch_id} after {claims} expired claims.")
+                if self._put_lease(batch_id, {**lease, "done": True, "failed": True}, etag):
+                    self._mark_done(batch_id)
+                continue
+
+            token = self._put_lease(batch_id, {
+                "worker": self.worker,
+                "lease_until": time.time() + self.lease_seconds,
+                "claims": claims + 1,
+                "done": False
+            }, etag)
+            if token:
+                items, _ = self._get(self._key("batches", f"{batch_id}.json"))
+                return Batch(id=batch_id, items=items, token=token)
+        return None
+
+    def _renew(self, batch: Batch, **fields) -> bool:
+        current = self._get(self._key("leases", f"{batch.id}.json"))
+        if current is None or current[0].get("worker") != self.worker or current[0].get("done"):
+            return False
+        token = self._put_lease(batch.id, {**current[0], **fields}, batch.token)
+        if token:
+            batch.token = token
+        return token is not None
+
+    def extend(self, batch: Batch) -> bool:
+        return self._renew(batch, lease_until=time.time() + self.lease_seconds)
+
+    def complete(self, batch: Batch) -> bool:
+        if self._renew(batch, done=True):
+            self._mark_done(batch.id)
+            return True
+        return False
+
+    def drained(self) -> bool:
+        self._done.update(self._batch_id(item["Key"]) for item in self._list(self._key("done", "")))
+        return self._done.issuperset(self._batch_ids())
+
+
+def open_work_queue(url: str, **kwargs) -> WorkQueue:
+    # 's3://bucket/prefix' for matrix jobs, 'sqlite:///path/to/queue.db' or a '.db' path for local runs
+    if url.startswith("s3://"):
+        bucket, _, prefix = url[len("s3://"):].partition("/")
+        return S3WorkQueue(bucket=bucket, prefix=prefix or "work_queue", **kwargs)
+    kwargs = {key: value for key, value in kwargs.items() if key not in ("region_name", "endpoint_url")}
+    return SqliteWorkQueue(path=url[len("sqlite:///"):] if url.startswith("sqlite:///") else url, **kwargs)
@@ -1,14 +1,48 @@
-import concurrent.futures
+import contextlib
 import json
 import os
-import random
+import re
+import shutil
 import tempfile
+import threading
 import time
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
 
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from equicast_pyutils.extractors.fx_data_extractor import FxDataExtractor
-from tqdm import tqdm
+
+from equicast_ingestion.helpers.concurrency import ConcurrencyController
+from equicast_ingestion.helpers.costs import CostHistory
+from equicast_ingestion.helpers.delta import DeltaStore
+from equicast_ingestion.helpers.encoder import ParquetEncoder
+from equicast_ingestion.helpers.journal import Journal, run_key
+from equicast_ingestion.helpers.market_calendar import MarketCalendar
+from equicast_ingestion.helpers.metrics import Metrics, parquet_rows
+from equicast_ingestion.helpers.profiler import Profiler
+from equicast_ingestion.helpers.rate_limiter import Upstream, get_upstream
+from equicast_ingestion.helpers.response_cache import ResponseCache
+from equicast_ingestion.helpers.retry_queue import RetryQueue
+from equicast_ingestion.helpers.upload_queue import UploadQueue
+from equicast_ingestion.helpers.uploader import UploadConfig, Uploader
+from equicast_ingestion.helpers.watermark import Watermarks
+from equicast_ingestion.helpers.work_queue import open_work_queue
+
+DATASETS = {
+    "prices": ("extract_fx_prices", "fx_prices.parquet"),
+    "profile": ("extract_fx_profile", "fx_profile.parquet"),
+    "fundamentals": ("extract_fx_fundamentals", "fx_fundamentals.parquet"),
+    "calculations": ("extract_fx_calculations", "fx_calculations.parquet"),
+    "forecast": ("extract_fx_forecast", "fx_forecast.parquet"),
+}
+INCREMENTAL_DATASETS = {"prices"}
+TRIANGULATED_DATASETS = {"prices"}  # only rates can be derived, profiles and forecasts are per pair
+PRICE_COLUMNS = {"open", "high", "low", "close", "adj close"}
 
 
 @dataclass
@@ -16,101 +50,673 @@ class FxProcessor:
     input_file: str
     max_workers: int = 20
     max_retries: int = 5
+    retry_base_delay: float = 2.0
+    retry_max_delay: float = 30.0
     fx_status_file: str = "fx_status.json"
     fx_pairs: dict = field(init=False)
     fx_status: dict = field(default=None, init=False)
     full_run: bool = False
+    state_dir: Optional[str] = None  # previous outputs and 'fx_watermarks/' enable incremental runs
+    overlap_days: int = 3
+    delta_output: bool = False  # store only rows changed since the outputs in 'state_dir'
+    compact_every: int = 7  # deltas before a file is written as a full snapshot again
+    market_calendar: bool = False  # skip incremental prices of pairs whose market had no session since the last fetch
+    triangulate: bool = False  # fetch prices of legs against the pivot only and derive every other pair
+    pivot: str = "USD"
+    work_dir: Optional[str] = None  # stable output directory, a re-run resumes from its journal
+    stream_window_days: int = 0  # > 0 pages full-run history in windows appended as parquet row groups
+    stream_start: str = "2000-01-01"  # first day paged by a streaming full run
+    memory_budget_mb: int = 0  # > 0 caps concurrent full-history workers at budget / worker_memory_mb
+    worker_memory_mb: int = 512
+    profile: bool = False  # sample every thread and time each stage, written next to 'metrics.jsonl'
+    work_queue: Optional[str] = None  # shared queue URL, batches of pairs are claimed until it is drained
+    lease_seconds: float = 300.0
+    upload_bucket: Optional[str] = None  # upload each file as soon as it is written
+    upload_pattern: str = "*.parquet"
+    upload_manifest_key: str = ""
+    cache_dir: Optional[str] = None  # opt-in on-disk response cache, 'response_cache.tar' in it is restored
+    cache_ttl: float = 900.0
+    cache_ttls: Optional[Dict[str, float]] = None  # URL glob -> seconds, e.g. '*/v8/finance/chart/*'
+    rate_limit: float = 0.0  # upstream requests per second shared by every worker, 0 disables
+    rate_burst: float = 10.0
+    breaker_threshold: float = 0.5  # failed share of recent requests that pauses the upstream
+    breaker_cool_down: float = 30.0
+    encode_processes: int = 0  # > 0 encodes merged parquet in that many processes, -1 one per CPU
+    parquet_compression: str = "snappy"
+    parquet_compression_level: Optional[int] = None
+    watermarks: Watermarks = field(init=False)
+    controller: ConcurrencyController = field(default=None, init=False)
+    pending: Dict[str, List[str]] = field(default_factory=dict, init=False)
+    legs: Dict[str, str] = field(default_factory=dict, init=False)  # currency -> pair fetched against the pivot
+    outputs: Dict[tuple, List[str]] = field(default_factory=dict, init=False)  # (pair, dataset) -> written keys
+    upload_queue: Optional[UploadQueue] = field(default=None, init=False)
+    cache: Optional[ResponseCache] = field(default=None, init=False)
+    costs: CostHistory = field(default_factory=CostHistory, init=False)
+    upstream: Upstream = field(init=False)
+    encoder: Optional[ParquetEncoder] = field(default=None, init=False)
+    metrics: Metrics = field(default_factory=Metrics, init=False)
+    attempts: Dict[str, int] = field(default_factory=dict, init=False)
+    full_history_slots: Optional[threading.BoundedSemaphore] = field(default=None, init=False)
+    journal: Optional[Journal] = field(default=None, init=False)
+    calendar: Optional[MarketCalendar] = field(default=None, init=False)
+    delta: Optional[DeltaStore] = field(default=None, init=False)
+    skipped: set = field(default_factory=set, init=False)  # pairs whose prices were skipped by the calendar
     temp_dir: str = field(init=False)
 
     def __post_init__(self):
-        self.temp_dir = tempfile.mkdtemp(prefix="fx_downloads_")
+        self.upstream = get_upstream("fx", rate=self.rate_limit, burst=self.rate_burst,
+                                     error_threshold=self.breaker_threshold, cool_down=self.breaker_cool_down)
+        self.temp_dir = self.work_dir or tempfile.mkdtemp(prefix="fx_downloads_")
         os.makedirs(self.temp_dir, exist_ok=True)
-
         if not os.path.exists(self.input_file):
             raise RuntimeError(f"File {self.input_file} does not exist!")
 
         with open(self.input_file, "r") as f:
             self.fx_pairs = json.load(f)
 
-    def _extractor(self, fx: str, method: str, file_name: str):
+        if self.work_dir:
+            run = run_key(json.dumps(sorted(self.fx_pairs)), str(self.full_run), str(self.state_dir))
+            self.journal = Journal(os.path.join(self.work_dir, "fx_journal.jsonl"), run=run).load()
+
+        if self.profile:
+            self.metrics.profiler = Profiler()
+        if self.delta_output:
+            if not self.state_dir:
+                raise ValueError("delta_output needs state_dir with the previous outputs to compare against.")
+            self.delta = DeltaStore(compact_every=self.compact_every, compression=self.parquet_compression)
+        if self.market_calendar:
+            if not self.state_dir:
+                raise ValueError("market_calendar needs state_dir to know when each pair was last fetched.")
+            self.calendar = MarketCalendar()
+        if self.triangulate and self.work_queue:
+            raise ValueError("triangulate needs every leg in one run and cannot claim from a work queue.")
+        if self.triangulate:
+            self.legs = self._plan_legs()
+
+        self.watermarks = Watermarks(self.state_dir or self.temp_dir)
+        if self.state_dir:
+            self.watermarks.load([*self.fx_pairs, *self.legs.values()])
+
+        if self.full_run and self.memory_budget_mb > 0:
+            slots = max(1, self.memory_budget_mb // self.worker_memory_mb)
+            self.full_history_slots = threading.BoundedSemaphore(slots)
+            print(f"🧠 Memory budget {self.memory_budget_mb} MiB allows {slots} concurrent full-history workers.")
+
+    def _is_incremental(self, fx: str, dataset: str) -> bool:
+        if self.full_run or not self.state_dir or dataset not in INCREMENTAL_DATASETS:
+            return False
+
+        entry = self.watermarks.get(fx, dataset)
+        if not entry or not entry.get("files"):
+            return False
+
+        # Without the previous output there is nothing to merge the new rows into
+        return all(os.path.exists(os.path.join(self.state_dir, key)) for key in entry["files"])
+
+    def _start_date(self, fx: str, dataset: str, end: datetime) -> datetime:
+        if self._is_incremental(fx, dataset):
+            last = self.watermarks.last_date(fx, dataset) - timedelta(days=self.overlap_days)
+            return datetime(last.year, last.month, last.day)
+        return datetime(end.year, 1, 1)
+
+    @contextlib.contextmanager
+    def _staged(self, data, file_name: str):
+        # Files the extractor writes, as (staged path, output key, output path) with the output folder created
+        staging = tempfile.mkdtemp(prefix="fx_staging_")
+        try:
+            data.to_parquet(file_name, staging)
+            staged = []
+            for root, _, files in os.walk(staging):
+                for name in files:
+                    src = os.path.join(root, name)
+                    key = os.path.relpath(src, staging).replace("\\", "/")
+                    dst = os.path.join(self.temp_dir, key)
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    staged.append((src, key, dst))
+            yield staged
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @staticmethod
+    def _flag_derived(table: pa.Table, derived: Optional[bool]) -> pa.Table:
+        # Fetched and derived pairs share one schema, the flag tells their rows apart
+        if derived is None:
+            return table
+        flags = pa.array([derived] * table.num_rows, pa.bool_())
+        if "is_derived" in table.column_names:
+            return table.set_column(table.schema.get_field_index("is_derived"), "is_derived", flags)
+        return table.append_column("is_derived", flags)
+
+    def _writer(self, path: str, schema: pa.Schema) -> pq.ParquetWriter:
+        return pq.ParquetWriter(path, schema, compression=self.parquet_compression,
+                                compression_level=self.parquet_compression_level)
+
+    def _write(self, data, file_name: str, derived: Optional[bool] = None) -> List[str]:
+        written = []
+        with self._staged(data, file_name) as staged:
+            for src, key, dst in staged:
+                if derived is None:
+                    shutil.move(src, dst)
+                else:
+                    # The flag is added one row group at a time, the file is never held in memory as a whole
+                    parquet = pq.ParquetFile(src)
+                    schema = self._flag_derived(parquet.schema_arrow.empty_table(), derived).schema
+                    with self._writer(dst, schema) as writer:
+                        for row_group in range(parquet.num_row_groups):
+                            writer.write_table(self._flag_derived(parquet.read_row_group(row_group), derived))
+                written.append(key)
+        return written
+
+    @staticmethod
+    def _date_column(df: pd.DataFrame) -> Optional[str]:
+        for column in df.columns:
+            if str(column).lower() in ("date", "datetime", "timestamp"):
+                return column
+        return None
+
+    @classmethod
+    def _last_date(cls, df: pd.DataFrame):
+        if isinstance(df.index, pd.DatetimeIndex):
+            dates = df.index
+        else:
+            column = cls._date_column(df)
+            if column is None:
+                return None
+            dates = pd.to_datetime(df[column])
+
+        return None if dates.empty else dates.max().date()
+
+    @classmethod
+    def _merge_parquet(cls, previous: str, current: str, write: Callable = pd.DataFrame.to_parquet,
+                       read: Callable = pd.read_parquet) -> pd.DataFrame:
+        merged = pd.concat([read(previous), pd.read_parquet(current)])
+        if isinstance(merged.index, pd.DatetimeIndex):
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        else:
+            column = cls._date_column(merged)
+            if column is None:
+                merged = merged.drop_duplicates(keep="last")
+            else:
+                merged = merged.drop_duplicates(subset=[column], keep="last").sort_values(column)
+
+        write(merged, current)
+        return merged
+
+    def _update_watermark(self, fx: str, dataset: str, files: List[str], merge: bool, end: datetime):
+        last_date = None
+        for key in files:
+            current = os.path.join(self.temp_dir, key)
+            previous = os.path.join(self.state_dir, key)
+            if merge and os.path.exists(previous):
+                df = self._merge_parquet(
+                    previous, current,
+                    write=lambda merged, path: self.encoder.write(merged, path, fx, f"fx.{dataset}.encode").result(),
+                    # With delta output the previous file is only the last snapshot, the deltas since are applied
+                    read=(lambda _: self.delta.read(key, self.state_dir)) if self.delta else pd.read_parquet
+                )
+            else:
+                df = pd.read_parquet(current)
+
+            file_last_date = self._last_date(df)
+            if file_last_date and (last_date is None or file_last_date > last_date):
+                last_date = file_last_date
+
+        self.watermarks.update(fx, dataset, last_date or end.date(), files, fetched_at=end)
+
+    def _is_streamed(self, dataset: str) -> bool:
+        return self.full_run and self.stream_window_days > 0 and dataset in INCREMENTAL_DATASETS
+
+    @staticmethod
+    def _table_date_column(table) -> Optional[str]:
+        index_columns = (table.schema.pandas_metadata or {}).get("index_columns", [])
+        for column in [*index_columns, *table.column_names]:
+            if isinstance(column, str) and column.lower() in ("date", "datetime", "timestamp"):
+                return column
+        return None
+
+    def _stream(self, fx: str, method: str, file_name: str, end: datetime, derived: Optional[bool] = None):
         from_currency, to_currency = fx.split("/")
-        end = datetime.now(timezone.utc)
-        start = datetime(end.year, 1, 1)
-        print(f"📥 Fetching FX '{method}' for {from_currency} > {to_currency}.")
-
-        extractor = FxDataExtractor(
-            from_currency=from_currency,
-            to_currency=to_currency,
-            start_date=None if self.full_run else start,
-            end_date=None if self.full_run else end
-        )
+        start = datetime.fromisoformat(self.stream_start)
+        stop = datetime(end.year, end.month, end.day) + timedelta(days=1)
 
+        # Only one window is held in memory, each one is appended to the output as its own row group
+        writers, last_dates = {}, {}
         try:
-            data = getattr(extractor, method)()
-            data.to_parquet(file_name, self.temp_dir)
-            return {"success": True, "file": file_name}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-
-    def _process_all(self, method: str, file_name: str):
-        remaining = self.fx_pairs
-        max_retries = self.max_retries
-        decay_rate = 0.2
-        max_workers = self.max_workers
-        min_workers = int(self.max_workers / self.max_retries)
+            while start < stop:
+                window_end = min(start + timedelta(days=self.stream_window_days), stop)
+                extractor = self.upstream.wrap(FxDataExtractor(
+                    from_currency=from_currency,
+                    to_currency=to_currency,
+                    start_date=start,
+                    end_date=window_end
+                ))
+                data = getattr(extractor, method)()
+                with self._staged(data, file_name) as staged:
+                    for src, key, dst in staged:
+                        table = self._flag_derived(pq.read_table(src), derived)
+                        column = self._table_date_column(table)
+                        if column and key in last_dates:
+                            # Windows may share a boundary day, it is already written
+                            table = table.filter(pc.greater(table[column], last_dates[key]))
+
+                        if key not in writers:
+                            schema = table.schema
+                            if self.delta:
+                                # A streamed full run is a new snapshot, marked as such while it is written
+                                index = (schema.pandas_metadata or {}).get("index_columns", [])
+                                mode = f"column:{column}" if column and column not in index else "index"
+                                schema = schema.with_metadata({
+                                    **(schema.metadata or {}),
+                                    **self.delta.snapshot_metadata(key, self.state_dir, mode=mode)
+                                })
+                            writers[key] = self._writer(dst, schema)
+                        if table.num_rows:
+                            writers[key].write_table(table.cast(writers[key].schema))
+                            if column:
+                                last_dates[key] = pc.max(table[column])
+                start = window_end
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        dates = [pd.Timestamp(value.as_py()).date() for value in last_dates.values() if value.is_valid]
+        return list(writers), max(dates) if dates else None
+
+    def _resume(self, fx: str, dataset: str) -> Optional[int]:
+        entry = self.journal.completed(fx, dataset, self.temp_dir) if self.journal else None
+        if entry is None:
+            return None
+
+        files = entry.get("outputs", list(entry["files"]))
+        self.outputs[(fx, dataset)] = files
+        if entry.get("watermark"):
+            watermark = entry["watermark"]
+            self.watermarks.update(fx, dataset, date.fromisoformat(watermark["last_date"]), files,
+                                   fetched_at=datetime.fromisoformat(watermark["fetched_at"])
+                                   if watermark.get("fetched_at") else None)
+        if self.upload_queue:
+            for key in entry["files"]:
+                self.upload_queue.put(os.path.join(self.temp_dir, key))
+        print(f"⏭️ FX '{dataset}' for {fx} completed by an earlier run, skipping.")
+        return sum(os.path.getsize(os.path.join(self.temp_dir, key)) for key in entry["files"])
+
+    def _extractor(self, fx: str, datasets: List[str]):
+        from_currency, to_currency = fx.split("/")
+        end = datetime.now(timezone.utc)
+
+        # A single extractor per pair lets every dataset share its session, each one asks for its own window
+        extractor, source = None, None
         errors = {}
+        size = 0
+        for dataset in datasets:
+            method, file_name = DATASETS[dataset]
+            resumed = self._resume(fx, dataset)
+            if resumed is not None:
+                size += resumed
+                continue
 
-        for attempt in range(max_retries):
-            factor = (1 - decay_rate) ** attempt
-            c_workers = max(int(max_workers * factor), min_workers)
-            print(f"🔁 Attempt {attempt + 1} with {c_workers} workers.")
-
-            results = {}
-            with concurrent.futures.ThreadPoolExecutor(max_workers=c_workers) as executor:
-                futures = {executor.submit(self._extractor, fx, method, file_name): fx for fx in remaining}
-                for future in tqdm(
-                        concurrent.futures.as_completed(futures),
-                        total=len(remaining),
-                        desc=f"Fetching FX '{method}'",
-                        unit="fx"
-                ):
-                    fx: str = futures[future]
-                    result: dict = future.result()
-                    results[fx] = result
-                    if attempt == max_retries - 1 and result.get("error"):
-                        errors[fx] = result["error"]
-
-            failed = [fx for fx in remaining if results[fx].get("error")]
-            if not failed:
-                break
-
-            remaining = failed
-            print(f"🔁 Retrying {len(failed)} failed FX: {failed}.")
-            time.sleep(random.uniform(5, 10))
+            streamed = self._is_streamed(dataset)
+            start = None if self.full_run else self._start_date(fx, dataset, end)
+            if not streamed and extractor is None:
+                source = FxDataExtractor(
+                    from_currency=from_currency,
+                    to_currency=to_currency,
+                    start_date=start,
+                    end_date=None if self.full_run else end
+                )
+                extractor = self.upstream.wrap(source)
+            if not streamed:
+                source.start_date = start
+
+            print(f"📥 Fetching FX '{method}' for {from_currency} > {to_currency}"
+                  f"{f' from {start.date()}' if start else ''}"
+                  f"{f' in {self.stream_window_days} day windows' if streamed else ''}.")
+            try:
+                with self.metrics.span(f"fx.{dataset}", fx, attempt=self.attempts.get(fx)) as span:
+                    derived = False if self.triangulate and dataset in TRIANGULATED_DATASETS else None
+                    if streamed:
+                        files, last_date = self._stream(fx, method, file_name, end, derived)
+                    else:
+                        data = getattr(extractor, method)()
+                        files = self._write(data, file_name, derived)
+                    paths = [os.path.join(self.temp_dir, key) for key in files]
+                    span["bytes"] = sum(os.path.getsize(path) for path in paths)
+                    span["rows"] = sum(parquet_rows(path) or 0 for path in paths)
+                size += span["bytes"]
+                self.outputs[(fx, dataset)] = files
+                if self.state_dir and streamed:
+                    self.watermarks.update(fx, dataset, last_date or end.date(), files, fetched_at=end)
+                elif self.state_dir:
+                    with self.metrics.stage("fx.merge"):
+                        self._update_watermark(fx, dataset, files, self._is_incremental(fx, dataset), end)
+                stored = files
+                if self.delta and not streamed:
+                    with self.metrics.stage("fx.delta"):
+                        stored = [
+                            key for file in files
+                            for key in self.delta.write(self.temp_dir, file, self.state_dir, snapshot=self.full_run)
+                        ]
+                if self.journal:
+                    self.journal.record(fx, dataset, self.temp_dir, stored, outputs=files,
+                                        watermark=self.watermarks.get(fx, dataset) if self.state_dir else None)
+                if self.upload_queue:
+                    for key in stored:
+                        self.upload_queue.put(os.path.join(self.temp_dir, key))
+            except Exception as e:
+                errors[dataset] = str(e)
 
         if errors:
-            log_path = os.path.join(self.temp_dir, f"error_{method}.log")
-            with open(log_path, "w", encoding="utf-8") as f:
-                for fx, err in errors.items():
-                    f.write(f"{fx}: {err}\n")
-            print(f"⚠️ {len(errors)} errors logged to '{log_path}'.")
+            return {"success": False, "error": "; ".join(errors.values()), "errors": errors, "bytes": size}
+        return {"success": True, "bytes": size}
 
-    def process_prices(self):
-        self._process_all("extract_fx_prices", "fx_prices.parquet")
+    def _plan_legs(self) -> Dict[str, str]:
+        currencies = sorted({currency for fx in self.fx_pairs for currency in fx.split("/")} - {self.pivot})
+        legs = {}
+        for currency in currencies:
+            direct, inverse = f"{currency}/{self.pivot}", f"{self.pivot}/{currency}"
+            legs[currency] = inverse if inverse in self.fx_pairs and direct not in self.fx_pairs else direct
+        return legs
+
+    def _read_prices(self, fx: str) -> pd.DataFrame:
+        key = self.outputs[(fx, "prices")][0]
+        if self.delta:
+            return self.delta.read(key, self.temp_dir, self.state_dir)
+        # Legs skipped by the market calendar are still read from the previous run's output
+        path = os.path.join(self.state_dir, key) if fx in self.skipped else os.path.join(self.temp_dir, key)
+        return pd.read_parquet(path)
+
+    def _dated(self, df: pd.DataFrame) -> pd.DataFrame:
+        if not isinstance(df.index, pd.DatetimeIndex):
+            df = df.set_index(pd.DatetimeIndex(pd.to_datetime(df[self._date_column(df)])))
+        return df[~df.index.duplicated(keep="last")].sort_index()
+
+    @staticmethod
+    def _invert(df: pd.DataFrame) -> pd.DataFrame:
+        columns = {str(column).lower(): column for column in df.columns}
+        inverted = 1 / df
+        if "high" in columns and "low" in columns:
+            inverted[columns["high"]], inverted[columns["low"]] = 1 / df[columns["low"]], 1 / df[columns["high"]]
+        return inverted
+
+    @staticmethod
+    def _cross(base: pd.DataFrame, quote: pd.DataFrame) -> pd.DataFrame:
+        base, quote = base.align(quote, join="inner")
+        cross = base / quote
+        columns = {str(column).lower(): column for column in cross.columns}
+        # Intraday extremes of a cross cannot be recovered from its legs, keep them consistent with open/close
+        edges = [columns[name] for name in ("open", "close") if name in columns]
+        if "high" in columns:
+            cross[columns["high"]] = cross[[columns["high"], *edges]].max(axis=1)
+        if "low" in columns:
+            cross[columns["low"]] = cross[[columns["low"], *edges]].min(axis=1)
+        return cross
+
+    def _rates(self, currency: str) -> Optional[pd.DataFrame]:
+        # Price of one unit of the currency in the pivot, None for the pivot itself
+        if currency == self.pivot:
+            return None
+        leg = self.legs[currency]
+        df = self._dated(self._read_prices(leg))
+        prices = df[[column for column in df.columns if str(column).lower() in PRICE_COLUMNS]].astype(float)
+        return prices if leg.startswith(f"{currency}/") else self._invert(prices)
+
+    def _derived_key(self, fx: str) -> str:
+        template_fx = next(leg for leg in self.legs.values() if (leg, "prices") in self.outputs)
+        template_key = self.outputs[(template_fx, "prices")][0]
+        (from_currency, to_currency), (template_from, template_to) = fx.split("/"), template_fx.split("/")
+        pattern = re.compile(f"{re.escape(template_from)}([_-]?){re.escape(template_to)}", re.IGNORECASE)
+        if not pattern.search(template_key):
+            return f"fx={from_currency}{to_currency}/{os.path.basename(template_key)}"
+        return pattern.sub(lambda match: f"{from_currency}{match.group(1)}{to_currency}", template_key)
+
+    def _derive(self, fx: str, end: datetime) -> int:
+        from_currency, to_currency = fx.split("/")
+        base, quote = self._rates(from_currency), self._rates(to_currency)
+        rates = self._cross(base, quote) if base is not None and quote is not None else (
+            base if quote is None else self._invert(quote)
+        )
+
+        # Rows keep the layout of a fetched leg, columns that cannot be derived are zeroed or emptied
+        leg = self._read_prices(self.legs[from_currency if base is not None else to_currency])
+        date_column = None if isinstance(leg.index, pd.DatetimeIndex) else self._date_column(leg)
+        template = self._dated(leg).loc[rates.index]
+        frame = template.copy()
+        for column in frame.columns:
+            if column in rates.columns:
+                frame[column] = rates[column].astype(template[column].dtype)
+            elif column == date_column:
+                continue
+            elif pd.api.types.is_numeric_dtype(template[column]) and column != "is_derived":
+                frame[column] = template[column].dtype.type(0)
+            else:
+                frame[column] = None
+        frame["is_derived"] = True
+        if date_column:
+            frame = frame.reset_index(drop=True)[leg.columns]
+
+        key = self._derived_key(fx)
+        path = os.path.join(self.temp_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.encoder.write(frame, path, fx, "fx.prices.derive").result()
+        self.outputs[(fx, "prices")] = [key]
+        if self.state_dir:
+            self.watermarks.update(fx, "prices", self._last_date(frame) or end.date(), [key], fetched_at=end)
+        stored = self.delta.write(self.temp_dir, key, self.state_dir, snapshot=self.full_run) if self.delta else [key]
+        if self.upload_queue:
+            for stored_key in stored:
+                self.upload_queue.put(os.path.join(self.temp_dir, stored_key))
+        return len(frame)
+
+    def _derive_all(self, derived: List[str], errors: Dict[str, Dict[str, str]]):
+        end = datetime.now(timezone.utc)
+        rows, done = 0, 0
+        for fx in derived:
+            legs = [self.legs[currency] for currency in fx.split("/") if currency != self.pivot]
+            if all(leg in self.skipped for leg in legs):
+                continue  # no leg changed, neither did the cross
+            failed = [leg for leg in legs if "prices" in errors.get(leg, {})]
+            if failed:
+                errors.setdefault(fx, {})["prices"] = f"Legs {failed} failed, pair not derived"
+                continue
+            try:
+                with self.metrics.span("fx.derive", fx) as span:
+                    span["rows"] = self._derive(fx, end)
+            except Exception as e:
+                errors.setdefault(fx, {})["prices"] = f"Derivation failed: {e}"
+                continue
+            rows += span["rows"]
+            done += 1
+        unchanged = sum(1 for fx in derived if all(
+            self.legs[currency] in self.skipped for currency in fx.split("/") if currency != self.pivot))
+        print(f"🔺 Derived {done} of {len(derived) - unchanged} changed pairs ({rows} rows) from {len(self.legs)} legs "
+              f"against {self.pivot}.")
+
+    def _skip_closed(self, pairs: List[str]):
+        for fx in pairs:
+            if "prices" not in self.pending.get(fx, []) or not self._is_incremental(fx, "prices"):
+                continue
+            if self.calendar.should_fetch(fx, self.watermarks.fetched_at(fx, "prices")):
+                continue
+
+            self.pending[fx].remove("prices")
+            self.skipped.add(fx)
+            self.outputs[(fx, "prices")] = self.watermarks.get(fx, "prices")["files"]
+            self.metrics.record("fx.calendar_skip", fx, 0.0)
+
+    def _controlled_extractor(self, fx: str):
+        datasets = self.pending[fx]
+        self.attempts[fx] = self.attempts.get(fx, 0) + 1
+        # Full-history workers wait for memory before taking a concurrency slot they could not use
+        with self.full_history_slots or contextlib.nullcontext():
+            started = self.controller.acquire()
+            workers = self.controller.current
+            result = {"success": False, "error": "Extractor did not complete"}
+            try:
+                with self.metrics.stage("fx.extract"):
+                    result = self._extractor(fx, datasets)
+            finally:
+                runtime = time.monotonic() - started
+                self.controller.release(started, result.get("error"))
+                self.costs.record(fx, runtime, result.get("bytes", 0), bool(result.get("error")))
+                self.metrics.record("fx.pair", fx, runtime, result.get("error"), attempt=self.attempts[fx],
+                                    bytes=result.get("bytes", 0), workers=workers)
+
+        # Retries only re-fetch the datasets that failed for this pair
+        result.setdefault("errors", {dataset: result.get("error") for dataset in datasets})
+        if result.get("error"):
+            self.pending[fx] = list(result["errors"])
+        return result
+
+    def _shutdown(self):
+        # Also runs when processing raised, so no upload thread, encoder pool, profiler or patched transport outlives it
+        if self.encoder:
+            self.encoder.close()
+        if self.cache:
+            self.cache.uninstall()
+        if self.upload_queue:
+            self.upload_queue.close()
+        if self.metrics.profiler:
+            self.metrics.profiler.stop()
+
+    def _process_all(self, datasets: List[str]):
+        if self.metrics.profiler:
+            self.metrics.profiler.start()
+        try:
+            self.pending = {fx: list(datasets) for fx in self.fx_pairs}
+            derived = []
+            if self.triangulate and TRIANGULATED_DATASETS & set(datasets):
+                derived = [fx for fx in self.fx_pairs if fx not in self.legs.values()]
+                for fx in derived:
+                    self.pending[fx] = [dataset for dataset in datasets if dataset not in TRIANGULATED_DATASETS]
+                for leg in self.legs.values():
+                    self.pending[leg] = list(dict.fromkeys([*self.pending.get(leg, []), *TRIANGULATED_DATASETS]))
+                print(f"🔺 Triangulating {len(self.fx_pairs)} pairs through {len(self.legs)} legs against {self.pivot}.")
+            if self.calendar and not self.work_queue:
+                self._skip_closed(list(self.pending))
+            self.pending = {fx: pending for fx, pending in self.pending.items() if pending}
+            min_workers = int(self.max_workers / self.max_retries)
+            label = ", ".join(datasets)
+            self.controller = ConcurrencyController(max_limit=self.max_workers, min_limit=min_workers)
+            self.encoder = ParquetEncoder(
+                processes=self.encode_processes,
+                compression=self.parquet_compression,
+                compression_level=self.parquet_compression_level,
+                metrics=self.metrics
+            )
+            if self.cache_dir:
+                self.cache = ResponseCache(self.cache_dir, default_ttl=self.cache_ttl, ttls=self.cache_ttls or {})
+                self.cache.unpack(os.path.join(self.cache_dir, "response_cache.tar")).install()
+            if self.upload_bucket:
+                self.upload_queue = UploadQueue(Uploader(UploadConfig(
+                    directory=Path(self.temp_dir),
+                    pattern=self.upload_pattern,
+                    message=f"Upload FX '{label}' Files",
+                    bucket=self.upload_bucket,
+                    mode="fx",
+                    manifest_key=self.upload_manifest_key
+                ), metrics=self.metrics))
+                self.upload_queue.start()
+
+            queue = RetryQueue(
+                max_workers=self.max_workers,
+                max_attempts=self.max_retries,
+                base_delay=self.retry_base_delay,
+                max_delay=self.retry_max_delay,
+                desc=f"Fetching FX '{label}'",
+                unit="fx"
+            )
+            if self.work_queue:
+                results = {}
+                work_queue = open_work_queue(self.work_queue, lease_seconds=self.lease_seconds)
+
+                def handle(pairs: List[str]):
+                    self.pending.update({fx: list(datasets) for fx in pairs})
+                    if self.state_dir:
+                        self.watermarks.load(pairs)
+                    if self.calendar:
+                        self._skip_closed(pairs)
+                        pairs = [fx for fx in pairs if self.pending[fx]]
+                    results.update(queue.run(pairs, self._controlled_extractor))
+
+                work_queue.consume(handle)
+                print(f"📦 Work queue: {work_queue.summary()}.")
+            else:
+                results = queue.run(list(self.pending), self._controlled_extractor)
+            errors: Dict[str, Dict[str, str]] = {
+                fx: result["errors"] for fx, result in results.items() if result.get("error")
+            }
+            if derived:
+                with self.metrics.stage("fx.derive"):
+                    self._derive_all(derived, errors)
+
+            print(f"⚙️ FX concurrency {self.controller.summary()}.")
+            print(f"🚦 Upstream {self.upstream.summary()}.")
+            self.encoder.close()
+            print(f"🗜️ Parquet encoder: {self.encoder.summary()}.")
+            if self.journal:
+                print(f"📒 Journal: {self.journal.summary()}.")
+            if self.calendar:
+                print(f"🗓️ Market calendar: {self.calendar.summary()}.")
+            if self.delta:
+                print(f"🔀 Delta output: {self.delta.summary()}.")
+            if self.cache:
+                self.cache.uninstall()
+                self.cache.pack(os.path.join(self.cache_dir, "response_cache.tar"))
+                print(f"🗄️ Response cache: {self.cache.summary()}.")
+
+            for dataset in datasets:
+                method, _ = DATASETS[dataset]
+                dataset_errors = {fx: errs[dataset] for fx, errs in errors.items() if dataset in errs}
+                log_path = os.path.join(self.temp_dir, f"error_{method}.log")
+                if not dataset_errors:
+                    if os.path.exists(log_path):
+                        os.remove(log_path)  # left behind by the run this one resumed
+                    continue
+
+                with open(log_path, "w", encoding="utf-8") as f:
+                    for fx, err in dataset_errors.items():
+                        f.write(f"{fx}: {err}\n")
+                print(f"⚠️ {len(dataset_errors)} errors logged to '{log_path}'.")
+
+            if self.state_dir:
+                self.watermarks.save(self.temp_dir, list(dict.fromkeys([*self.fx_pairs, *self.pending])))
+            self.costs.save(os.path.join(self.temp_dir, "item_costs.jsonl"))
+
+            if self.upload_queue:
+                self.upload_queue.close()
+            if self.journal and not errors and not (self.upload_queue and self.upload_queue.failed):
+                self.journal.clear()  # a completed run leaves nothing for a later run in the same work dir to skip
+
+            self.metrics.write(os.path.join(self.temp_dir, "metrics.jsonl"))
+            self.metrics.write_summary(f"FX '{label}' Metrics")
+            self.metrics.write_outputs("fx")
+            if self.metrics.profiler:
+                self.metrics.profiler.stop()
+                self.metrics.profiler.write(self.temp_dir)
+                self.metrics.profiler.write_summary(f"FX '{label}' Profile")
+                print(f"🔬 Profiler: {self.metrics.profiler.summary()}, written to '{self.temp_dir}'.")
+        finally:
+            self._shutdown()
+
+    def process_datasets(self, datasets: List[str]):
+        unknown = [dataset for dataset in datasets if dataset not in DATASETS]
+        if unknown:
+            raise ValueError(f"Unknown FX datasets: {unknown}. Expected any of {list(DATASETS)}.")
+
+        self._process_all(list(dict.fromkeys(datasets)))
         return self.temp_dir
 
+    def process_prices(self):
+        return self.process_datasets(["prices"])
+
     def process_profile(self):
-        self._process_all("extract_fx_profile", "fx_profile.parquet")
-        return self.temp_dir
+        return self.process_datasets(["profile"])
 
     def process_fundamentals(self):
-        self._process_all("extract_fx_fundamentals", "fx_fundamentals.parquet")
-        return self.temp_dir
+        return self.process_datasets(["fundamentals"])
 
     def process_calculations(self):
-        self._process_all("extract_fx_calculations", "fx_calculations.parquet")
-        return self.temp_dir
+        return self.process_datasets(["calculations"])
 
     def process_forecast(self):
-        self._process_all("extract_fx_forecast", "fx_forecast.parquet")
-        return self.temp_dir
+        return self.process_datasets(["forecast"])
@@ -1,12 +1,31 @@
-import concurrent.futures
+import functools
 import json
 import os
-import random
 import time
 from dataclasses import dataclass, field
+from pathlib import Path
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
 
 from equicast_pyutils.extractors.stock_data_extractor import StockDataExtractor
-from tqdm import tqdm
+
+from equicast_ingestion.helpers.concurrency import ConcurrencyController
+from equicast_ingestion.helpers.costs import CostHistory
+from equicast_ingestion.helpers.delta import DATE_COLUMNS, DeltaStore
+from equicast_ingestion.helpers.encoder import ParquetEncoder
+from equicast_ingestion.helpers.freshness import DEFAULT_TTLS, Freshness
+from equicast_ingestion.helpers.market_calendar import MarketCalendar
+from equicast_ingestion.helpers.metrics import Metrics
+from equicast_ingestion.helpers.profiler import Profiler
+from equicast_ingestion.helpers.rate_limiter import Upstream, get_upstream
+from equicast_ingestion.helpers.response_cache import ResponseCache
+from equicast_ingestion.helpers.retry_queue import RetryQueue
+from equicast_ingestion.helpers.ticker_status import TickerStatus
+from equicast_ingestion.helpers.upload_queue import UploadQueue
+from equicast_ingestion.helpers.uploader import UploadConfig, Uploader
+from equicast_ingestion.helpers.work_queue import open_work_queue
 
 
 @dataclass
@@ -15,113 +34,488 @@ class StockProcessor:
     download_dir: str = "downloads"
     stock_download_dir: str = "stock_downloads"
     ticker_status_file: str = "ticker_status.json"
-    tickers: dict = field(init=False)
-    ticker_status: dict = field(default=None, init=False)
+    max_workers: int = 80
+    min_workers: int = 10
+    max_retries: int = 5
+    retry_base_delay: float = 2.0
+    retry_max_delay: float = 30.0
+    upload_bucket: Optional[str] = None  # upload each file as soon as it is written
+    upload_pattern: str = "*.parquet"
+    upload_manifest_key: str = ""
+    cache_dir: Optional[str] = None  # opt-in on-disk response cache, 'response_cache.tar' in it is restored
+    cache_ttl: float = 900.0
+    cache_ttls: Optional[Dict[str, float]] = None  # URL glob -> seconds, e.g. '*/v8/finance/chart/*'
+    rate_limit: float = 0.0  # upstream requests per second shared by every worker, 0 disables
+    rate_burst: float = 10.0
+    breaker_threshold: float = 0.5  # failed share of recent requests that pauses the upstream
+    breaker_cool_down: float = 30.0
+    encode_processes: int = 0  # > 0 encodes parquet in that many processes off the fetch threads, -1 one per CPU
+    parquet_compression: str = "snappy"
+    parquet_compression_level: Optional[int] = None
+    freshness_file: str = "freshness.json"
+    use_freshness: bool = False  # refetch datasets by TTL instead of skipping any existing file
+    freshness_ttls: Optional[Dict[str, float]] = None  # hours per dataset, overrides DEFAULT_TTLS
+    market_calendar: bool = False  # skip prices of tickers whose exchange had no session since the last fetch
+    default_market: str = "NYSE"  # exchange of tickers without a suffix such as '.L'
+    price_batch_size: int = 0  # > 0 tops up previous price files for that many tickers per upstream request
+    price_batch_fetcher: Optional[Callable[[List[str], Optional[pd.Timestamp]], Dict[str, pd.DataFrame]]] = None
+    overlap_days: int = 3  # days re-fetched before the last date of a previous price file
+    failure_threshold: int = 3  # consecutive failed runs before a ticker is only probed on a backoff schedule
+    probe_interval_hours: float = 24.0
+    status_bucket: Optional[str] = None  # merge and upload 'ticker_status.json' and 'freshness.json' back to it
+    state_dir: Optional[str] = None  # previous outputs ('<ticker>/<dataset>.parquet' plus deltas)
+    delta_output: bool = False  # store only rows changed since the state in 'state_dir'
+    compact_every: int = 7  # deltas before a dataset is written as a full snapshot again
+    profile: bool = False  # sample every thread and time each stage, written next to 'metrics.jsonl'
+    work_queue: Optional[str] = None  # shared queue URL, batches are claimed until it is drained instead of the file
+    lease_seconds: float = 300.0
+    tickers: list = field(init=False)
+    ticker_status: TickerStatus = field(init=False)
+    probes: set = field(default_factory=set, init=False)
+    closed: set = field(default_factory=set, init=False)  # tickers whose prices are skipped by the calendar
+    calendar: Optional[MarketCalendar] = field(default=None, init=False)
+    delta: Optional[DeltaStore] = field(default=None, init=False)
+    stored: set = field(default_factory=set, init=False)  # (ticker, dataset) written as deltas this run
+    controller: ConcurrencyController = field(default=None, init=False)
+    upload_queue: Optional[UploadQueue] = field(default=None, init=False)
+    cache: Optional[ResponseCache] = field(default=None, init=False)
+    costs: CostHistory = field(default_factory=CostHistory, init=False)
+    freshness: Optional[Freshness] = field(default=None, init=False)
+    upstream: Upstream = field(init=False)
+    encoder: Optional[ParquetEncoder] = field(default=None, init=False)
+    metrics: Metrics = field(default_factory=Metrics, init=False)
+    attempts: Dict[str, int] = field(default_factory=dict, init=False)
 
     def __post_init__(self):
+        self.upstream = get_upstream("stock", rate=self.rate_limit, burst=self.rate_burst,
+                                     error_threshold=self.breaker_threshold, cool_down=self.breaker_cool_down)
         os.makedirs(self.stock_download_dir, exist_ok=True)
         if not os.path.exists(self.ticker_file):
             raise RuntimeError(f"File {self.ticker_file} does not exist!")
 
+        if self.use_freshness:
+            ttls = dict(DEFAULT_TTLS)
+            for dataset, hours in (self.freshness_ttls or {}).items():
+                if dataset not in ttls:
+                    raise ValueError(f"Unknown stock dataset '{dataset}'. Expected any of {list(ttls)}.")
+                ttls[dataset] = timedelta(hours=hours)
+            self.freshness = Freshness(ttls=ttls).load(os.path.join(self.download_dir, self.freshness_file))
+
+        if self.market_calendar:
+            if not self.freshness:
+                raise ValueError("market_calendar needs use_freshness to know when each ticker was last fetched.")
+            self.calendar = MarketCalendar(default_market=self.default_market)
+
+        if self.profile:
+            self.metrics.profiler = Profiler()
+
+        if self.delta_output:
+            if not self.state_dir:
+                raise ValueError("delta_output needs state_dir with the previous outputs to compare against.")
+            self.delta = DeltaStore(compact_every=self.compact_every, compression=self.parquet_compression)
+
+        if self.price_batch_size > 0 and not self.state_dir:
+            raise ValueError("price_batch_size needs state_dir with the previous price files to top up.")
+
+        self.ticker_status = TickerStatus(
+            failure_threshold=self.failure_threshold,
+            base_interval=timedelta(hours=self.probe_interval_hours)
+        ).load(os.path.join(self.download_dir, self.ticker_status_file))
+
     @staticmethod
-    def _process_prices(extractor: StockDataExtractor, folder: str):
+    def _process_prices(extractor: StockDataExtractor, folder: str, force: bool = False,
+                        write: Callable = pd.DataFrame.to_parquet):
         filename = os.path.join(folder, "stock_price.parquet")
-        if not os.path.exists(filename):
+        if force or not os.path.exists(filename):
             print(f"💲 Fetching stock prices for {extractor.ticker}.")
             price_data = extractor.extract_stock_price_data()
-            price_data.to_parquet(filename)
+            write(price_data, filename)
+            return filename
 
     @staticmethod
-    def _process_dividends(extractor: StockDataExtractor, folder: str):
+    def _process_dividends(extractor: StockDataExtractor, folder: str, force: bool = False,
+                           write: Callable = pd.DataFrame.to_parquet):
         filename = os.path.join(folder, "dividends.parquet")
-        if not os.path.exists(filename):
+        if force or not os.path.exists(filename):
             print(f"💰 Fetching dividends for {extractor.ticker}.")
             dividends = extractor.extract_dividends()
-            dividends.to_parquet(filename)
+            write(dividends, filename)
+            return filename
 
     @staticmethod
-    def _process_company_profile(extractor: StockDataExtractor, folder: str):
+    def _process_company_profile(extractor: StockDataExtractor, folder: str, force: bool = False,
+                                 write: Callable = pd.DataFrame.to_parquet):
         filename = os.path.join(folder, "company_profile.parquet")
-        if not os.path.exists(filename):
+        if force or not os.path.exists(filename):
             print(f"🏢 Fetching company profile for {extractor.ticker}.")
             comp_profile = extractor.extract_company_profile()
-            comp_profile.to_parquet(filename)
+            write(comp_profile, filename)
+            return filename
 
     @staticmethod
-    def _process_fundamentals(extractor: StockDataExtractor, folder: str):
+    def _process_fundamentals(extractor: StockDataExtractor, folder: str, force: bool = False,
+                              write: Callable = pd.DataFrame.to_parquet):
         filename = os.path.join(folder, "fundamentals.parquet")
-        if not os.path.exists(filename):
+        if force or not os.path.exists(filename):
             print(f"📈 Fetching fundamentals for {extractor.ticker}.")
             fundamentals = extractor.extract_fundamentals()
-            fundamentals.to_parquet(filename)
+            write(fundamentals, filename)
+            return filename
+
+    @staticmethod
+    def _download_price_batch(tickers: List[str], start: Optional[pd.Timestamp]) -> Dict[str, pd.DataFrame]:
+        try:
+            import yfinance as yf
+        except ImportError as e:
+            raise RuntimeError("Batched price downloads require the 'yfinance' package.") from e
+
+        data = yf.download(tickers, start=start.strftime("%Y-%m-%d") if start is not None else None,
+                           period=None if start is not None else "max", group_by="ticker", auto_adjust=False,
+                           actions=False, threads=False, progress=False)
+        frames = {}
+        for ticker in tickers:
+            if data is None or ticker not in data.columns.get_level_values(0):
+                continue
+            frame = data[ticker].dropna(how="all")
+            if not frame.empty:
+                frames[ticker] = frame
+        return frames
+
+    def _previous_prices(self, ticker: str) -> Optional[pd.DataFrame]:
+        key = os.path.join(ticker, "stock_price.parquet")
+        if self.delta:
+            return self.delta.read(key, self.state_dir)
+        for directory in (self.state_dir, self.stock_download_dir):
+            if directory and os.path.exists(os.path.join(directory, key)):
+                return pd.read_parquet(os.path.join(directory, key))
+        return None
+
+    @staticmethod
+    def _conform(frame: pd.DataFrame, previous: pd.DataFrame) -> Optional[pd.DataFrame]:
+        # Batched rows take the columns, index and dtypes of the file written by the extractor, e.g. 'Adj Close'
+        # is matched to 'adj_close'. Columns not in the download keep a constant previous value, if any.
+        def normalise(name) -> str:
+            return str(name).lower().replace(" ", "_")
+
+        date_column = next((c for c in previous.columns if normalise(c) in DATE_COLUMNS), None)
+        keyed = previous.set_index(date_column, drop=False) if isinstance(previous.index, pd.RangeIndex) \
+            and date_column else previous
+        index = pd.to_datetime(frame.index)
+        previous_index = pd.DatetimeIndex(pd.to_datetime(keyed.index))
+        if previous_index.tz is not None:
+            index = index.tz_localize(previous_index.tz) if index.tz is None else index.tz_convert(previous_index.tz)
+        elif index.tz is not None:
+            index = index.tz_localize(None)
+
+        downloaded = {normalise(column): column for column in frame.columns}
+        matched = [column for column in previous.columns if normalise(column) in downloaded]
+        if not matched:
+            return None
+
+        rows = pd.DataFrame(index=index)
+        for column in previous.columns:
+            if normalise(column) in downloaded:
+                rows[column] = frame[downloaded[normalise(column)]].to_numpy()
+            elif column == date_column and keyed is not previous:
+                rows[column] = index
+            elif previous[column].nunique(dropna=False) == 1:
+                rows[column] = previous[column].iloc[0]
+            else:
+                rows[column] = pd.NA
+        rows = rows.astype(previous.dtypes.to_dict(), errors="ignore")
+        rows.index.name = keyed.index.name
+
+        merged = pd.concat([keyed.set_axis(previous_index), rows])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        if keyed is not previous:
+            return merged.reset_index(drop=True)
+        return merged.set_axis(merged.index.rename(previous.index.name))
+
+    def _process_price_batch(self, batch: tuple):
+        # 'batch' pairs each ticker with the last date of its previous price file
+        tickers = [ticker for ticker, _ in batch]
+        print(f"💲 Fetching stock prices for a batch of {len(tickers)} tickers.")
+        try:
+            start = min(last for _, last in batch).normalize() - pd.Timedelta(days=self.overlap_days)
+            with self.metrics.span("stock.price_batch", f"{tickers[0]}..{tickers[-1]}", items=len(tickers)):
+                fetcher = self.price_batch_fetcher or self._download_price_batch
+                with self.upstream.guard():
+                    frames = fetcher(tickers, start)
+
+            written, fetched = [], []
+            for ticker, frame in frames.items():
+                previous = self._previous_prices(ticker) if ticker in tickers else None
+                frame = self._conform(frame, previous) if previous is not None else None
+                if frame is None:
+                    continue  # columns that cannot be matched, the extractor fetches this ticker instead
+                folder_path = os.path.join(self.stock_download_dir, ticker)
+                os.makedirs(folder_path, exist_ok=True)
+                self._encode(written, ticker, "prices", frame, os.path.join(folder_path, "stock_price.parquet"))
+                fetched.append(ticker)
+            self._finish(written)
+            return {"success": True, "tickers": fetched}
+        except Exception as e:
+            return {"success": False, "error": f"Failed to extract price batch: {e}."}
+
+    def _last_price_date(self, ticker: str) -> Optional[pd.Timestamp]:
+        # Only the date column's statistics are read here, the full file is read once its batch is downloaded
+        key = os.path.join(ticker, "stock_price.parquet")
+        if self.delta:
+            return self.delta.last_date(key, self.state_dir)
+        for directory in (self.state_dir, self.stock_download_dir):
+            if directory and os.path.exists(os.path.join(directory, key)):
+                return DeltaStore.max_date(os.path.join(directory, key))
+        return None
+
+    def _process_price_batches(self):
+        # Only tickers with a previous price file are batched, their download is limited to the days since it and
+        # conformed to its schema. Tickers without one are fetched in full by the extractor.
+        pending = []
+        for ticker in self.tickers:
+            due = (self._is_due(ticker, "prices") if self.freshness
+                   else not os.path.exists(os.path.join(self.stock_download_dir, ticker, "stock_price.parquet")))
+            last = self._last_price_date(ticker) if due else None
+            if last is not None:
+                pending.append((ticker, last))
+        # Tickers with similar last dates share a batch, so no batch re-downloads much more than it needs
+        pending.sort(key=lambda item: (item[1], item[0]))
+        batches = [
+            tuple(pending[i:i + self.price_batch_size])
+            for i in range(0, len(pending), self.price_batch_size)
+        ]
+        if not batches:
+            return
+
+        # Each batch is one large request, so only a few run at once
+        queue = RetryQueue(
+            max_workers=self.min_workers,
+            max_attempts=min(2, self.max_retries),
+            base_delay=self.retry_base_delay,
+            max_delay=self.retry_max_delay,
+            desc="Fetching Price Batches",
+            unit="batch"
+        )
+        results = queue.run(batches, self._process_price_batch)
+        fetched = {ticker for result in results.values() for ticker in result.get("tickers", [])}
+
+        # Tickers missing from their batch are fetched individually by the per-ticker stage
+        print(f"💲 Fetched prices for {len(fetched)} of {len(pending)} tickers in {len(batches)} batches, "
+              f"{len(pending) - len(fetched)} fall back to per-ticker requests.")
+
+    def _encode(self, written: list, ticker: str, dataset: str, df: pd.DataFrame, filename: str):
+        written.append((ticker, dataset, self.encoder.write(df, filename, ticker, f"stock.{dataset}.encode")))
+
+    def _finish(self, written: list) -> int:
+        # Stages whose file was written count as done even when a later stage of the ticker failed
+        size = 0
+        for ticker, dataset, future in written:
+            if future.exception() is not None:
+                continue
+            if self.freshness:
+                self.freshness.mark(ticker, dataset)
+            paths = [future.result()]
+            if self.delta:
+                key = os.path.relpath(future.result(), self.stock_download_dir)
+                paths = [os.path.join(self.stock_download_dir, stored)
+                         for stored in self.delta.write(self.stock_download_dir, key, self.state_dir)]
+                self.stored.add((ticker, dataset))
+            for path in paths:
+                size += os.path.getsize(path)
+                if self.upload_queue:
+                    self.upload_queue.put(path)
+
+        for _, _, future in written:
+            future.result()
+        return size
 
     def _process_ticker(self, ticker: str):
         print(f"📥 Fetching ticker data for {ticker}.")
-        stock_extractor = StockDataExtractor(ticker=ticker)
+        stock_extractor = self.upstream.wrap(StockDataExtractor(ticker=ticker))
         try:
             folder_path = os.path.join(self.stock_download_dir, ticker)
             os.makedirs(folder_path, exist_ok=True)
-            self._process_prices(stock_extractor, folder_path)
-            self._process_dividends(stock_extractor, folder_path)
-            self._process_company_profile(stock_extractor, folder_path)
-            self._process_fundamentals(stock_extractor, folder_path)
-            return {"success": True, "folder": folder_path}
+            written = []
+            try:
+                for dataset, stage in [
+                    ("prices", self._process_prices),
+                    ("dividends", self._process_dividends),
+                    ("company_profile", self._process_company_profile),
+                    ("fundamentals", self._process_fundamentals)
+                ]:
+                    if self.freshness and not self._is_due(ticker, dataset) or (ticker, dataset) in self.stored:
+                        continue
+
+                    # The next stage is fetched while the encoder is still writing this one
+                    with self.metrics.span(f"stock.{dataset}", ticker, attempt=self.attempts.get(ticker)):
+                        stage(stock_extractor, folder_path, force=self.freshness is not None,
+                              write=functools.partial(self._encode, written, ticker, dataset))
+            finally:
+                with self.metrics.stage("stock.finish"):
+                    size = self._finish(written)
+            return {"success": True, "folder": folder_path, "bytes": size}
         except Exception as e:
             return {"success": False, "error": f"Failed to extract ticker data: {e}."}
 
-    def _remove_delisted_tickers(self):
-        for ticker in self.ticker_status:
-            if ticker in self.tickers and ticker["is_delisted"]:
-                self.tickers.pop(ticker)
+    def _controlled_ticker(self, ticker: str):
+        self.attempts[ticker] = self.attempts.get(ticker, 0) + 1
+        started = self.controller.acquire()
+        workers = self.controller.current
+        result = {"success": False, "error": "Ticker processing did not complete"}
+        try:
+            with self.metrics.stage("stock.extract"):
+                result = self._process_ticker(ticker)
+            if ticker in self.probes and result.get("error"):
+                result["retry"] = False  # a single probe is enough to keep a quarantined ticker quarantined
+        finally:
+            runtime = time.monotonic() - started
+            self.controller.release(started, result.get("error"))
+            self.costs.record(ticker, runtime, result.get("bytes", 0), bool(result.get("error")))
+            self.metrics.record("stock.ticker", ticker, runtime, result.get("error"), attempt=self.attempts[ticker],
+                                bytes=result.get("bytes", 0), workers=workers)
+        return result
+
+    def _remove_quarantined_tickers(self):
+        active = [ticker for ticker in self.tickers if self.ticker_status.should_probe(ticker)]
+        self.probes = {ticker for ticker in active if self.ticker_status.is_quarantined(ticker)}
+        skipped = len(self.tickers) - len(active)
+        if skipped or self.probes:
+            print(f"🚫 Skipping {skipped} quarantined tickers, probing {len(self.probes)} due for a retry.")
+        self.tickers = active
+
+    def _is_due(self, ticker: str, dataset: str) -> bool:
+        if dataset == "prices" and ticker in self.closed:
+            return False
+        return self.freshness.is_stale(ticker, dataset)
+
+    def _remove_closed_market_tickers(self):
+        # Prices are only stale once the exchange had a session, other datasets keep their TTLs
+        for ticker in self.tickers:
+            if self.freshness.is_stale(ticker, "prices") and not self.calendar.should_fetch(
+                    ticker, self.freshness.fetched_at(ticker, "prices")):
+                self.closed.add(ticker)
+
+        active = [
+            ticker for ticker in self.tickers
+            if any(self._is_due(ticker, dataset) for dataset in self.freshness.ttls)
+        ]
+        for ticker in set(self.tickers) - set(active):
+            self.metrics.record("stock.calendar_skip", ticker, 0.0)
+        if len(active) < len(self.tickers):
+            print(f"🗓️ Skipping {len(self.tickers) - len(active)} tickers without a market session since their "
+                  f"last fetch.")
+        self.tickers = active
+
+    def _process_tickers(self, queue, tickers: List[str]) -> Dict[str, dict]:
+        self.tickers = list(dict.fromkeys(tickers))
+        self._remove_quarantined_tickers()
+        if self.calendar:
+            self._remove_closed_market_tickers()
+        if self.price_batch_size > 0:
+            self._process_price_batches()
+        return queue.run(self.tickers, self._controlled_ticker)
+
+    def _shutdown(self):
+        # Also runs when processing raised, so no upload thread, encoder pool, profiler or patched transport outlives it
+        if self.encoder:
+            self.encoder.close()
+        if self.cache:
+            self.cache.uninstall()
+        if self.upload_queue:
+            self.upload_queue.close()
+        if self.metrics.profiler:
+            self.metrics.profiler.stop()
 
     def process(self):
-        with open(self.ticker_file, "r") as f:
-            self.tickers = json.load(f)
-
-        if os.path.exists(os.path.join(self.download_dir, self.ticker_status_file)):
-            with open(os.path.join(self.download_dir, self.ticker_status_file), "r") as f:
-                self.ticker_status = json.load(f)
-            self._remove_delisted_tickers()
-
-        remaining = self.tickers.copy()
-        max_retries = 5
-        decay_rate = 0.2
-        max_workers = 80
-        min_workers = 10
-        errors = {}
-
-        for attempt in range(0, max_retries):
-            factor = (1 - decay_rate) ** attempt
-            c_workers = max(int(max_workers * factor), min_workers)
-            print(f"🔁 Attempt: {attempt + 1} with {c_workers} workers.")
-
-            results = {}
-            with concurrent.futures.ThreadPoolExecutor(max_workers=c_workers) as executor:
-                futures = {executor.submit(self._process_ticker, ticker): ticker for ticker in remaining}
-                for future in tqdm(
-                        concurrent.futures.as_completed(futures),
-                        total=len(remaining),
-                        desc="Fetching Tickers",
-                        unit="ticker"
-                ):
-                    ticker = futures[future]
-                    result = future.result()
-                    results[ticker] = result
-
-                    if attempt == max_retries - 1 and result.get("error", None):
-                        errors[ticker] = result["error"]
-
-            failed = [ticker for ticker in remaining if results[ticker].get("error")]
-            if not failed:
-                break
-
-            print(f"🔁 Retrying {len(failed)} failed Ticker: {[t for t in failed]}.")
-            remaining = failed
-            time.sleep(random.uniform(5, 10))
-
-        if errors:
-            log_path = os.path.join(self.stock_download_dir, "error.log")
-            with open(log_path, "w", encoding="utf-8") as f:
-                for fx, err in errors.items():
-                    f.write(f"{fx}: {err}\n")
-            print(f"⚠️ {len(errors)} errors logged to '{log_path}'.")
+        if self.metrics.profiler:
+            self.metrics.profiler.start()
+        try:
+            self.controller = ConcurrencyController(max_limit=self.max_workers, min_limit=self.min_workers)
+            if self.cache_dir:
+                self.cache = ResponseCache(self.cache_dir, default_ttl=self.cache_ttl, ttls=self.cache_ttls or {})
+                self.cache.unpack(os.path.join(self.cache_dir, "response_cache.tar")).install()
+            if self.upload_bucket:
+                self.upload_queue = UploadQueue(Uploader(UploadConfig(
+                    directory=Path(self.stock_download_dir),
+                    pattern=self.upload_pattern,
+                    message="Upload Stock Files",
+                    bucket=self.upload_bucket,
+                    mode="stock",
+                    manifest_key=self.upload_manifest_key
+                ), metrics=self.metrics))
+                self.upload_queue.start()
+
+            self.encoder = ParquetEncoder(
+                processes=self.encode_processes,
+                compression=self.parquet_compression,
+                compression_level=self.parquet_compression_level,
+                metrics=self.metrics
+            )
+
+            queue = RetryQueue(
+                max_workers=self.max_workers,
+                max_attempts=self.max_retries,
+                base_delay=self.retry_base_delay,
+                max_delay=self.retry_max_delay,
+                desc="Fetching Tickers",
+                unit="ticker"
+            )
+            if self.work_queue:
+                results = {}
+                work_queue = open_work_queue(self.work_queue, lease_seconds=self.lease_seconds)
+                work_queue.consume(lambda tickers: results.update(self._process_tickers(queue, tickers)))
+                print(f"📦 Work queue: {work_queue.summary()}.")
+            else:
+                with open(self.ticker_file, "r") as f:
+                    results = self._process_tickers(queue, json.load(f))
+            errors = {ticker: result["error"] for ticker, result in results.items() if result.get("error")}
+            for ticker, result in results.items():
+                if result.get("error"):
+                    self.ticker_status.record_failure(ticker, result["error"])
+                else:
+                    self.ticker_status.record_success(ticker)
+
+            print(f"⚙️ Ticker concurrency {self.controller.summary()}.")
+            print(f"🚦 Upstream {self.upstream.summary()}.")
+            self.encoder.close()
+            print(f"🗜️ Parquet encoder: {self.encoder.summary()}.")
+            if self.calendar:
+                print(f"🗓️ Market calendar: {self.calendar.summary()}.")
+            if self.delta:
+                print(f"🔀 Delta output: {self.delta.summary()}.")
+            if self.cache:
+                self.cache.uninstall()
+                self.cache.pack(os.path.join(self.cache_dir, "response_cache.tar"))
+                print(f"🗄️ Response cache: {self.cache.summary()}.")
+            self.costs.save(os.path.join(self.stock_download_dir, "item_costs.jsonl"))
+            if self.freshness:
+                self.freshness.save(os.path.join(self.stock_download_dir, self.freshness_file))
+            self.ticker_status.save(os.path.join(self.stock_download_dir, self.ticker_status_file))
+            if self.status_bucket:
+                self.ticker_status.sync(self.status_bucket, self.ticker_status_file)
+            print(f"🩺 Ticker status: {self.ticker_status.summary()}.")
+            if self.upload_queue:
+                self.upload_queue.close()
+            if self.freshness and self.status_bucket:
+                # Shared only once the files are uploaded, otherwise the next run would skip datasets missing in S3
+                if self.upload_queue and self.upload_queue.failed:
+                    print(f"⚠️ Not sharing freshness, {len(self.upload_queue.failed)} uploads failed.")
+                else:
+                    self.freshness.sync(self.status_bucket, self.freshness_file)
+
+            self.metrics.write(os.path.join(self.stock_download_dir, "metrics.jsonl"))
+            self.metrics.write_summary("Stock Metrics")
+            self.metrics.write_outputs("stock")
+            if self.metrics.profiler:
+                self.metrics.profiler.stop()
+                self.metrics.profiler.write(self.stock_download_dir)
+                self.metrics.profiler.write_summary("Stock Profile")
+                print(f"🔬 Profiler: {self.metrics.profiler.summary()}, written to '{self.stock_download_dir}'.")
+
+            if errors:
+                log_path = os.path.join(self.stock_download_dir, "error.log")
+                with open(log_path, "w", encoding="utf-8") as f:
+                    for fx, err in errors.items():
+                        f.write(f"{fx}: {err}\n")
+                print(f"⚠️ {len(errors)} errors logged to '{log_path}'.")
+        finally:
+            self._shutdown()
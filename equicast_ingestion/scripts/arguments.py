@@ -0,0 +1,84 @@
+import argparse
+import dataclasses
+from typing import Any, Dict
+
+
+class PatternSeconds(argparse.Action):
+    # 'PATTERN=SECONDS' entries into a dict, split on the last '=' as URL globs may contain one
+    def __call__(self, parser, namespace, values, option_string=None):
+        entries = {}
+        for value in values:
+            pattern, _, seconds = value.rpartition("=")
+            try:
+                entries[pattern] = float(seconds)
+            except ValueError:
+                pattern = ""
+            if not pattern:
+                parser.error(f"{option_string} expects PATTERN=SECONDS entries, got '{value}'")
+        setattr(namespace, self.dest, entries)
+
+
+def add_common_arguments(parser: argparse.ArgumentParser, max_workers: int):
+    # Options shared by the FX and stock processors, 'dest' of each is the processor field it sets
+    parser.add_argument("--max-workers", type=int, default=max_workers, help="Max number of workers")
+    parser.add_argument("--max-retries", type=int, default=5, help="Max number of retries")
+    parser.add_argument("--upload-bucket", default=None, help="S3 Bucket to upload files to while processing")
+    parser.add_argument("--upload-pattern", default="*.parquet", help="File Pattern of the files to upload")
+    parser.add_argument("--upload-manifest-key", default="", help="S3 key of the upload manifest")
+    parser.add_argument("--cache-dir", default=None, help="Directory of the on-disk upstream response cache")
+    parser.add_argument("--cache-ttl", type=float, default=900.0,
+                        help="Response cache TTL in seconds of URLs without an endpoint TTL")
+    parser.add_argument("--cache-ttls", nargs="*", default={}, action=PatternSeconds, metavar="PATTERN=SECONDS",
+                        help="Response cache TTLs of URL globs, checked before the built-in endpoint TTLs. "
+                             "Example: '*/v8/finance/chart/*=300' '*/v10/finance/quoteSummary/*=43200'")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Upstream requests per second across all workers (0 disables)")
+    parser.add_argument("--rate-burst", type=float, default=10.0, help="Upstream requests allowed in a burst")
+    parser.add_argument("--breaker-threshold", type=float, default=0.5,
+                        help="Share of throttled recent requests that pauses the upstream (0 disables)")
+    parser.add_argument("--breaker-cool-down", type=float, default=30.0,
+                        help="Seconds the upstream is paused once the breaker opens")
+    parser.add_argument("--encode-processes", type=int, default=0,
+                        help="Processes encoding parquet off the fetch threads (0 disables, -1 one per CPU)")
+    parser.add_argument("--parquet-compression", default="snappy", help="Parquet codec. Example: snappy, zstd")
+    parser.add_argument("--parquet-compression-level", type=int, default=None, help="Parquet codec level")
+    parser.add_argument("--delta-output", action="store_true",
+                        help="Store only rows changed since the previous outputs in the state directory")
+    parser.add_argument("--compact-every", type=int, default=7,
+                        help="Deltas kept before a file is written as a full snapshot again")
+    parser.add_argument("--work-queue", default=None,
+                        help="Shared work queue to claim batches from until drained. Example: s3://bucket/prefix")
+    parser.add_argument("--lease-seconds", type=float, default=300.0,
+                        help="Seconds a claimed batch stays leased without a heartbeat")
+    parser.add_argument("--profile", action="store_true",
+                        help="Sample every worker thread and time each stage, written as 'profile.collapsed' "
+                             "and 'profile_stages.json'")
+
+
+def add_fx_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--file", required=True, help="FX Input File Path")
+    add_common_arguments(parser, max_workers=20)
+    parser.add_argument("--full-run", action="store_true", help="Full Load FX Input")
+    parser.add_argument("--state-dir", default=None,
+                        help="Directory with previous outputs and watermarks (enables incremental prices)")
+    parser.add_argument("--market-calendar", action="store_true",
+                        help="Skip incremental prices of pairs without an FX session since their last fetch")
+    parser.add_argument("--triangulate", action="store_true",
+                        help="Fetch prices of legs against the pivot only and derive the other pairs locally")
+    parser.add_argument("--pivot", default="USD", help="Pivot currency of triangulated legs")
+    parser.add_argument("--overlap-days", type=int, default=3, help="Days re-fetched before each watermark")
+    parser.add_argument("--stream-window-days", type=int, default=0,
+                        help="Page full-run price history in windows of this many days (0 disables streaming)")
+    parser.add_argument("--stream-start", default="2000-01-01", help="First day paged by a streaming full run")
+    parser.add_argument("--memory-budget-mb", type=int, default=0,
+                        help="Memory budget of full-history workers (0 disables the cap)")
+    parser.add_argument("--worker-memory-mb", type=int, default=512,
+                        help="Estimated peak memory of one full-history worker")
+    parser.add_argument("--work-dir", default=None,
+                        help="Stable output directory, re-running resumes from its journal of completed pairs")
+
+
+def processor_kwargs(args: argparse.Namespace, processor: type) -> Dict[str, Any]:
+    # Parsed options whose name matches an init field of the processor dataclass
+    values = vars(args)
+    return {f.name: values[f.name] for f in dataclasses.fields(processor) if f.init and f.name in values}
@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+
+from equicast_ingestion.benchmark import Scenario, compare, format_table, run
+from equicast_ingestion.benchmark.runner import TARGETS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark processors against a fake upstream and S3")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS, help="Targets to benchmark")
+    parser.add_argument("--items", nargs="+", type=int, default=[1000, 10000, 50000], help="Item counts")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Mean upstream latency per call")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Lognormal sigma of the upstream latency")
+    parser.add_argument("--failure-rate", type=float, default=0.01, help="Share of upstream calls that fail")
+    parser.add_argument("--throttle-rate", type=float, default=0.01, help="Share of upstream calls throttled")
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="Throttle upstream calls above this many in flight (0 disables)")
+    parser.add_argument("--rows", type=int, default=500, help="Rows per extracted dataset")
+    parser.add_argument("--s3-latency-ms", type=float, default=2.0, help="Mean S3 latency per file")
+    parser.add_argument("--s3-failure-rate", type=float, default=0.0, help="Share of S3 uploads that fail")
+    parser.add_argument("--retry-base-delay", type=float, default=0.05, help="Processor retry base delay")
+    parser.add_argument("--fx-datasets", nargs="+", default=["prices"], help="FX datasets to process")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the fake backends")
+    parser.add_argument("--baseline", default=None, help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results JSON output path")
+    parser.add_argument("--verbose", action="store_true", help="Show processor output")
+    args = parser.parse_args()
+
+    profile = {
+        "latency": args.latency_ms / 1000,
+        "jitter": args.jitter,
+        "failure_rate": args.failure_rate,
+        "throttle_rate": args.throttle_rate,
+        "max_concurrency": args.max_concurrency,
+        "rows": args.rows,
+        "seed": args.seed
+    }
+    s3_profile = {"latency": args.s3_latency_ms / 1000, "failure_rate": args.s3_failure_rate, "seed": args.seed}
+    options = {
+        "fx": {"retry_base_delay": args.retry_base_delay, "datasets": args.fx_datasets},
+        "stock": {"retry_base_delay": args.retry_base_delay},
+        "splitter": {},
+        "uploader": {}
+    }
+
+    scenarios = [
+        Scenario(target=target, items=items, profile=profile, s3_profile=s3_profile, options=options[target])
+        for target in args.targets for items in args.items
+    ]
+    results = run(scenarios, quiet=not args.verbose)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            results = compare(results, json.load(f))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+
+    table = format_table(results)
+    print(table)
+    summary_path = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_path:
+        with open(summary_path, "a", encoding="utf-8") as f:
+            f.write(f"### ⏱️ Benchmark\n{table}\n\n")
+
+
+if __name__ == "__main__":
+    main()
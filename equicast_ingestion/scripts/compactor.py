@@ -0,0 +1,33 @@
+import argparse
+from pathlib import Path
+
+from equicast_ingestion.helpers import Compactor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact per-ticker / per-pair Parquet Files")
+    parser.add_argument("--directory-path", required=True, help="Directory Path")
+    parser.add_argument("--mode", required=True, choices=["fx", "stock"], help="Compaction Mode")
+    parser.add_argument("--file-pattern", default="*.parquet", help="File Pattern. Example: *.parquet")
+    parser.add_argument("--target-file-size-mb", type=int, default=256, help="Target size of each output file")
+    parser.add_argument("--row-group-size", type=int, default=128 * 1024, help="Rows per Parquet row group")
+    args = parser.parse_args()
+
+    dir_path = Path(args.directory_path)
+    if not dir_path.exists() or not dir_path.is_dir():
+        print(f"Error: Path '{dir_path}' does not exist or is not a directory.")
+        exit(1)
+
+    compactor = Compactor(
+        directory=dir_path,
+        mode=args.mode,
+        pattern=args.file_pattern,
+        target_file_size=args.target_file_size_mb * 1024 * 1024,
+        row_group_size=args.row_group_size
+    )
+    temp_dir = compactor.compact()
+    print(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
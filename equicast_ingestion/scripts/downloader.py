@@ -1,15 +1,41 @@
 import argparse
+import json
 
 from equicast_ingestion.helpers import Downloader
 
 
 def main():
     parser = argparse.ArgumentParser(description="S3: Download Files")
-    parser.add_argument("--mode", required=True, choices=["fx"], help="Download Mode")
+    parser.add_argument("--mode", required=True,
+                        choices=["fx", "stock", "fx_state", "stock_state", "cache", "fx_costs", "stock_costs"],
+                        help="Download Mode")
+    parser.add_argument("--file", required=False,
+                        help="FX / Tickers Input File Path (required for 'fx_state' and 'stock_state')")
+    parser.add_argument("--cache-dir", required=False,
+                        help="Persistent cache directory, unchanged objects are revalidated instead of downloaded")
+    parser.add_argument("--max-workers", type=int, default=8, help="Concurrent downloads (and ranged GETs)")
+    parser.add_argument("--delta", action="store_true",
+                        help="Also download the deltas of each 'fx_state' file, for runs with '--delta-output'")
+    parser.add_argument("--endpoint-url", required=False, help="S3 endpoint override, e.g. a local S3 stand-in")
     args = parser.parse_args()
 
-    downloader = Downloader()
-    temp_dir = downloader.download(args.mode)
+    downloader = Downloader(cache_dir=args.cache_dir, max_workers=args.max_workers, endpoint_url=args.endpoint_url)
+    if args.mode in ("fx_state", "stock_state"):
+        if not args.file:
+            parser.error(f"--file is required for '{args.mode}' mode")
+
+        with open(args.file, "r") as f:
+            items = json.load(f)
+        if args.mode == "fx_state":
+            temp_dir = downloader.download_fx_state(items, delta=args.delta)
+        else:
+            temp_dir = downloader.download_stock_state(items)
+    elif args.mode.endswith("_costs"):
+        temp_dir = downloader.download_costs(args.mode[:-len("_costs")])
+    else:
+        temp_dir = downloader.download(args.mode)
+    downloader.metrics.write_summary(f"Download '{args.mode}' Metrics")
+    downloader.metrics.write_outputs("download")
     print(temp_dir)
 
 
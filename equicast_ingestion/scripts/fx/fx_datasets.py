@@ -0,0 +1,21 @@
+import argparse
+
+from equicast_ingestion.processor import FxProcessor
+from equicast_ingestion.processor.fx import DATASETS
+from equicast_ingestion.scripts.arguments import add_fx_arguments, processor_kwargs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process FX: multiple datasets in a single pass")
+    add_fx_arguments(parser)
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=list(DATASETS),
+                        help="Datasets to extract for every FX pair")
+    args = parser.parse_args()
+
+    processor = FxProcessor(args.file, **processor_kwargs(args, FxProcessor))
+    temp_dir = processor.process_datasets(args.datasets)
+    print(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
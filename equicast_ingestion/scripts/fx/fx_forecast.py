@@ -1,16 +1,15 @@
 import argparse
 
 from equicast_ingestion.processor import FxProcessor
+from equicast_ingestion.scripts.arguments import add_fx_arguments, processor_kwargs
 
 
 def main():
     parser = argparse.ArgumentParser(description="Process FX: 'fx_forecast.parquet'")
-    parser.add_argument("--file", required=True, help="FX Input File Path")
-    parser.add_argument("--max-workers", type=int, default=20, help="Max number of workers")
-    parser.add_argument("--max-retries", type=int, default=5, help="Max number of retries")
+    add_fx_arguments(parser)
     args = parser.parse_args()
 
-    processor = FxProcessor(args.file, max_workers=args.max_workers, max_retries=args.max_retries)
+    processor = FxProcessor(args.file, **processor_kwargs(args, FxProcessor))
     temp_dir = processor.process_forecast()
     print(temp_dir)
 
@@ -8,9 +8,12 @@ def main():
     parser.add_argument("--file", required=True, help="Tickers Input File Path")
     parser.add_argument("--chunk-size", type=int, required=True, help="Chunk size")
     parser.add_argument("--mode", required=True, choices=["fx", "stock"], help="Splitter Mode")
+    parser.add_argument("--cost-file", required=False, default=None,
+                        help="Per-item cost history ('item_costs.jsonl' file or directory) for balanced chunks")
     args = parser.parse_args()
 
-    splitter = Splitter(mode=args.mode, filepath=args.file, pref_chunk_size=args.chunk_size)
+    splitter = Splitter(mode=args.mode, filepath=args.file, pref_chunk_size=args.chunk_size,
+                        cost_file=args.cost_file)
     temp_dir = splitter.split()
     print(temp_dir)
 
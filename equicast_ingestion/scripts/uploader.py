@@ -1,7 +1,8 @@
 import argparse
+import contextlib
 from pathlib import Path
 
-from equicast_ingestion.helpers import UploadConfig, Uploader
+from equicast_ingestion.helpers import Metrics, Profiler, UploadConfig, Uploader
 
 
 def main():
@@ -10,8 +11,14 @@ def main():
     parser.add_argument("--file-pattern", required=True, help="File Pattern. Example: *.json, *.parquet")
     parser.add_argument("--custom-message", required=True, help="Custom Message")
     parser.add_argument("--s3-bucket", required=True, help="S3 Bucket")
-    parser.add_argument("--mode", required=True, choices=["generic", "fx", "stock"], default="generic", help="Mode")
+    parser.add_argument("--mode", required=True, choices=["generic", "fx", "stock", "compacted"], default="generic",
+                        help="Mode")
     parser.add_argument("--s3-prefix", required=False, default="", help="S3 Prefix")
+    parser.add_argument("--manifest-key", required=False, default="",
+                        help="S3 key of the upload manifest. Skips files whose content is unchanged")
+    parser.add_argument("--profile", action="store_true",
+                        help="Sample every thread and time each stage, written as 'upload_profile.collapsed' "
+                             "and 'upload_profile_stages.json' in the working directory")
     args = parser.parse_args()
 
     dir_path = Path(args.directory_path)
@@ -25,11 +32,19 @@ def main():
         message=args.custom_message,
         bucket=args.s3_bucket,
         mode=args.mode,
-        prefix=args.s3_prefix
+        prefix=args.s3_prefix,
+        manifest_key=args.manifest_key
     )
 
-    uploader = Uploader(config=config)
-    uploader.upload()
+    profiler = Profiler() if args.profile else None
+    uploader = Uploader(config=config, metrics=Metrics(profiler=profiler))
+    with profiler or contextlib.nullcontext():
+        uploader.upload()
+    uploader.metrics.write_summary(f"{args.custom_message} Metrics")
+    if profiler:
+        profiler.write(".", "upload_profile")
+        profiler.write_summary(f"{args.custom_message} Profile")
+        print(f"🔬 Profiler: {profiler.summary()}.")
 
 
 if __name__ == "__main__":
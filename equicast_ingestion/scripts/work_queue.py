@@ -0,0 +1,34 @@
+import argparse
+import json
+import statistics
+
+from equicast_ingestion.helpers import CostHistory, open_work_queue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Work Queue: Publish Items for Matrix Jobs to Claim")
+    parser.add_argument("--file", required=True, help="Tickers / FX Input File Path")
+    parser.add_argument("--queue", required=True,
+                        help="Work queue URL. Example: s3://bucket/prefix or sqlite:///work_queue.db")
+    parser.add_argument("--batch-size", type=int, default=20, help="Items per claimed batch")
+    parser.add_argument("--cost-file", required=False, default=None,
+                        help="Per-item cost history ('item_costs.jsonl' file or directory), heaviest items go first")
+    args = parser.parse_args()
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        items = list(dict.fromkeys(json.load(f)))
+
+    history = CostHistory.load(args.cost_file)
+    known = [history.cost(item) for item in items if history.cost(item) is not None]
+    if known:
+        # Slow items are claimed first, so the tail of the run is made of short batches
+        default_cost = statistics.median(known)
+        items.sort(key=lambda item: history.cost(item) if history.cost(item) is not None else default_cost,
+                   reverse=True)
+
+    batches = open_work_queue(args.queue).publish(items, args.batch_size)
+    print(f"✅ Published {len(items)} items in {batches} batches to '{args.queue}'.")
+
+
+if __name__ == "__main__":
+    main()
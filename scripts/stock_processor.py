@@ -1,14 +1,48 @@
 import argparse
 
 from equicast_ingestion.processor import StockProcessor
+from equicast_ingestion.scripts.arguments import add_common_arguments, processor_kwargs
 
 
 def main():
     parser = argparse.ArgumentParser(description="Process stock tickers")
     parser.add_argument("--ticker-file", required=True, help="Ticker file path")
+    parser.add_argument("--download-dir", default="downloads",
+                        help="Directory of the downloaded 'ticker_status.json' and 'freshness.json' "
+                             "(the output of 'downloader.py --mode stock')")
+    parser.add_argument("--min-workers", type=int, default=10, help="Min number of workers")
+    add_common_arguments(parser, max_workers=80)
+    parser.add_argument("--freshness", dest="use_freshness", action="store_true",
+                        help="Refetch each dataset only once its TTL expired, tracked in 'freshness.json'")
+    parser.add_argument("--ttl-hours", nargs="*", default=[], metavar="DATASET=HOURS",
+                        help="Override dataset TTLs. Example: prices=20 fundamentals=2112")
+    parser.add_argument("--state-dir", default=None,
+                        help="Directory with the previous outputs ('<ticker>/<dataset>.parquet' and their deltas), "
+                             "as restored by 'downloader.py --mode stock_state'")
+    parser.add_argument("--market-calendar", action="store_true",
+                        help="Skip prices of tickers without an exchange session since their last fetch "
+                             "(needs --freshness)")
+    parser.add_argument("--default-market", choices=["NYSE", "NASDAQ", "LSE", "WEEKDAYS"], default="NYSE",
+                        help="Exchange calendar of tickers without a suffix")
+    parser.add_argument("--price-batch-size", type=int, default=0,
+                        help="Top up previous price files for this many tickers per request (needs --state-dir, "
+                             "0 disables batching)")
+    parser.add_argument("--overlap-days", type=int, default=3,
+                        help="Days re-fetched before the last date of a previous price file")
+    parser.add_argument("--failure-threshold", type=int, default=3,
+                        help="Consecutive failed runs before a ticker is quarantined")
+    parser.add_argument("--probe-interval-hours", type=float, default=24.0,
+                        help="First probe interval of a quarantined ticker, doubled after every failed probe")
+    parser.add_argument("--status-bucket", default=None,
+                        help="S3 Bucket to merge 'ticker_status.json' and 'freshness.json' back into")
     args = parser.parse_args()
 
-    processor = StockProcessor(ticker_file=args.ticker_file)
+    ttls = {}
+    for value in args.ttl_hours:
+        dataset, _, hours = value.partition("=")
+        ttls[dataset] = float(hours)
+
+    processor = StockProcessor(**processor_kwargs(args, StockProcessor), freshness_ttls=ttls)
     processor.process()
 
 
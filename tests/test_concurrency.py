@@ -0,0 +1,89 @@
+import pytest
+
+from equicast_ingestion.helpers import ConcurrencyController
+from equicast_ingestion.helpers import concurrency
+
+pytestmark = pytest.mark.ca
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(concurrency, "time", clock)
+    return clock
+
+
+def complete(controller: ConcurrencyController, clock: Clock, latency: float = 1.0, error: str = None):
+    started = controller.acquire()
+    clock.now += latency
+    controller.release(started, error)
+
+
+def test_starts_at_half_of_the_maximum(clock):
+    assert ConcurrencyController(max_limit=80, min_limit=10).current == 40
+    assert ConcurrencyController(max_limit=20, min_limit=15).current == 15
+    assert ConcurrencyController(max_limit=20, initial_limit=20).current == 20
+
+
+def test_healthy_window_adds_one(clock):
+    controller = ConcurrencyController(max_limit=20, initial_limit=10)
+    for _ in range(10):
+        complete(controller, clock)
+
+    assert controller.limit == pytest.approx(11.0, abs=0.05)
+
+
+def test_throttle_halves_once_per_window(clock):
+    controller = ConcurrencyController(max_limit=20, initial_limit=20)
+    in_flight = [controller.acquire() for _ in range(5)]  # started before the cut
+
+    complete(controller, clock, error="HTTP 429 Too Many Requests")
+    assert controller.current == 10
+
+    for started in in_flight:
+        controller.release(started, "429")
+    assert controller.current == 10  # the same burst does not cut again
+
+    for _ in range(4):
+        complete(controller, clock, error="429")
+    assert controller.current == 10  # fewer than a limit's worth of completions since the cut
+    complete(controller, clock, error="429")
+    assert controller.current == 5
+    assert controller.current >= controller.min_limit
+
+
+def test_error_rate_above_threshold_decreases(clock):
+    controller = ConcurrencyController(max_limit=20, initial_limit=20, error_threshold=0.25)
+    complete(controller, clock, error="no data")
+    complete(controller, clock, error="no data")
+    assert controller.current == 20  # error rate 0.19
+
+    complete(controller, clock, error="no data")
+    assert controller.current == 10  # error rate 0.27
+
+
+def test_single_latency_spike_is_noise(clock):
+    controller = ConcurrencyController(max_limit=20, initial_limit=20)
+    for _ in range(20):
+        complete(controller, clock, latency=1.0)
+    complete(controller, clock, latency=5.0)
+
+    assert controller.current == 20
+
+
+def test_sustained_latency_rise_decreases(clock):
+    controller = ConcurrencyController(max_limit=20, initial_limit=20)
+    for _ in range(20):
+        complete(controller, clock, latency=1.0)
+    for _ in range(5):
+        complete(controller, clock, latency=5.0)
+
+    assert controller.current == 10
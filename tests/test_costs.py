@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from equicast_ingestion.helpers import CostHistory, Splitter
+
+pytestmark = pytest.mark.ca
+
+
+def write_items(path: Path, items: list) -> str:
+    path.write_text(json.dumps(items))
+    return str(path)
+
+
+def read_chunks(directory: str, mode: str = "stock") -> list:
+    ids = json.loads(Path(directory, f"{mode}_chunks.json").read_text())
+    return [json.loads(Path(directory, f"chunk_{idx}.json").read_text()) for idx in ids]
+
+
+def test_history_accumulates_and_round_trips(tmp_path):
+    history = CostHistory()
+    history.record("AAA", 1.5, size=10)
+    history.record("AAA", 0.5, size=5, error=True)
+    history.record("BBB", 2.0)
+    history.save(str(tmp_path / "item_costs.jsonl"))
+
+    loaded = CostHistory.load(str(tmp_path / "item_costs.jsonl"))
+    assert loaded.entries["AAA"] == {"runtime": 2.0, "attempts": 2, "retries": 1, "bytes": 15}
+    assert loaded.cost("BBB") == 2.0 and loaded.cost("CCC") is None
+
+
+def test_history_loads_every_file_of_a_directory(tmp_path):
+    for name, item in (("item_costs_fx_datasets_chunk_1.jsonl", "EUR/USD"), ("nested/item_costs.jsonl", "GBP/USD")):
+        history = CostHistory()
+        history.record(item, 3.0)
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        history.save(str(tmp_path / name))
+    (tmp_path / "other.jsonl").write_text('{"item": "JPY/USD", "runtime": 1.0}\n')
+
+    loaded = CostHistory.load(str(tmp_path))
+    assert sorted(loaded.entries) == ["EUR/USD", "GBP/USD"]
+    assert CostHistory.load(str(tmp_path / "missing")).entries == {}
+
+
+def test_splitter_without_history_splits_by_count(tmp_path):
+    items = write_items(tmp_path / "tickers.json", [f"T{i}" for i in range(5)] + ["T0"])
+    chunks = read_chunks(Splitter(mode="stock", filepath=items, pref_chunk_size=2).split())
+    assert chunks == [["T0", "T1"], ["T2", "T3"], ["T4"]]
+
+
+def test_splitter_balances_chunks_by_runtime(tmp_path):
+    items = write_items(tmp_path / "tickers.json", ["A", "B", "C", "D", "E", "F"])
+    history = CostHistory()
+    for item, runtime in (("A", 10.0), ("B", 3.0), ("C", 2.0), ("D", 1.0), ("E", 8.0)):
+        history.record(item, runtime)
+    history.save(str(tmp_path / "item_costs.jsonl"))
+
+    splitter = Splitter(mode="stock", filepath=items, pref_chunk_size=3, cost_file=str(tmp_path / "item_costs.jsonl"))
+    chunks = read_chunks(splitter.split())
+
+    # F has no history and costs the median, the chunks predict 14s and 13s
+    assert sorted(map(sorted, chunks)) == [["A", "D", "F"], ["B", "C", "E"]]
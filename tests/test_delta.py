@@ -0,0 +1,103 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from equicast_ingestion.helpers import Compactor, DeltaStore
+
+pytestmark = pytest.mark.ca
+
+KEY = "EURUSD/prices.parquet"
+
+
+def prices(closes: dict) -> pd.DataFrame:
+    index = pd.DatetimeIndex(list(closes), name="Date", tz="UTC")
+    return pd.DataFrame({"Close": list(closes.values())}, index=index)
+
+
+def store_version(store: DeltaStore, run_dir, state_dir, df: pd.DataFrame) -> list:
+    # Writes one run's output and "uploads" what the store kept into the state, as the workflow does
+    path = run_dir / KEY
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(path)
+    keys = store.write(str(run_dir), KEY, str(state_dir))
+    for key in keys:
+        (state_dir / key).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(run_dir / key, state_dir / key)
+    return keys
+
+
+def test_read_reconstructs_snapshot_and_deltas(tmp_path):
+    store = DeltaStore()
+    first = prices({"2025-01-01": 1.0, "2025-01-02": 1.1, "2025-01-03": 1.2})
+    second = prices({"2025-01-02": 1.15, "2025-01-03": 1.2, "2025-01-06": 1.3})
+
+    assert store_version(store, tmp_path / "run1", tmp_path / "state", first) == [KEY]
+    assert store_version(store, tmp_path / "run2", tmp_path / "state", second) == ["EURUSD/prices.delta/000002.parquet"]
+
+    delta = pd.read_parquet(tmp_path / "state" / "EURUSD/prices.delta/000002.parquet")
+    assert sorted(delta["_op"]) == ["D", "I", "U"]
+    pd.testing.assert_frame_equal(store.read(KEY, str(tmp_path / "state")), second, check_freq=False)
+
+
+def test_unchanged_output_stores_nothing(tmp_path):
+    store = DeltaStore()
+    df = prices({"2025-01-01": 1.0, "2025-01-02": 1.1})
+
+    store_version(store, tmp_path / "run1", tmp_path / "state", df)
+    assert store_version(store, tmp_path / "run2", tmp_path / "state", df) == []
+    assert store.unchanged == 1
+
+
+def test_snapshot_written_after_compact_every_deltas(tmp_path):
+    store = DeltaStore(compact_every=2)
+    closes = {"2025-01-01": 1.0}
+    store_version(store, tmp_path / "run0", tmp_path / "state", prices(closes))
+
+    written = []
+    for day in range(2, 5):
+        closes[f"2025-01-0{day}"] = float(day)
+        written.append(store_version(store, tmp_path / f"run{day}", tmp_path / "state", prices(closes)))
+
+    assert written[0][0].endswith("000002.parquet")
+    assert written[1][0].endswith("000003.parquet")
+    assert written[2] == [KEY]  # folded into a snapshot, older deltas are superseded by its sequence
+    pd.testing.assert_frame_equal(store.read(KEY, str(tmp_path / "state")), prices(closes), check_freq=False)
+
+
+def test_compactor_reads_snapshots_with_their_deltas(tmp_path):
+    store = DeltaStore()
+    state = tmp_path / "state"
+    store_version(store, tmp_path / "run1", state, prices({"2025-01-01": 1.0, "2025-01-02": 1.1}))
+    store_version(store, tmp_path / "run2", state, prices({"2025-01-01": 1.0, "2025-01-02": 1.2, "2025-01-03": 1.3}))
+
+    output = Compactor(directory=state, mode="fx").compact()
+
+    parts = sorted(Path(output).rglob("*.parquet"))
+    assert [part.parent.name for part in parts] == ["dataset=prices"]
+    table = pq.read_table(parts[0]).to_pandas()
+    assert table["pair"].unique().tolist() == ["EURUSD"]
+    assert table["Close"].tolist() == [1.0, 1.2, 1.3]
+
+
+def test_last_date_from_statistics_and_deltas(tmp_path):
+    store = DeltaStore()
+    store_version(store, tmp_path / "run1", tmp_path / "state", prices({"2025-01-01": 1.0, "2025-01-02": 1.1}))
+    assert store.last_date(KEY, str(tmp_path / "state")) == pd.Timestamp("2025-01-02")
+
+    store_version(store, tmp_path / "run2", tmp_path / "state",
+                  prices({"2025-01-01": 1.0, "2025-01-02": 1.1, "2025-01-07": 1.2}))
+    assert store.last_date(KEY, str(tmp_path / "state")) == pd.Timestamp("2025-01-07")
+
+    # A deleted newest row leaves the last date unknown without the full state
+    store_version(store, tmp_path / "run3", tmp_path / "state", prices({"2025-01-01": 1.0, "2025-01-02": 1.1}))
+    assert store.last_date(KEY, str(tmp_path / "state")) is None
+    assert store.last_date("missing.parquet", str(tmp_path / "state")) is None
+
+
+def test_max_date_of_date_column(tmp_path):
+    path = tmp_path / "prices.parquet"
+    prices({"2025-01-01": 1.0, "2025-01-03": 1.1}).reset_index().to_parquet(path, row_group_size=1)
+    assert DeltaStore.max_date(str(path)) == pd.Timestamp("2025-01-03")
@@ -0,0 +1,108 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from equicast_ingestion.benchmark import Profile, fake_s3_client
+from equicast_ingestion.helpers import Downloader
+
+pytestmark = pytest.mark.ca
+
+BUCKET = "equicast-ingestion"
+
+
+@pytest.fixture
+def client():
+    # Fresh objects per test, with every listed prefix and GET recorded
+    base = fake_s3_client(Profile(latency=0))
+
+    class Client(base):
+        objects = {}
+        listed = []
+        gets = []
+
+        def list_objects_v2(self, Bucket, Prefix="", **kwargs):
+            self.listed.append(Prefix)
+            return super().list_objects_v2(Bucket, Prefix=Prefix, **kwargs)
+
+        def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+            self.gets.append((Key, Range))
+            return super().get_object(Bucket, Key, Range=Range, IfMatch=IfMatch)
+
+    return Client
+
+
+def put_fx_state(client):
+    watermark = {"prices": {"last_date": "2025-01-03", "files": ["fx=EURUSD/fx_prices.parquet"], "fetched_at": None}}
+    client.put(BUCKET, "fx_watermarks/EUR_USD.json", json.dumps(watermark).encode())
+    client.put(BUCKET, "fx=EURUSD/fx_prices.parquet", b"snapshot")
+    client.put(BUCKET, "fx=EURUSD/fx_prices.delta/000002.parquet", b"delta")
+
+
+@pytest.mark.parametrize("delta", [False, True])
+def test_fx_state_lists_deltas_only_for_delta_output(tmp_path, client, delta):
+    put_fx_state(client)
+    downloader = Downloader(cache_dir=str(tmp_path / "cache"), client_factory=client)
+    directory = downloader.download_fx_state(["EUR/USD"], delta=delta)
+
+    assert client.listed == (["fx=EURUSD/fx_prices.delta/"] if delta else [])
+    assert Path(directory, "fx=EURUSD/fx_prices.parquet").read_bytes() == b"snapshot"
+    assert Path(directory, "fx=EURUSD/fx_prices.delta/000002.parquet").exists() == delta
+
+
+def test_costs_of_every_chunk_are_downloaded(tmp_path, client):
+    client.put(BUCKET, "item_costs/fx/item_costs_fx_datasets_chunk_1.jsonl", b'{"item": "EUR/USD", "runtime": 1}\n')
+    client.put(BUCKET, "item_costs/fx/item_costs_fx_profile_chunk_2.jsonl", b'{"item": "GBP/USD", "runtime": 2}\n')
+    client.put(BUCKET, "item_costs/stock/item_costs.jsonl", b'{"item": "AAA", "runtime": 3}\n')
+
+    downloader = Downloader(cache_dir=str(tmp_path / "cache"), client_factory=client)
+    directory = downloader.download_costs("fx")
+
+    assert sorted(path.name for path in Path(directory).iterdir()) == [
+        "item_costs_fx_datasets_chunk_1.jsonl", "item_costs_fx_profile_chunk_2.jsonl"
+    ]
+
+
+def test_stock_state_is_restored_in_the_processor_layout(tmp_path, client):
+    client.put(BUCKET, "ticker=AAA/stock_price.parquet", b"prices")
+    client.put(BUCKET, "ticker=AAA/stock_price.delta/000002.parquet", b"delta")
+    client.put(BUCKET, "ticker=AAA/notes.txt", b"skipped")
+    client.put(BUCKET, "ticker=AAAB/stock_price.parquet", b"other ticker")
+
+    downloader = Downloader(cache_dir=str(tmp_path / "cache"), client_factory=client)
+    directory = Path(downloader.download_stock_state(["AAA", "AAA", "BBB"]))
+
+    assert sorted(str(path.relative_to(directory)) for path in directory.rglob("*") if path.is_file()) == [
+        "AAA/stock_price.delta/000002.parquet", "AAA/stock_price.parquet"
+    ]
+
+
+def test_unchanged_objects_are_revalidated_not_downloaded(tmp_path, client):
+    client.put("equicast-tickers", "tickers.json", b'["AAA"]')
+    client.put("equicast-tickers", "freshness.json", b"{}")
+
+    first = Downloader(cache_dir=str(tmp_path / "cache"), client_factory=client)
+    assert Path(first.download("stock"), "tickers.json").read_bytes() == b'["AAA"]'
+    assert sorted(key for key, _ in client.gets) == ["freshness.json", "tickers.json"]
+
+    client.gets.clear()
+    client.put("equicast-tickers", "tickers.json", b'["AAA", "BBB"]')
+    second = Downloader(cache_dir=str(tmp_path / "cache"), client_factory=client)
+    directory = second.download("stock")
+    assert client.gets == [("tickers.json", None)]  # 'freshness.json' only cost a HEAD
+    assert Path(directory, "tickers.json").read_bytes() == b'["AAA", "BBB"]'
+    assert Path(directory, "freshness.json").read_bytes() == b"{}"
+    assert not Path(directory, "ticker_status.json").exists()
+
+
+def test_large_objects_are_fetched_in_ranges(tmp_path, client):
+    payload = bytes(range(256)) * 40
+    client.put(BUCKET, "response_cache.tar", payload)
+
+    downloader = Downloader(cache_dir=str(tmp_path / "cache"), client_factory=client, part_size=1024,
+                            multipart_threshold=2048)
+    directory = downloader.download("cache")
+
+    assert Path(directory, "response_cache.tar").read_bytes() == payload
+    assert sorted(r for _, r in client.gets) == sorted(f"bytes={s}-{min(s + 1024, len(payload)) - 1}"
+                                                       for s in range(0, len(payload), 1024))
@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from equicast_ingestion.helpers import ParquetEncoder
+
+pytestmark = pytest.mark.ca
+
+
+def prices(rows: int = 100) -> pd.DataFrame:
+    index = pd.date_range("2025-01-01", periods=rows, freq="D", name="Date", tz="UTC")
+    return pd.DataFrame({"Close": [1.0 + i / 100 for i in range(rows)], "Volume": range(rows)}, index=index)
+
+
+def test_inline_writes_on_the_calling_thread(tmp_path):
+    with ParquetEncoder(compression="zstd") as encoder:
+        future = encoder.write(prices(), str(tmp_path / "prices.parquet"), "EURUSD")
+        assert future.done() and future.result() == str(tmp_path / "prices.parquet")
+
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "prices.parquet"), prices(), check_freq=False)
+    assert pq.ParquetFile(tmp_path / "prices.parquet").metadata.row_group(0).column(0).compression == "ZSTD"
+    assert encoder.summary() == "1 files encoded inline (zstd)"
+
+
+def test_processes_write_the_same_files(tmp_path):
+    encoder = ParquetEncoder(processes=2, compression="zstd", compression_level=3)
+    futures = [encoder.write(prices(rows), str(tmp_path / f"{rows}.parquet"), str(rows)) for rows in (10, 100, 1000)]
+    paths = [future.result(timeout=60) for future in futures]
+    ipc_dir = encoder._ipc_dir
+    encoder.close()
+
+    for rows, path in zip((10, 100, 1000), paths):
+        pd.testing.assert_frame_equal(pd.read_parquet(path), prices(rows), check_freq=False)
+    assert sorted(os.listdir(tmp_path)) == ["10.parquet", "100.parquet", "1000.parquet"]
+    assert not os.path.exists(ipc_dir)  # the hand-off buffers are removed with the pool
+    assert encoder.files == 3 and encoder.summary().startswith("3 files encoded by 2 processes (zstd)")
+
+
+@pytest.mark.parametrize("processes", [0, 1])
+def test_failed_writes_surface_on_the_future(tmp_path, processes):
+    with ParquetEncoder(processes=processes) as encoder:
+        future = encoder.write(prices(), str(tmp_path / "missing" / "prices.parquet"))
+        with pytest.raises(OSError):
+            future.result(timeout=60)
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from equicast_ingestion.benchmark import Profile, fake_s3_client
+from equicast_ingestion.helpers import Freshness
+
+pytestmark = pytest.mark.ca
+
+NOW = datetime(2025, 6, 2, 1, 0, tzinfo=timezone.utc)
+
+
+def test_dataset_is_refetched_once_its_ttl_expired():
+    freshness = Freshness()
+    freshness.mark("AAPL", "prices", now=NOW - timedelta(hours=19))
+    freshness.mark("AAPL", "fundamentals", now=NOW - timedelta(days=30))
+
+    assert not freshness.is_stale("AAPL", "prices", now=NOW)
+    assert freshness.is_stale("AAPL", "prices", now=NOW + timedelta(hours=1))
+    assert not freshness.is_stale("AAPL", "fundamentals", now=NOW)
+    assert freshness.is_stale("AAPL", "dividends", now=NOW)  # never fetched
+    assert freshness.is_stale("MSFT", "prices", now=NOW)
+
+
+def test_ttl_overrides_and_unknown_datasets():
+    freshness = Freshness(ttls={"prices": timedelta(hours=1)})
+    freshness.mark("AAPL", "prices", now=NOW)
+    freshness.mark("AAPL", "options", now=NOW)
+
+    assert freshness.is_stale("AAPL", "prices", now=NOW + timedelta(hours=1))
+    assert freshness.is_stale("AAPL", "options", now=NOW)  # no TTL, always refetched
+
+
+def test_save_and_load_round_trip(tmp_path):
+    freshness = Freshness()
+    freshness.mark("AAPL", "prices", now=NOW)
+    freshness.save(str(tmp_path / "freshness.json"))
+
+    loaded = Freshness().load(str(tmp_path / "freshness.json"))
+    assert loaded.fetched_at("AAPL", "prices") == NOW
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_sync_keeps_the_latest_fetch_of_every_chunk():
+    client = fake_s3_client(Profile(latency=0))
+    first, second = Freshness(), Freshness()
+    first.mark("AAPL", "prices", now=NOW)
+    first.mark("MSFT", "prices", now=NOW)
+    second.mark("AAPL", "prices", now=NOW - timedelta(days=1))
+    second.mark("TSLA", "prices", now=NOW)
+
+    assert first.sync("bucket", "freshness.json", client_factory=client)
+    assert second.sync("bucket", "freshness.json", client_factory=client)
+
+    assert second.fetched_at("AAPL", "prices") == NOW
+    assert set(second.entries) == {"AAPL", "MSFT", "TSLA"}
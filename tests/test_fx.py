@@ -0,0 +1,135 @@
+import json
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import equicast_ingestion.processor.fx as fx_module
+from equicast_ingestion.benchmark import Profile, fake_fx_extractor
+from equicast_ingestion.benchmark.fakes import FakeFxData
+from equicast_ingestion.helpers import Watermarks
+
+pytestmark = pytest.mark.ca
+
+
+@pytest.fixture
+def extractors(monkeypatch):
+    # Every extractor created, with the method and start date of each of its calls
+    created = []
+    base = fake_fx_extractor(Profile(latency=0, rows=20))
+
+    class Recording(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.calls = []
+            created.append(self)
+
+        def extract_fx_prices(self):
+            self.calls.append(("prices", self.start_date))
+            return super().extract_fx_prices()
+
+        def extract_fx_profile(self):
+            self.calls.append(("profile", self.start_date))
+            return super().extract_fx_profile()
+
+    monkeypatch.setattr(fx_module, "FxDataExtractor", Recording)
+    return created
+
+
+def make_processor(tmp_path, pairs, **options) -> fx_module.FxProcessor:
+    (tmp_path / "fx.json").write_text(json.dumps(pairs))
+    return fx_module.FxProcessor(input_file=str(tmp_path / "fx.json"), max_retries=1, **options)
+
+
+def test_datasets_of_a_pair_share_one_extractor(tmp_path, extractors):
+    state = tmp_path / "state"
+    (state / "fx=EURUSD").mkdir(parents=True)
+    Profile(rows=20).frame().to_parquet(state / "fx=EURUSD" / "fx_prices.parquet")
+    watermarks = Watermarks(str(state))
+    watermarks.update("EUR/USD", "prices", date(2000, 1, 22), ["fx=EURUSD/fx_prices.parquet"])
+    watermarks.save(str(state), ["EUR/USD"])
+
+    processor = make_processor(tmp_path, ["EUR/USD", "GBP/USD"], state_dir=str(state))
+    processor._process_all(["prices", "profile"])
+
+    assert sorted((e.from_currency, e.to_currency) for e in extractors) == [("EUR", "USD"), ("GBP", "USD")]
+    eur = next(e for e in extractors if e.from_currency == "EUR")
+    # Incremental prices start before their watermark, the profile asks for its own window on the same extractor
+    year = datetime.now().year
+    assert eur.calls == [("prices", datetime(2000, 1, 19)), ("profile", datetime(year, 1, 1))]
+
+
+@pytest.mark.parametrize("options", [{}, {"full_run": True, "stream_window_days": 3650}])
+def test_fetched_legs_are_flagged_while_written(tmp_path, extractors, options):
+    processor = make_processor(tmp_path, ["EUR/USD"], triangulate=True, **options)
+    processor._process_all(["prices"])
+
+    path = Path(processor.temp_dir, processor.outputs[("EUR/USD", "prices")][0])
+    prices = pd.read_parquet(path)
+    assert len(prices) == 20 and prices.index.is_unique
+    assert prices["is_derived"].dtype == bool and not prices["is_derived"].any()
+
+
+RATES = {"EUR/USD": 1.1, "GBP/USD": 1.25, "USD/JPY": 150.0}  # quotes of the legs, every day
+CROSSES = ["EUR/GBP", "EUR/JPY", "GBP/JPY"]
+
+
+@pytest.fixture
+def quotes(monkeypatch):
+    # Legs quote a constant rate with a one percent range, 'failing' legs raise
+    fetched, failing = [], set()
+
+    class Quotes:
+        def __init__(self, from_currency, to_currency, start_date=None, end_date=None):
+            self.pair = f"{from_currency}/{to_currency}"
+            self.start_date, self.end_date = start_date, end_date
+
+        def extract_fx_prices(self):
+            fetched.append(self.pair)
+            if self.pair in failing:
+                raise RuntimeError("404 Not Found")
+            rate = RATES[self.pair]
+            index = pd.date_range("2025-01-01", periods=5, freq="D", name="Date")
+            frame = pd.DataFrame({"Open": rate, "High": rate * 1.01, "Low": rate * 0.99, "Close": rate,
+                                  "Volume": 100}, index=index)
+            return FakeFxData(self.pair.replace("/", ""), frame)
+
+    monkeypatch.setattr(fx_module, "FxDataExtractor", Quotes)
+    return fetched, failing
+
+
+def test_crosses_are_derived_from_legs_against_the_pivot(tmp_path, quotes):
+    fetched, _ = quotes
+    processor = make_processor(tmp_path, [*RATES, *CROSSES], triangulate=True)
+    processor._process_all(["prices"])
+
+    assert sorted(fetched) == sorted(RATES)  # crosses cost no upstream request
+    assert processor.legs == {"EUR": "EUR/USD", "GBP": "GBP/USD", "JPY": "USD/JPY"}
+    crosses = {fx: pd.read_parquet(Path(processor.temp_dir, f"fx={fx.replace('/', '')}/fx_prices.parquet"))
+               for fx in CROSSES}
+    assert processor.outputs[("EUR/GBP", "prices")] == ["fx=EURGBP/fx_prices.parquet"]
+
+    assert crosses["EUR/GBP"]["Close"].tolist() == pytest.approx([1.1 / 1.25] * 5)
+    assert crosses["EUR/JPY"]["Close"].tolist() == pytest.approx([1.1 * 150] * 5)
+    gbp_jpy = crosses["GBP/JPY"]
+    assert (gbp_jpy["Low"] <= gbp_jpy["Close"]).all() and (gbp_jpy["Close"] <= gbp_jpy["High"]).all()
+    for cross in crosses.values():
+        assert cross["is_derived"].all() and (cross["Volume"] == 0).all() and len(cross) == 5
+
+
+def test_crosses_of_a_failed_leg_are_reported(tmp_path, quotes):
+    _, failing = quotes
+    failing.add("GBP/USD")
+    processor = make_processor(tmp_path, [*RATES, *CROSSES], triangulate=True)
+    processor._process_all(["prices"])
+
+    errors = Path(processor.temp_dir, "error_extract_fx_prices.log").read_text().splitlines()
+    assert sorted(line.split(":")[0] for line in errors) == ["EUR/GBP", "GBP/JPY", "GBP/USD"]
+    assert Path(processor.temp_dir, "fx=EURJPY/fx_prices.parquet").exists()
+    assert not Path(processor.temp_dir, "fx=EURGBP/fx_prices.parquet").exists()
+
+
+def test_triangulation_cannot_claim_from_a_work_queue(tmp_path):
+    with pytest.raises(ValueError, match="work queue"):
+        make_processor(tmp_path, ["EUR/USD"], triangulate=True, work_queue="s3://bucket/queue")
@@ -0,0 +1,69 @@
+import pytest
+
+from equicast_ingestion.helpers import Journal
+from equicast_ingestion.helpers.journal import run_key
+
+pytestmark = pytest.mark.ca
+
+
+@pytest.fixture
+def output(tmp_path):
+    path = tmp_path / "out" / "EURUSD" / "prices.parquet"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"parquet")
+    return tmp_path / "out"
+
+
+def test_resume_skips_verified_units(tmp_path, output):
+    journal_path = str(tmp_path / "journal.jsonl")
+    Journal(journal_path, run="run-1").record("EURUSD", "prices", str(output), ["EURUSD/prices.parquet"], rows=1)
+
+    resumed = Journal(journal_path, run="run-1").load()
+    entry = resumed.completed("EURUSD", "prices", str(output))
+
+    assert entry["rows"] == 1
+    assert resumed.completed("EURUSD", "fundamentals", str(output)) is None
+    assert resumed.verified == 1
+
+
+def test_changed_output_is_fetched_again(tmp_path, output):
+    journal_path = str(tmp_path / "journal.jsonl")
+    Journal(journal_path, run="run-1").record("EURUSD", "prices", str(output), ["EURUSD/prices.parquet"])
+    (output / "EURUSD" / "prices.parquet").write_bytes(b"truncated")
+
+    resumed = Journal(journal_path, run="run-1").load()
+
+    assert resumed.completed("EURUSD", "prices", str(output)) is None
+    assert resumed.corrupt == 1
+
+
+def test_entries_of_other_runs_expire(tmp_path, output):
+    journal_path = str(tmp_path / "journal.jsonl")
+    Journal(journal_path, run="run-1").record("EURUSD", "prices", str(output), ["EURUSD/prices.parquet"])
+
+    later = Journal(journal_path, run="run-2").load()
+
+    assert later.completed("EURUSD", "prices", str(output)) is None
+    assert later.expired == 1
+
+
+def test_cut_short_line_and_clear(tmp_path, output):
+    journal_path = tmp_path / "journal.jsonl"
+    journal = Journal(str(journal_path), run="run-1")
+    journal.record("EURUSD", "prices", str(output), ["EURUSD/prices.parquet"])
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"item": "GBPUSD", "data')
+
+    assert list(Journal(str(journal_path), run="run-1").load().entries) == [("EURUSD", "prices")]
+    journal.clear()
+    assert not journal_path.exists()
+
+
+def test_run_key_follows_the_ci_run(monkeypatch):
+    monkeypatch.setenv("GITHUB_RUN_ID", "100")
+    first = run_key("pairs")
+    assert run_key("pairs") == first
+    assert run_key("other pairs") != first
+
+    monkeypatch.setenv("GITHUB_RUN_ID", "101")
+    assert run_key("pairs") != first
@@ -0,0 +1,69 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from equicast_ingestion.helpers import MarketCalendar
+from equicast_ingestion.helpers.market_calendar import MARKETS
+
+pytestmark = pytest.mark.ca
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_markets_of_tickers_and_pairs():
+    calendar = MarketCalendar()
+    assert [calendar.market(item) for item in ("AAPL", "VOD.L", "SAP.DE", "EUR/USD")] == [
+        "NYSE", "LSE", "WEEKDAYS", "FX"
+    ]
+    assert MarketCalendar(default_market="LSE").market("AAPL") == "LSE"
+    with pytest.raises(ValueError, match="Unknown market"):
+        MarketCalendar(default_market="TSE")
+
+
+def test_nyse_holidays():
+    assert MARKETS["NYSE"].holidays(2025) == {
+        date(2025, 1, 1), date(2025, 1, 20), date(2025, 2, 17), date(2025, 4, 18), date(2025, 5, 26),
+        date(2025, 6, 19), date(2025, 7, 4), date(2025, 9, 1), date(2025, 11, 27), date(2025, 12, 25),
+    }
+    # A Saturday New Year's Day is not moved to Friday, a Sunday Christmas moves to Monday
+    holidays_2022 = MARKETS["NYSE"].holidays(2022)
+    assert date(2021, 12, 31) not in holidays_2022 and date(2022, 12, 26) in holidays_2022
+
+
+def test_lse_holidays_substitute_weekends():
+    assert MARKETS["LSE"].holidays(2025) == {
+        date(2025, 1, 1), date(2025, 4, 18), date(2025, 4, 21), date(2025, 5, 5), date(2025, 5, 26),
+        date(2025, 8, 25), date(2025, 12, 25), date(2025, 12, 26),
+    }
+    assert {date(2021, 12, 27), date(2021, 12, 28)} <= MARKETS["LSE"].holidays(2021)
+
+
+def test_weekends_and_holidays_have_no_new_bars():
+    calendar = MarketCalendar()
+    after_friday_close = utc(2025, 1, 10, 23)
+    assert not calendar.has_session("NYSE", after_friday_close, now=utc(2025, 1, 13, 13))  # before Monday's open
+    assert calendar.has_session("NYSE", after_friday_close, now=utc(2025, 1, 13, 14))
+    assert calendar.has_session("NYSE", utc(2025, 1, 10, 20), now=utc(2025, 1, 11, 12))  # fetched mid-session
+
+    # Martin Luther King Jr. Day, the next session is on Tuesday
+    assert not calendar.has_session("NYSE", utc(2025, 1, 18), now=utc(2025, 1, 20, 23))
+    assert calendar.has_session("NYSE", utc(2025, 1, 18), now=utc(2025, 1, 21, 14))
+
+
+def test_fx_sessions_open_on_sunday_evening():
+    calendar = MarketCalendar()
+    assert not calendar.has_session("FX", utc(2025, 1, 11, 1), now=utc(2025, 1, 12, 21))
+    assert calendar.has_session("FX", utc(2025, 1, 11, 1), now=utc(2025, 1, 12, 23))
+
+
+def test_skipped_fetches_are_counted_per_market():
+    calendar = MarketCalendar()
+    sunday = utc(2025, 1, 12, 12)
+    assert calendar.should_fetch("AAPL", None, now=sunday)
+    assert not calendar.should_fetch("AAPL", utc(2025, 1, 10, 23), now=sunday)
+    assert not calendar.should_fetch("VOD.L", utc(2025, 1, 10, 23), now=sunday)
+    assert not calendar.should_fetch("MSFT", utc(2025, 1, 11), now=sunday)
+    assert calendar.skipped == {"NYSE": 2, "LSE": 1}
+    assert calendar.summary() == "3 fetches avoided without a session since the last fetch (LSE 1, NYSE 2)"
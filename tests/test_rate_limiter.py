@@ -0,0 +1,106 @@
+import pytest
+
+from equicast_ingestion.helpers import rate_limiter
+from equicast_ingestion.helpers.rate_limiter import CircuitBreaker, TokenBucket, Upstream
+
+pytestmark = pytest.mark.ca
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.slept += seconds
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_paces_at_its_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.slept == 0
+
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.slept == pytest.approx(2.0) and bucket.waited == pytest.approx(2.0)
+
+
+def test_bucket_refills_while_idle_up_to_its_burst(clock):
+    bucket = TokenBucket(rate=1.0, burst=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.slept == pytest.approx(1.0)
+
+
+def test_disabled_bucket_never_waits(clock):
+    bucket = TokenBucket(rate=0)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.slept == 0
+
+
+def test_breaker_opens_on_the_failed_share_of_recent_calls(clock):
+    breaker = CircuitBreaker(error_threshold=0.6, window=10, min_calls=4, cool_down=30)
+    for error in (True, False, True):
+        breaker.record(error)
+    assert breaker.state == "closed"  # below min_calls
+
+    breaker.record(False)
+    assert breaker.state == "closed"
+    breaker.record(True)
+    assert breaker.state == "open" and breaker.opened == 1
+
+
+def test_half_open_trial_decides_for_everyone(clock):
+    breaker = CircuitBreaker(error_threshold=0.5, window=4, min_calls=2, cool_down=30)
+    breaker.record(True)
+    breaker.record(True)
+    assert breaker.state == "open"
+
+    clock.now += 30
+    breaker.wait()
+    assert breaker.state == "half_open"
+    breaker.record(True)  # failed trial, open for another cool down
+    assert breaker.state == "open" and breaker.opened == 2
+
+    clock.now += 30
+    breaker.wait()
+    breaker.record(False)
+    assert breaker.state == "closed"
+
+
+def test_disabled_breaker_stays_closed(clock):
+    breaker = CircuitBreaker(error_threshold=0, min_calls=1)
+    for _ in range(50):
+        breaker.record(True)
+    assert breaker.state == "closed"
+
+
+def test_upstream_counts_only_throttling_and_connection_failures(clock):
+    upstream = Upstream("test", TokenBucket(rate=0), CircuitBreaker(error_threshold=1.0, window=2, min_calls=2))
+    for error in (KeyError("no such symbol"), ValueError("bad column")):
+        with pytest.raises(type(error)):
+            with upstream.guard():
+                raise error
+    assert upstream.breaker.state == "closed"
+
+    for error in (RuntimeError("429 Too Many Requests"), ConnectionResetError("reset")):
+        with pytest.raises(type(error)):
+            with upstream.guard():
+                raise error
+    assert upstream.breaker.state == "open"
@@ -0,0 +1,97 @@
+import io
+import os
+import tarfile
+import time
+
+import pytest
+import requests
+
+from equicast_ingestion.helpers import ResponseCache
+
+pytestmark = pytest.mark.ca
+
+CHART = "https://query2.finance.yahoo.com/v8/finance/chart/EURUSD=X?interval=1d"
+SUMMARY = "https://query2.finance.yahoo.com/v10/finance/quoteSummary/AAPL?modules=price"
+
+
+def entry(content: bytes = b"{}") -> dict:
+    return {"status_code": 200, "headers": {}, "content": content, "encoding": "utf-8", "reason": "OK", "url": CHART}
+
+
+def test_ttls_match_configured_globs_then_endpoint_defaults(tmp_path):
+    cache = ResponseCache(str(tmp_path), default_ttl=60, ttls={"*/v8/finance/chart/*": 5, "*/quoteSummary/*": 30})
+    assert cache.ttl(CHART) == 5
+    assert cache.ttl(SUMMARY) == 30  # a configured glob wins over the endpoint default
+    assert ResponseCache(str(tmp_path), default_ttl=60).ttl(SUMMARY) == 6 * 3600
+    assert cache.ttl("https://query2.finance.yahoo.com/v1/finance/search?q=EUR") == 60
+
+
+def test_keys_ignore_crumb_and_parameter_order(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    key = cache.normalize("GET", f"{CHART}&range=1y&crumb=abc")
+    assert key == cache.normalize("get", "HTTPS://QUERY2.finance.yahoo.com/v8/finance/chart/EURUSD=X?range=1y&"
+                                         "interval=1d&crumb=xyz")
+    assert key != cache.normalize("GET", f"{CHART}&range=5y")
+
+
+def test_entries_expire_after_their_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    key = cache.normalize("GET", CHART)
+    cache.put(key, entry(b"rates"))
+    assert cache.get(key, ttl=60)["content"] == b"rates"
+
+    stale = time.time() - 120
+    os.utime(cache._path(key), (stale, stale))
+    assert cache.get(key, ttl=60) is None
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=10 ** 6)
+    keys = [cache.normalize("GET", f"{CHART}&n={n}") for n in range(3)]
+    for n, key in enumerate(keys):
+        cache.put(key, entry(os.urandom(1000)))
+        os.utime(cache._path(key), (n, time.time()))
+
+    cache.max_bytes = cache._size - 1
+    cache._evict()
+    assert cache.evictions == 1 and not os.path.exists(cache._path(keys[0]))
+    assert all(os.path.exists(cache._path(key)) for key in keys[1:])
+
+
+def test_archives_restore_entries_only(tmp_path):
+    cache = ResponseCache(str(tmp_path / "a"))
+    key = cache.normalize("GET", CHART)
+    cache.put(key, entry(b"rates"))
+    archive = cache.pack(str(tmp_path / "response_cache.tar"))
+    with tarfile.open(archive, "a") as tar:
+        payload = b"not an entry"
+        member = tarfile.TarInfo("../escaped.txt")
+        member.size = len(payload)
+        tar.addfile(member, io.BytesIO(payload))
+
+    restored = ResponseCache(str(tmp_path / "b")).unpack(archive)
+    assert restored.get(key, ttl=60)["content"] == b"rates"
+    assert not (tmp_path / "escaped.txt").exists()
+
+
+def test_installed_cache_serves_repeated_gets(tmp_path, monkeypatch):
+    sent = []
+
+    def send(session, request, **kwargs):
+        sent.append(request.url)
+        response = requests.Response()
+        response.status_code, response._content, response.url = 200, b'{"chart": 1}', request.url
+        return response
+
+    monkeypatch.setattr(requests.Session, "send", send)
+    cache = ResponseCache(str(tmp_path)).install()
+    try:
+        with requests.Session() as session:
+            first = session.get(CHART)
+            second = session.get(CHART)
+    finally:
+        cache.uninstall()
+
+    assert len(sent) == 1 and first.content == second.content == b'{"chart": 1}'
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert requests.Session.send is send
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from equicast_ingestion.helpers import RetryQueue
+
+pytestmark = pytest.mark.ca
+
+
+def queue(**options) -> RetryQueue:
+    return RetryQueue(**{"max_workers": 4, "base_delay": 0.01, "max_delay": 0.02, **options})
+
+
+def test_results_are_keyed_by_unique_item():
+    results = queue().run(["a", "b", "a"], lambda item: {"success": True, "value": item.upper()})
+    assert results == {"a": {"success": True, "value": "A", "attempts": 1},
+                       "b": {"success": True, "value": "B", "attempts": 1}}
+
+
+def test_failures_are_retried_until_they_succeed_or_run_out():
+    calls = {}
+
+    def work(item):
+        calls[item] = calls.get(item, 0) + 1
+        if item == "flaky" and calls[item] < 3:
+            return {"success": False, "error": "429 Too Many Requests"}
+        if item == "broken":
+            raise RuntimeError("boom")
+        return {"success": True}
+
+    results = queue(max_attempts=4).run(["flaky", "broken", "fine"], work)
+    assert results["flaky"] == {"success": True, "attempts": 3}
+    assert results["broken"] == {"success": False, "error": "boom", "attempts": 4}
+    assert calls == {"flaky": 3, "broken": 4, "fine": 1}
+
+
+def test_permanent_errors_are_not_retried():
+    results = queue().run(["delisted"], lambda item: {"success": False, "error": "404", "retry": False})
+    assert results["delisted"]["attempts"] == 1
+
+
+def test_backoff_doubles_with_jitter_up_to_the_cap():
+    retries = RetryQueue(max_workers=1, base_delay=2.0, max_delay=30.0)
+    for attempt, delay in ((1, 2.0), (2, 4.0), (4, 16.0), (8, 30.0)):
+        assert all(delay / 2 <= retries.backoff(attempt) <= delay for _ in range(50))
+
+
+def test_waiting_retries_do_not_hold_a_worker():
+    # A retry backing off leaves its worker free, so 'slow' runs while 'flaky' waits
+    started = {}
+    lock = threading.Lock()
+
+    def work(item):
+        with lock:
+            started.setdefault(item, []).append(time.monotonic())
+        if item == "flaky" and len(started[item]) == 1:
+            return {"success": False, "error": "timeout"}
+        return {"success": True}
+
+    results = queue(max_workers=1, base_delay=0.2, max_delay=0.2).run(["flaky", "slow"], work)
+    assert results["flaky"]["attempts"] == 2
+    assert started["slow"][0] < started["flaky"][1]
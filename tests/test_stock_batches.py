@@ -0,0 +1,58 @@
+import json
+
+import pandas as pd
+import pytest
+
+import equicast_ingestion.processor.stock as stock_module
+from equicast_ingestion.helpers import ParquetEncoder
+from equicast_ingestion.processor import StockProcessor
+
+pytestmark = pytest.mark.ca
+
+
+def history(start: str, days: int) -> pd.DataFrame:
+    index = pd.date_range(start, periods=days, freq="D", tz="America/New_York", name="Date")
+    return pd.DataFrame({"Open": 1.0, "Close": 2.0, "Volume": 10}, index=index)
+
+
+@pytest.fixture
+def processor(tmp_path):
+    def make(**options):
+        (tmp_path / "tickers.json").write_text(json.dumps(["AAA", "BBB", "CCC"]))
+        return StockProcessor(ticker_file=str(tmp_path / "tickers.json"), download_dir=str(tmp_path / "downloads"),
+                              stock_download_dir=str(tmp_path / "out"), **options)
+    return make
+
+
+def test_batching_needs_a_state_dir(processor):
+    with pytest.raises(ValueError, match="state_dir"):
+        processor(price_batch_size=2)
+
+
+def test_batches_read_each_previous_file_once(processor, tmp_path, monkeypatch):
+    state = tmp_path / "state"
+    for ticker, start in (("AAA", "2025-01-01"), ("BBB", "2025-01-03")):
+        (state / ticker).mkdir(parents=True)
+        history(start, 5).to_parquet(state / ticker / "stock_price.parquet")
+
+    requests = []
+
+    def fetch(tickers, start):
+        requests.append((sorted(tickers), start))
+        return {ticker: history("2025-01-06", 4).rename(columns={"Open": "open"}) for ticker in tickers}
+
+    reads = []
+    read_parquet = pd.read_parquet
+    monkeypatch.setattr(stock_module.pd, "read_parquet", lambda path, *a, **k: reads.append(path) or
+                        read_parquet(path, *a, **k))
+
+    stock = processor(price_batch_size=2, state_dir=str(state), price_batch_fetcher=fetch)
+    stock.tickers, stock.encoder = ["AAA", "BBB", "CCC"], ParquetEncoder()
+    stock._process_price_batches()
+    stock.encoder.close()
+
+    # One request from the older last date minus the overlap, CCC has no previous file to top up
+    assert requests == [(["AAA", "BBB"], pd.Timestamp("2025-01-02"))]
+    assert sorted(reads) == sorted(str(state / ticker / "stock_price.parquet") for ticker in ("AAA", "BBB"))
+    merged = read_parquet(tmp_path / "out" / "AAA" / "stock_price.parquet")
+    assert len(merged) == 9 and list(merged.columns) == ["Open", "Close", "Volume"]
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from equicast_ingestion.benchmark import Profile, fake_s3_client
+from equicast_ingestion.helpers import TickerStatus
+
+pytestmark = pytest.mark.ca
+
+NOW = datetime(2025, 6, 2, 1, 0, tzinfo=timezone.utc)
+KEY = "ticker_status.json"
+
+
+def test_quarantined_after_threshold_and_probed_on_backoff():
+    status = TickerStatus(failure_threshold=2)
+    status.record_failure("AAA", "No data found", now=NOW)
+    assert not status.is_quarantined("AAA")
+
+    status.record_failure("AAA", "No data found", now=NOW)
+    assert status.is_quarantined("AAA")
+    assert not status.should_probe("AAA", now=NOW + timedelta(hours=23))
+    assert status.should_probe("AAA", now=NOW + timedelta(days=1))
+
+    status.record_failure("AAA", "No data found", now=NOW + timedelta(days=1))
+    assert not status.should_probe("AAA", now=NOW + timedelta(days=2, hours=23))  # interval doubled
+    assert status.should_probe("AAA", now=NOW + timedelta(days=3))
+
+
+def test_success_lifts_the_quarantine():
+    status = TickerStatus(failure_threshold=1)
+    status.record_failure("AAA", "timeout", now=NOW)
+    status.record_success("AAA", now=NOW + timedelta(days=1))
+
+    assert not status.is_quarantined("AAA")
+    assert status.entries["AAA"]["consecutive_failures"] == 0
+
+
+def test_delisted_tickers_use_the_slowest_probe_schedule():
+    status = TickerStatus(failure_threshold=1)
+    status.record_failure("OLD", "possibly delisted; no price data found", now=NOW)
+
+    assert status.entries["OLD"]["is_delisted"]
+    assert not status.should_probe("OLD", now=NOW + timedelta(days=31))
+    assert status.should_probe("OLD", now=NOW + status.max_interval)
+
+
+def test_merge_keeps_the_latest_update():
+    status = TickerStatus()
+    status.record_success("AAA", now=NOW)
+    status.merge({"AAA": {"updated_at": (NOW - timedelta(days=1)).isoformat(), "is_quarantined": True},
+                  "BBB": {"updated_at": NOW.isoformat(), "is_quarantined": True}})
+
+    assert not status.is_quarantined("AAA")
+    assert status.is_quarantined("BBB")
+
+
+def test_interleaved_syncs_keep_both_updates():
+    client = fake_s3_client(Profile(latency=0))
+    first, second = TickerStatus(), TickerStatus()
+    first.record_failure("AAA", "timeout", now=NOW)
+    second.record_success("BBB", now=NOW)
+    interleaved = []
+
+    class InterleavingClient(client):
+        def get_object(self, **kwargs):
+            try:
+                return super().get_object(**kwargs)
+            finally:
+                # The second chunk writes between the first chunk's read and its write
+                if not interleaved:
+                    interleaved.append(True)
+                    assert second.sync("bucket", KEY, client_factory=client)
+
+    assert first.sync("bucket", KEY, client_factory=InterleavingClient)
+
+    stored = json.loads(client.objects[("bucket", KEY)][0])
+    assert set(stored) == {"AAA", "BBB"}
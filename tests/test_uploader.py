@@ -0,0 +1,52 @@
+import pytest
+
+from equicast_ingestion.benchmark import Profile, fake_s3
+from equicast_ingestion.helpers import UploadConfig, Uploader, UploadQueue
+
+pytestmark = pytest.mark.ca
+
+
+@pytest.fixture
+def s3():
+    class RecordingS3(fake_s3(Profile(latency=0))):
+        uploads = []
+
+        def upload_files(self, files):
+            self.uploads.extend(file['key'] for file in files if file['key'] != "manifest.json")
+            return super().upload_files(files)
+
+    return RecordingS3
+
+
+def make_uploader(directory, s3) -> Uploader:
+    return Uploader(UploadConfig(directory=directory, pattern="*.parquet", message="Upload", bucket="bucket",
+                                 mode="fx", manifest_key="manifest.json"), s3_factory=s3)
+
+
+def test_unchanged_files_are_skipped(tmp_path, s3):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.parquet").write_bytes(name.encode())
+
+    make_uploader(tmp_path, s3).upload()
+    assert sorted(s3.uploads) == ["a.parquet", "b.parquet"]
+
+    s3.uploads.clear()
+    (tmp_path / "b.parquet").write_bytes(b"changed")
+    make_uploader(tmp_path, s3).upload()
+    assert s3.uploads == ["b.parquet"]
+
+
+def test_upload_queue_skips_unchanged_and_survives_bad_files(tmp_path, s3):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.parquet").write_bytes(name.encode())
+    make_uploader(tmp_path, s3).upload()
+    s3.uploads.clear()
+
+    (tmp_path / "b.parquet").write_bytes(b"changed")
+    with UploadQueue(make_uploader(tmp_path, s3), batch_size=1) as queue:
+        for name in ("a", "b", "missing"):
+            queue.put(tmp_path / f"{name}.parquet")
+
+    assert queue.skipped == ["a.parquet"]
+    assert queue.uploaded == ["b.parquet"]
+    assert queue.failed == ["missing.parquet"]  # fingerprinting raised, the worker kept draining
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from equicast_ingestion.benchmark import Profile, fake_s3_client
+from equicast_ingestion.helpers import S3WorkQueue, SqliteWorkQueue
+
+pytestmark = pytest.mark.ca
+
+LEASE = 0.2
+
+
+@pytest.fixture(params=["s3", "sqlite"])
+def make_queue(request, tmp_path):
+    client = fake_s3_client(Profile(latency=0))
+
+    def make(worker: str, **kwargs):
+        kwargs = {"lease_seconds": LEASE, "poll_interval": 0.01, "worker": worker, **kwargs}
+        if request.param == "s3":
+            return S3WorkQueue(bucket="queue", client_factory=client, **kwargs)
+        return SqliteWorkQueue(path=str(tmp_path / "work_queue.db"), **kwargs)
+
+    return make
+
+
+def test_consume_drains_every_batch_once(make_queue):
+    queue = make_queue("publisher")
+    assert queue.publish([f"T{i}" for i in range(7)] + ["T0"], batch_size=3) == 3
+
+    handled = []
+    make_queue("w1").consume(handled.extend)
+
+    assert sorted(handled) == sorted(f"T{i}" for i in range(7))
+    assert queue.drained()
+
+
+def test_expired_lease_is_reclaimed(make_queue):
+    make_queue("publisher").publish(["A", "B"], batch_size=1)
+    first, second = make_queue("w1"), make_queue("w2")
+
+    crashed = first.claim()
+    held = second.claim()
+    assert crashed.id != held.id
+    assert second.claim() is None  # both leases are live
+    assert not second.drained()
+
+    time.sleep(LEASE * 1.5)
+    assert second.extend(held)  # a heartbeat keeps the live batch, only the crashed one is handed out
+    reclaimed = second.claim()
+
+    assert reclaimed.id == crashed.id and reclaimed.items == crashed.items
+    assert not first.complete(crashed)  # the lease moved on, the first worker lost it
+    assert second.complete(reclaimed) and second.complete(held)
+    assert second.drained()
+
+
+def test_batch_given_up_after_max_claims(make_queue):
+    make_queue("publisher").publish(["A"], batch_size=1)
+    worker = make_queue("w1", max_claims=1)
+
+    assert worker.claim() is not None
+    time.sleep(LEASE * 1.5)
+
+    assert worker.claim() is None
+    assert worker.drained()